@@ -29,11 +29,30 @@ formats for specifying dates and times, including:
 - Special keywords: "now", "today", "yesterday"
 """
 
-__all__ = ["parse_approxidate", "parse_relative_time"]
+__all__ = ["parse_approxidate", "parse_grace_period", "parse_relative_time"]
 
+import functools
 import time
 from datetime import datetime
 
+# Number of seconds in each unit accepted by parse_relative_time
+_RELATIVE_TIME_UNITS = {
+    "second": 1,
+    "seconds": 1,
+    "minute": 60,
+    "minutes": 60,
+    "hour": 3600,
+    "hours": 3600,
+    "day": 86400,
+    "days": 86400,
+    "week": 604800,
+    "weeks": 604800,
+    "month": 2592000,  # 30 days
+    "months": 2592000,
+    "year": 31536000,  # 365 days
+    "years": 31536000,
+}
+
 
 def parse_approxidate(time_spec: str | bytes) -> int:
     """Parse a Git approxidate specification and return a Unix timestamp.
@@ -105,6 +124,7 @@ def parse_approxidate(time_spec: str | bytes) -> int:
     raise ValueError(f"Unable to parse time specification: {time_spec!r}")
 
 
+@functools.lru_cache(maxsize=128)
 def parse_relative_time(time_str: str) -> int:
     """Parse a relative time string like '2 weeks ago' into seconds.
 
@@ -131,32 +151,35 @@ def parse_relative_time(time_str: str) -> int:
     if len(parts) != 2:
         raise ValueError(f"Invalid relative time format: {time_str}")
 
+    num_str, unit = parts
+    if not num_str.isdecimal():
+        raise ValueError(f"Invalid number in relative time: {num_str}")
+
     try:
-        num = int(parts[0])
-        unit = parts[1]
-
-        multipliers = {
-            "second": 1,
-            "seconds": 1,
-            "minute": 60,
-            "minutes": 60,
-            "hour": 3600,
-            "hours": 3600,
-            "day": 86400,
-            "days": 86400,
-            "week": 604800,
-            "weeks": 604800,
-            "month": 2592000,  # 30 days
-            "months": 2592000,
-            "year": 31536000,  # 365 days
-            "years": 31536000,
-        }
-
-        if unit in multipliers:
-            return num * multipliers[unit]
-        else:
-            raise ValueError(f"Unknown time unit: {unit}")
-    except ValueError as e:
-        if "invalid literal" in str(e):
-            raise ValueError(f"Invalid number in relative time: {parts[0]}")
-        raise
+        multiplier = _RELATIVE_TIME_UNITS[unit]
+    except KeyError:
+        raise ValueError(f"Unknown time unit: {unit}") from None
+    return int(num_str) * multiplier
+
+
+def parse_grace_period(time_str: str) -> int:
+    """Parse an expiry time like '2 weeks ago', 'now' or '2005-04-07'.
+
+    This is the syntax accepted by ``gc --prune`` and ``prune --expire``.
+
+    Args:
+        time_str: A relative time accepted by parse_relative_time, or an
+            absolute date in YYYY-MM-DD form
+
+    Returns:
+        Number of seconds before the current time
+
+    Raises:
+        ValueError: If the time string cannot be parsed
+    """
+    # Tell dates apart by shape, so they don't go through the relative
+    # time parser's error path first
+    if len(time_str) == 10 and time_str[4] == "-" and time_str[7] == "-":
+        date = datetime.strptime(time_str, "%Y-%m-%d")
+        return int(time.time() - date.timestamp())
+    return parse_relative_time(time_str)
@@ -59,41 +59,38 @@ import argparse
 import io
 import logging
 import os
+import re
 import shutil
 import signal
+import stat
 import subprocess
 import sys
-import tempfile
 import types
 from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
 from pathlib import Path
 from types import TracebackType
 from typing import (
+    TYPE_CHECKING,
+    Any,
     BinaryIO,
     ClassVar,
     TextIO,
 )
 
-from dulwich import porcelain
 from dulwich._typing import Buffer
-from dulwich.refs import HEADREF, Ref
 
-from .bundle import Bundle, create_bundle_from_repo, read_bundle, write_bundle
-from .client import get_transport_and_path
-from .config import Config
 from .errors import (
     ApplyDeltaError,
     FileFormatException,
     GitProtocolError,
     NotGitRepository,
 )
-from .index import Index
 from .log_utils import _configure_logging_from_trace
-from .objects import Commit, ObjectID, RawObjectID, sha_to_hex, valid_hexsha
-from .objectspec import parse_commit_range
-from .pack import Pack
-from .patch import DiffAlgorithmNotAvailable
-from .repo import Repo
+
+if TYPE_CHECKING:
+    from .config import Config
+    from .objects import Commit
+    from .repo import Repo
 
 logger = logging.getLogger(__name__)
 
@@ -361,6 +358,9 @@ def parse_time_to_timestamp(time_spec: str) -> int:
     return parse_approxidate(time_spec)
 
 
+_BYTE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+
 def format_bytes(bytes: float) -> str:
     """Format bytes as human-readable string.
 
@@ -370,11 +370,10 @@ def format_bytes(bytes: float) -> str:
     Returns:
         Human-readable string like "1.5 MB"
     """
-    for unit in ["B", "KB", "MB", "GB"]:
-        if bytes < 1024.0:
-            return f"{bytes:.1f} {unit}"
-        bytes /= 1024.0
-    return f"{bytes:.1f} TB"
+    # Each unit is 2**10 times the previous one, so the unit follows directly
+    # from the bit length of the integer part.
+    unit = min(len(_BYTE_UNITS) - 1, max(0, int(bytes).bit_length() - 1) // 10)
+    return f"{bytes / (1 << (10 * unit)):.1f} {_BYTE_UNITS[unit]}"
 
 
 def launch_editor(template_content: bytes = b"") -> bytes:
@@ -386,6 +385,8 @@ def launch_editor(template_content: bytes = b"") -> bytes:
     Returns:
         The edited content as bytes
     """
+    import tempfile
+
     # Determine which editor to use
     editor = os.environ.get("GIT_EDITOR") or os.environ.get("EDITOR") or "vi"
 
@@ -992,7 +993,7 @@ class _StreamContextAdapter:
 
 
 def get_pager(
-    config: Config | None = None, cmd_name: str | None = None
+    config: "Config | None" = None, cmd_name: str | None = None
 ) -> "_StreamContextAdapter | Pager":
     """Get a pager instance if paging should be used, otherwise return sys.stdout.
 
@@ -1089,6 +1090,41 @@ def enable_pager() -> None:
 class Command:
     """A Dulwich subcommand."""
 
+    _parser: ClassVar[argparse.ArgumentParser | None] = None
+
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for this command."""
+        return argparse.ArgumentParser()
+
+    @classmethod
+    def get_parser(cls) -> argparse.ArgumentParser:
+        """Get the argument parser for this command.
+
+        The parser is built on first use and cached on the class, so
+        repeated invocations of the same command don't rebuild it.
+
+        Returns:
+            The argument parser for this command
+        """
+        parser = cls.__dict__.get("_parser")
+        if parser is None:
+            parser = cls._parser = cls.build_parser()
+        return parser
+
+    @classmethod
+    def check_no_args(cls, args: Sequence[str]) -> None:
+        """Validate the arguments of a command that accepts none.
+
+        The parser is only built when there is something to report, such as
+        an unexpected argument or ``--help``.
+
+        Args:
+            args: Command line arguments
+        """
+        if args:
+            cls.get_parser().parse_args(args)
+
     def run(self, args: Sequence[str]) -> int | None:
         """Run the command."""
         raise NotImplementedError(self.run)
@@ -1097,12 +1133,9 @@ class Command:
 class cmd_archive(Command):
     """Create an archive of files from a named tree."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the archive command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the archive command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "--remote",
@@ -1110,15 +1143,30 @@ class cmd_archive(Command):
             help="Retrieve archive from specified remote repo",
         )
         parser.add_argument("committish", type=str, nargs="?")
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the archive command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        from .client import get_transport_and_path
+
+        parsed_args = self.get_parser().parse_args(args)
+        # Use binary buffer for archive output
+        outstream: BinaryIO = sys.stdout.buffer
+        errstream: BinaryIO = sys.stderr.buffer
         if parsed_args.remote:
             client, path = get_transport_and_path(parsed_args.remote)
 
             def stdout_write(data: bytes) -> None:
-                sys.stdout.buffer.write(data)
+                outstream.write(data)
 
             def stderr_write(data: bytes) -> None:
-                sys.stderr.buffer.write(data)
+                errstream.write(data)
 
             client.archive(
                 path.encode("utf-8") if isinstance(path, str) else path,
@@ -1129,9 +1177,6 @@ class cmd_archive(Command):
                 write_error=stderr_write,
             )
         else:
-            # Use binary buffer for archive output
-            outstream: BinaryIO = sys.stdout.buffer
-            errstream: BinaryIO = sys.stderr.buffer
             porcelain.archive(
                 ".",
                 parsed_args.committish,
@@ -1143,15 +1188,22 @@ class cmd_archive(Command):
 class cmd_add(Command):
     """Add file contents to the index."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the add command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("path", nargs="+")
+        return parser
+
     def run(self, argv: Sequence[str]) -> None:
         """Execute the add command.
 
         Args:
             argv: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("path", nargs="+")
-        args = parser.parse_args(argv)
+        from dulwich import porcelain
+
+        args = self.get_parser().parse_args(argv)
 
         # Convert '.' to None to add all files
         paths = args.path
@@ -1164,25 +1216,38 @@ class cmd_add(Command):
 class cmd_annotate(Command):
     """Annotate each line in a file with commit information."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the annotate command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("path", help="Path to file to annotate")
+        parser.add_argument("committish", nargs="?", help="Commit to start from")
+        return parser
+
     def run(self, argv: Sequence[str]) -> None:
         """Execute the annotate command.
 
         Args:
             argv: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("path", help="Path to file to annotate")
-        parser.add_argument("committish", nargs="?", help="Commit to start from")
-        args = parser.parse_args(argv)
+        from dulwich import porcelain
+
+        from .repo import Repo
+
+        args = self.get_parser().parse_args(argv)
 
         with Repo(".") as repo:
             config = repo.get_config_stack()
             with get_pager(config=config, cmd_name="annotate") as outstream:
                 results = porcelain.annotate(repo, args.path, args.committish)
-                for (commit, entry), line in results:
-                    # Show shortened commit hash and line content
-                    commit_hash = commit.id[:8]
-                    outstream.write(f"{commit_hash.decode()} {line.decode()}\n")
+                # Show shortened commit hash and line content, written in a
+                # single call rather than one (possibly flushed) write per line
+                outstream.write(
+                    b"".join(
+                        commit.id[:8] + b" " + line.rstrip(b"\n") + b"\n"
+                        for (commit, entry), line in results
+                    ).decode()
+                )
 
 
 class cmd_blame(Command):
@@ -1201,18 +1266,25 @@ class cmd_blame(Command):
 class cmd_rm(Command):
     """Remove files from the working tree and from the index."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the rm command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument(
+            "--cached", action="store_true", help="Remove from index only"
+        )
+        parser.add_argument("path", type=Path, nargs="+")
+        return parser
+
     def run(self, argv: Sequence[str]) -> None:
         """Execute the rm command.
 
         Args:
             argv: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument(
-            "--cached", action="store_true", help="Remove from index only"
-        )
-        parser.add_argument("path", type=Path, nargs="+")
-        args = parser.parse_args(argv)
+        from dulwich import porcelain
+
+        args = self.get_parser().parse_args(argv)
 
         porcelain.remove(".", paths=args.path, cached=args.cached)
 
@@ -1220,12 +1292,9 @@ class cmd_rm(Command):
 class cmd_mv(Command):
     """Move or rename a file, a directory, or a symlink."""
 
-    def run(self, argv: Sequence[str]) -> None:
-        """Execute the mv command.
-
-        Args:
-            argv: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the mv command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "-f",
@@ -1235,7 +1304,17 @@ class cmd_mv(Command):
         )
         parser.add_argument("source", type=Path)
         parser.add_argument("destination", type=Path)
-        args = parser.parse_args(argv)
+        return parser
+
+    def run(self, argv: Sequence[str]) -> None:
+        """Execute the mv command.
+
+        Args:
+            argv: Command line arguments
+        """
+        from dulwich import porcelain
+
+        args = self.get_parser().parse_args(argv)
 
         porcelain.mv(".", args.source, args.destination, force=args.force)
 
@@ -1243,17 +1322,27 @@ class cmd_mv(Command):
 class cmd_fetch_pack(Command):
     """Receive missing objects from another repository."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the fetch-pack command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("--all", action="store_true")
+        parser.add_argument("location", nargs="?", type=str)
+        parser.add_argument("refs", nargs="*", type=str)
+        return parser
+
     def run(self, argv: Sequence[str]) -> None:
         """Execute the fetch-pack command.
 
         Args:
             argv: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("--all", action="store_true")
-        parser.add_argument("location", nargs="?", type=str)
-        parser.add_argument("refs", nargs="*", type=str)
-        args = parser.parse_args(argv)
+        from .client import get_transport_and_path
+        from .objects import ObjectID
+        from .refs import Ref
+        from .repo import Repo
+
+        args = self.get_parser().parse_args(argv)
         client, path = get_transport_and_path(args.location)
         r = Repo(".")
         if args.all:
@@ -1275,12 +1364,9 @@ class cmd_fetch_pack(Command):
 class cmd_fetch(Command):
     """Download objects and refs from another repository."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the fetch command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the fetch command."""
         parser = argparse.ArgumentParser()
 
         # Mutually exclusive group for location vs --all
@@ -1317,12 +1403,21 @@ class cmd_fetch(Command):
             action="append",
             help="Deepen or shorten the history of a shallow repository to exclude commits reachable from a specified remote branch or tag",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
 
-        r = Repo(".")
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the fetch command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        from .repo import Repo
 
-        def progress(msg: bytes) -> None:
-            sys.stdout.buffer.write(msg)
+        parsed_args = self.get_parser().parse_args(args)
+
+        r = Repo(".")
 
         # Determine include_tags setting
         include_tags = False
@@ -1369,15 +1464,22 @@ class cmd_fetch(Command):
 class cmd_for_each_ref(Command):
     """Output information on each ref."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the for-each-ref command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("pattern", type=str, nargs="?")
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the for-each-ref command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("pattern", type=str, nargs="?")
-        parsed_args = parser.parse_args(args)
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
         for sha, object_type, ref in porcelain.for_each_ref(".", parsed_args.pattern):
             logger.info("%s %s\t%s", sha.decode(), object_type.decode(), ref.decode())
 
@@ -1385,14 +1487,21 @@ class cmd_for_each_ref(Command):
 class cmd_fsck(Command):
     """Verify the connectivity and validity of objects in the database."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the fsck command."""
+        parser = argparse.ArgumentParser()
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the fsck command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.parse_args(args)
+        from dulwich import porcelain
+
+        self.check_no_args(args)
         for obj, msg in porcelain.fsck("."):
             logger.info("%s: %s", obj.decode() if isinstance(obj, bytes) else obj, msg)
 
@@ -1400,12 +1509,9 @@ class cmd_fsck(Command):
 class cmd_log(Command):
     """Show commit logs."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the log command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the log command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "--reverse",
@@ -1418,7 +1524,19 @@ class cmd_log(Command):
             help="Print name/status for each changed file",
         )
         parser.add_argument("paths", nargs="*", help="Paths to show log for")
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the log command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        from .repo import Repo
+
+        parsed_args = self.get_parser().parse_args(args)
 
         with Repo(".") as repo:
             config = repo.get_config_stack()
@@ -1435,12 +1553,9 @@ class cmd_log(Command):
 class cmd_diff(Command):
     """Show changes between commits, commit and working tree, etc."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the diff command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the diff command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "committish", nargs="*", default=[], help="Commits or refs to compare"
@@ -1479,12 +1594,27 @@ class cmd_diff(Command):
         parser.add_argument("paths", nargs="*", default=[], help="Paths to limit diff")
 
         # Handle the -- separator for paths
-        if "--" in args:
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the diff command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        from .patch import DiffAlgorithmNotAvailable
+        from .repo import Repo
+
+        parser = self.get_parser()
+        try:
             sep_index = args.index("--")
+        except ValueError:
+            parsed_args = parser.parse_args(args)
+        else:
             parsed_args = parser.parse_args(args[:sep_index])
             parsed_args.paths = args[sep_index + 1 :]
-        else:
-            parsed_args = parser.parse_args(args)
 
         # Determine diff algorithm
         diff_algorithm = parsed_args.diff_algorithm
@@ -1590,12 +1720,11 @@ class cmd_diff(Command):
 class cmd_dump_pack(Command):
     """Dump the contents of a pack file for debugging."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the dump-pack command.
+    _DUMP_BATCH_SIZE = 4096
 
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the dump-pack command."""
         parser = argparse.ArgumentParser()
         parser.add_argument("filename", help="Pack file to dump")
         parser.add_argument(
@@ -1604,7 +1733,18 @@ class cmd_dump_pack(Command):
             default="sha1",
             help="Object format (hash algorithm) used in the pack file",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the dump-pack command.
+
+        Args:
+            args: Command line arguments
+        """
+        from .objects import RawObjectID, sha_to_hex
+        from .pack import Pack
+
+        parsed_args = self.get_parser().parse_args(args)
 
         from .object_format import OBJECT_FORMATS
 
@@ -1615,51 +1755,71 @@ class cmd_dump_pack(Command):
         logger.info("Checksum: %r", sha_to_hex(RawObjectID(x.get_stored_checksum())))
         x.check()
         logger.info("Length: %d", len(x))
+        # Emit the per-object lines in batches rather than as one log record
+        # each; pending lines are flushed before an error so ordering holds.
+        lines: list[str] = []
         for name in x:
             try:
-                logger.info("\t%s", x[name])
+                lines.append(f"\t{x[name]}")
             except KeyError as k:
+                if lines:
+                    logger.info("%s", "\n".join(lines))
+                    lines.clear()
                 logger.error(
                     "\t%s: Unable to resolve base %r",
                     name.decode("ascii", "replace"),
                     k,
                 )
             except ApplyDeltaError as e:
+                if lines:
+                    logger.info("%s", "\n".join(lines))
+                    lines.clear()
                 logger.error(
                     "\t%s: Unable to apply delta: %r",
                     name.decode("ascii", "replace"),
                     e,
                 )
+            else:
+                if len(lines) >= self._DUMP_BATCH_SIZE:
+                    logger.info("%s", "\n".join(lines))
+                    lines.clear()
+        if lines:
+            logger.info("%s", "\n".join(lines))
 
 
 class cmd_dump_index(Command):
     """Show information about a pack index file."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the dump-index command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("filename", help="Index file to dump")
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the dump-index command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("filename", help="Index file to dump")
-        parsed_args = parser.parse_args(args)
+        from .index import Index
+
+        parsed_args = self.get_parser().parse_args(args)
 
         idx = Index(parsed_args.filename)
 
-        for o in idx:
-            logger.info("%s %s", o, idx[o])
+        lines = [f"{o!r} {entry}" for o, entry in idx.items()]
+        if lines:
+            logger.info("%s", "\n".join(lines))
 
 
 class cmd_interpret_trailers(Command):
     """Add or parse structured information in commit messages."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the interpret-trailers command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the interpret-trailers command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "file",
@@ -1720,7 +1880,17 @@ class cmd_interpret_trailers(Command):
             default="add",
             help="Action if trailer is missing",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the interpret-trailers command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         # Read message from file or stdin
         if parsed_args.file:
@@ -1764,12 +1934,9 @@ class cmd_interpret_trailers(Command):
 class cmd_stripspace(Command):
     """Remove unnecessary whitespace from text."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the stripspace command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the stripspace command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "file",
@@ -1793,7 +1960,17 @@ class cmd_stripspace(Command):
             default="#",
             help="Comment character to use (default: #)",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the stripspace command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         # Read text from file or stdin
         if parsed_args.file:
@@ -1817,12 +1994,9 @@ class cmd_stripspace(Command):
 class cmd_column(Command):
     """Display data in columns."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the column command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the column command."""
         parser = argparse.ArgumentParser(
             description="Format input data into columns for better readability"
         )
@@ -1856,13 +2030,21 @@ class cmd_column(Command):
             default=1,
             help="Number of spaces between columns (default: 1)",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
 
-        # Read lines from stdin
-        lines = []
-        for line in sys.stdin:
-            # Strip the newline but keep the content
-            lines.append(line.rstrip("\n\r"))
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the column command.
+
+        Args:
+            args: Command line arguments
+        """
+        parsed_args = self.get_parser().parse_args(args)
+
+        # Read lines from stdin
+        lines = []
+        for line in sys.stdin:
+            # Strip the newline but keep the content
+            lines.append(line.rstrip("\n\r"))
 
         # Format and output
         result = format_columns(
@@ -1880,12 +2062,9 @@ class cmd_column(Command):
 class cmd_init(Command):
     """Create an empty Git repository or reinitialize an existing one."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the init command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the init command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "--bare", action="store_true", help="Create a bare repository"
@@ -1897,12 +2076,27 @@ class cmd_init(Command):
             help="Object format to use (sha1 or sha256)",
         )
         parser.add_argument(
-            "path", nargs="?", default=os.getcwd(), help="Repository path"
+            "path",
+            nargs="?",
+            help="Repository path (defaults to the current directory)",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the init command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
+        # Resolved here rather than as a parser default, since the parser is
+        # built once and cached on the class.
+        path = parsed_args.path if parsed_args.path is not None else os.getcwd()
 
         porcelain.init(
-            parsed_args.path,
+            path,
             bare=parsed_args.bare,
             object_format=parsed_args.objectformat,
         )
@@ -1911,12 +2105,9 @@ class cmd_init(Command):
 class cmd_clone(Command):
     """Clone a repository into a new directory."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the clone command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the clone command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "--bare",
@@ -1954,7 +2145,17 @@ class cmd_clone(Command):
         )
         parser.add_argument("source", help="Repository to clone from")
         parser.add_argument("target", nargs="?", help="Directory to clone into")
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the clone command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         try:
             porcelain.clone(
@@ -1974,10 +2175,12 @@ class cmd_clone(Command):
 
 def _get_commit_message_with_template(
     initial_message: bytes | None,
-    repo: Repo | None = None,
-    commit: Commit | None = None,
+    repo: "Repo | None" = None,
+    commit: "Commit | None" = None,
 ) -> bytes:
     """Get commit message with an initial message template."""
+    from .refs import HEADREF
+
     # Start with the initial message
     template = initial_message or b""
     if template and not template.endswith(b"\n"):
@@ -2021,12 +2224,9 @@ def _get_commit_message_with_template(
 class cmd_config(Command):
     """Get and set repository or global options."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the config command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the config command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "--global",
@@ -2070,6 +2270,17 @@ class cmd_config(Command):
             nargs="?",
             help="Config value to set",
         )
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the config command.
+
+        Args:
+            args: Command line arguments
+        """
+        from .repo import Repo
+
+        parser = self.get_parser()
         parsed_args = parser.parse_args(args)
 
         # Determine which config file to use
@@ -2237,12 +2448,9 @@ class cmd_config(Command):
 class cmd_commit(Command):
     """Record changes to the repository."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the commit command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the commit command."""
         parser = argparse.ArgumentParser()
         parser.add_argument("--message", "-m", help="Commit message")
         parser.add_argument(
@@ -2256,7 +2464,20 @@ class cmd_commit(Command):
             action="store_true",
             help="Replace the tip of the current branch by creating a new commit",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the commit command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        from .objects import Commit
+        from .repo import Repo
+
+        parsed_args = self.get_parser().parse_args(args)
 
         message: bytes | str | Callable[[Repo | None, Commit | None], bytes]
 
@@ -2298,16 +2519,23 @@ class cmd_commit(Command):
 class cmd_commit_tree(Command):
     """Create a new commit object from a tree."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the commit-tree command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("--message", "-m", required=True, help="Commit message")
+        parser.add_argument("tree", help="Tree SHA to commit")
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the commit-tree command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("--message", "-m", required=True, help="Commit message")
-        parser.add_argument("tree", help="Tree SHA to commit")
-        parsed_args = parser.parse_args(args)
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
         porcelain.commit_tree(".", tree=parsed_args.tree, message=parsed_args.message)
 
 
@@ -2320,23 +2548,30 @@ class cmd_update_server_info(Command):
         Args:
             args: Command line arguments
         """
+        from dulwich import porcelain
+
         porcelain.update_server_info(".")
 
 
 class cmd_symbolic_ref(Command):
     """Read, modify and delete symbolic refs."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the symbolic-ref command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("name", help="Symbolic reference name")
+        parser.add_argument("ref", nargs="?", help="Target reference")
+        parser.add_argument("--force", action="store_true", help="Force update")
+        return parser
+
     def run(self, args: Sequence[str]) -> int | None:
         """Execute the symbolic-ref command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("name", help="Symbolic reference name")
-        parser.add_argument("ref", nargs="?", help="Target reference")
-        parser.add_argument("--force", action="store_true", help="Force update")
-        parsed_args = parser.parse_args(args)
+        parsed_args = self.get_parser().parse_args(args)
 
         # If ref is provided, we're setting; otherwise we're reading
         if parsed_args.ref:
@@ -2375,18 +2610,24 @@ class cmd_symbolic_ref(Command):
 class cmd_pack_refs(Command):
     """Pack heads and tags for efficient repository access."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the pack-refs command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("--all", action="store_true")
+        # ignored, we never prune
+        parser.add_argument("--no-prune", action="store_true")
+        return parser
+
     def run(self, argv: Sequence[str]) -> None:
         """Execute the pack-refs command.
 
         Args:
             argv: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("--all", action="store_true")
-        # ignored, we never prune
-        parser.add_argument("--no-prune", action="store_true")
+        from dulwich import porcelain
 
-        args = parser.parse_args(argv)
+        args = self.get_parser().parse_args(argv)
 
         porcelain.pack_refs(".", all=args.all)
 
@@ -2394,12 +2635,9 @@ class cmd_pack_refs(Command):
 class cmd_var(Command):
     """Display Git logical variables."""
 
-    def run(self, argv: Sequence[str]) -> int | None:
-        """Execute the var command.
-
-        Args:
-            argv: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the var command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "variable",
@@ -2412,6 +2650,17 @@ class cmd_var(Command):
             action="store_true",
             help="List all variables",
         )
+        return parser
+
+    def run(self, argv: Sequence[str]) -> int | None:
+        """Execute the var command.
+
+        Args:
+            argv: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parser = self.get_parser()
         args = parser.parse_args(argv)
 
         if args.list:
@@ -2439,12 +2688,9 @@ class cmd_var(Command):
 class cmd_show(Command):
     """Show various types of objects."""
 
-    def run(self, argv: Sequence[str]) -> None:
-        """Execute the show command.
-
-        Args:
-            argv: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the show command."""
         parser = argparse.ArgumentParser()
         parser.add_argument("objectish", type=str, nargs="*")
         parser.add_argument(
@@ -2453,7 +2699,19 @@ class cmd_show(Command):
             default="auto",
             help="Use colored output (requires rich)",
         )
-        args = parser.parse_args(argv)
+        return parser
+
+    def run(self, argv: Sequence[str]) -> None:
+        """Execute the show command.
+
+        Args:
+            argv: Command line arguments
+        """
+        from dulwich import porcelain
+
+        from .repo import Repo
+
+        args = self.get_parser().parse_args(argv)
 
         # Determine if we should use color
         def _should_use_color() -> bool:
@@ -2498,14 +2756,9 @@ class cmd_show(Command):
 class cmd_show_ref(Command):
     """List references in a local repository."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the show-ref command.
-
-        Args:
-            args: Command line arguments
-        Returns:
-            Exit code (0 for success, 1 for error/no matches, 2 for missing ref with --exists)
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the show-ref command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "--head",
@@ -2566,7 +2819,21 @@ class cmd_show_ref(Command):
             nargs="*",
             help="Show references matching patterns",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the show-ref command.
+
+        Args:
+            args: Command line arguments
+        Returns:
+            Exit code (0 for success, 1 for error/no matches, 2 for missing ref with --exists)
+        """
+        from dulwich import porcelain
+
+        from .repo import Repo
+
+        parsed_args = self.get_parser().parse_args(args)
 
         # Handle --exists mode
         if parsed_args.exists:
@@ -2631,14 +2898,9 @@ class cmd_show_ref(Command):
 class cmd_show_branch(Command):
     """Show branches and their commits."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the show-branch command.
-
-        Args:
-            args: Command line arguments
-        Returns:
-            Exit code (0 for success, 1 for error)
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the show-branch command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "-r",
@@ -2698,7 +2960,19 @@ class cmd_show_branch(Command):
             nargs="*",
             help="Branches to show (default: all local branches)",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the show-branch command.
+
+        Args:
+            args: Command line arguments
+        Returns:
+            Exit code (0 for success, 1 for error)
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         try:
             output_lines = porcelain.show_branch(
@@ -2727,43 +3001,54 @@ class cmd_show_branch(Command):
 class cmd_diff_tree(Command):
     """Compare the content and mode of trees."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the diff-tree command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("old_tree", help="Old tree SHA")
+        parser.add_argument("new_tree", help="New tree SHA")
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the diff-tree command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("old_tree", help="Old tree SHA")
-        parser.add_argument("new_tree", help="New tree SHA")
-        parsed_args = parser.parse_args(args)
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
         porcelain.diff_tree(".", parsed_args.old_tree, parsed_args.new_tree)
 
 
 class cmd_rev_list(Command):
     """List commit objects in reverse chronological order."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the rev-list command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("commits", nargs="+", help="Commit IDs to list")
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the rev-list command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("commits", nargs="+", help="Commit IDs to list")
-        parsed_args = parser.parse_args(args)
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
         porcelain.rev_list(".", parsed_args.commits)
 
 
 class cmd_tag(Command):
     """Create, list, delete or verify a tag object."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the tag command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the tag command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "-a",
@@ -2775,7 +3060,17 @@ class cmd_tag(Command):
             "-s", "--sign", help="Sign the annotated tag.", action="store_true"
         )
         parser.add_argument("tag_name", help="Name of the tag to create")
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the tag command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
         porcelain.tag_create(
             ".",
             parsed_args.tag_name,
@@ -2787,15 +3082,9 @@ class cmd_tag(Command):
 class cmd_verify_commit(Command):
     """Check the GPG signature of commits."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the verify-commit command.
-
-        Args:
-            args: Command line arguments
-
-        Returns:
-            Exit code (1 on error, None on success)
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the verify-commit command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "-v",
@@ -2814,37 +3103,10 @@ class cmd_verify_commit(Command):
             default=["HEAD"],
             help="Commits to verify (defaults to HEAD)",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
 
-        exit_code = None
-        for commit in parsed_args.commits:
-            try:
-                if parsed_args.verbose:
-                    # Show commit contents before verification
-                    porcelain.show(
-                        ".",
-                        objects=[commit],
-                        outstream=sys.stdout,
-                    )
-                porcelain.verify_commit(".", commit)
-                if not parsed_args.raw:
-                    print(f"gpg: Good signature from commit '{commit}'")
-            except Exception as e:
-                if not parsed_args.raw:
-                    print(f"error: {commit}: {e}", file=sys.stderr)
-                else:
-                    # In raw mode, let the exception propagate
-                    raise
-                exit_code = 1
-
-        return exit_code
-
-
-class cmd_verify_tag(Command):
-    """Check the GPG signature of tags."""
-
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the verify-tag command.
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the verify-commit command.
 
         Args:
             args: Command line arguments
@@ -2852,6 +3114,43 @@ class cmd_verify_tag(Command):
         Returns:
             Exit code (1 on error, None on success)
         """
+        from dulwich import porcelain
+
+        from .repo import Repo
+
+        parsed_args = self.get_parser().parse_args(args)
+
+        exit_code = None
+        with Repo(".") as repo:
+            for commit in parsed_args.commits:
+                try:
+                    if parsed_args.verbose:
+                        # Show commit contents before verification
+                        porcelain.show(
+                            repo,
+                            objects=[commit],
+                            outstream=sys.stdout,
+                        )
+                    porcelain.verify_commit(repo, commit)
+                    if not parsed_args.raw:
+                        print(f"gpg: Good signature from commit '{commit}'")
+                except Exception as e:
+                    if not parsed_args.raw:
+                        print(f"error: {commit}: {e}", file=sys.stderr)
+                    else:
+                        # In raw mode, let the exception propagate
+                        raise
+                    exit_code = 1
+
+        return exit_code
+
+
+class cmd_verify_tag(Command):
+    """Check the GPG signature of tags."""
+
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the verify-tag command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "-v",
@@ -2865,28 +3164,44 @@ class cmd_verify_tag(Command):
             action="store_true",
         )
         parser.add_argument("tags", nargs="+", help="Tags to verify")
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the verify-tag command.
+
+        Args:
+            args: Command line arguments
+
+        Returns:
+            Exit code (1 on error, None on success)
+        """
+        from dulwich import porcelain
+
+        from .repo import Repo
+
+        parsed_args = self.get_parser().parse_args(args)
 
         exit_code = None
-        for tag in parsed_args.tags:
-            try:
-                if parsed_args.verbose:
-                    # Show tag contents before verification
-                    porcelain.show(
-                        ".",
-                        objects=[tag],
-                        outstream=sys.stdout,
-                    )
-                porcelain.verify_tag(".", tag)
-                if not parsed_args.raw:
-                    print(f"gpg: Good signature from tag '{tag}'")
-            except Exception as e:
-                if not parsed_args.raw:
-                    print(f"error: {tag}: {e}", file=sys.stderr)
-                else:
-                    # In raw mode, let the exception propagate
-                    raise
-                exit_code = 1
+        with Repo(".") as repo:
+            for tag in parsed_args.tags:
+                try:
+                    if parsed_args.verbose:
+                        # Show tag contents before verification
+                        porcelain.show(
+                            repo,
+                            objects=[tag],
+                            outstream=sys.stdout,
+                        )
+                    porcelain.verify_tag(repo, tag)
+                    if not parsed_args.raw:
+                        print(f"gpg: Good signature from tag '{tag}'")
+                except Exception as e:
+                    if not parsed_args.raw:
+                        print(f"error: {tag}: {e}", file=sys.stderr)
+                    else:
+                        # In raw mode, let the exception propagate
+                        raise
+                    exit_code = 1
 
         return exit_code
 
@@ -2894,31 +3209,35 @@ class cmd_verify_tag(Command):
 class cmd_repack(Command):
     """Pack unpacked objects in a repository."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the repack command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the repack command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "--write-bitmap-index",
             action="store_true",
             help="write a bitmap index for packs",
         )
-        parsed_args = parser.parse_args(args)
-        porcelain.repack(".", write_bitmaps=parsed_args.write_bitmap_index)
-
-
-class cmd_reflog(Command):
-    """Manage reflog information."""
+        return parser
 
     def run(self, args: Sequence[str]) -> None:
-        """Execute the reflog command.
+        """Execute the repack command.
 
         Args:
             args: Command line arguments
         """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
+        porcelain.repack(".", write_bitmaps=parsed_args.write_bitmap_index)
+
+
+class cmd_reflog(Command):
+    """Manage reflog information."""
+
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the reflog command."""
         parser = argparse.ArgumentParser(prog="dulwich reflog")
         subparsers = parser.add_subparsers(dest="subcommand", help="Subcommand")
 
@@ -2969,6 +3288,15 @@ class cmd_reflog(Command):
         )
 
         # If no arguments or first arg is not a subcommand, treat as show
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the reflog command.
+
+        Args:
+            args: Command line arguments
+        """
+        parser = self.get_parser()
         if not args or (args[0] not in ["show", "expire", "delete"]):
             # Parse as show command
             parsed_args = parser.parse_args(["show", *list(args)])
@@ -2984,41 +3312,40 @@ class cmd_reflog(Command):
 
     def _run_show(self, parsed_args: argparse.Namespace) -> None:
         """Show reflog entries."""
+        from dulwich import porcelain
+        from dulwich.reflog import Entry
+
+        from .repo import Repo
+
         with Repo(".") as repo:
             config = repo.get_config_stack()
             with get_pager(config=config, cmd_name="reflog") as outstream:
                 if parsed_args.all:
                     # Show reflogs for all refs
-                    for ref_bytes, entry in porcelain.reflog(repo, all=True):
-                        ref_str = ref_bytes.decode("utf-8", "replace")
-                        short_new = entry.new_sha[:8].decode("ascii")
-                        outstream.write(
-                            f"{short_new} {ref_str}: {entry.message.decode('utf-8', 'replace')}\n"
-                        )
+                    lines = [
+                        b"%s %s: %s\n" % (entry.new_sha[:8], ref_bytes, entry.message)
+                        for ref_bytes, entry in porcelain.reflog(repo, all=True)
+                    ]
                 else:
                     ref = (
                         parsed_args.ref.encode("utf-8")
                         if isinstance(parsed_args.ref, str)
                         else parsed_args.ref
                     )
-
+                    lines = []
                     for i, entry in enumerate(porcelain.reflog(repo, ref)):
-                        # Format similar to git reflog
-                        from dulwich.reflog import Entry
-
                         assert isinstance(entry, Entry)
-                        short_new = entry.new_sha[:8].decode("ascii")
-                        message = (
-                            entry.message.decode("utf-8", "replace")
-                            if entry.message
-                            else ""
-                        )
-                        outstream.write(
-                            f"{short_new} {ref.decode('utf-8', 'replace')}@{{{i}}}: {message}\n"
+                        # Format similar to git reflog
+                        lines.append(
+                            b"%s %s@{%d}: %s\n"
+                            % (entry.new_sha[:8], ref, i, entry.message or b"")
                         )
+                outstream.write(b"".join(lines).decode("utf-8", "replace"))
 
     def _run_expire(self, parsed_args: argparse.Namespace) -> None:
         """Expire reflog entries."""
+        from dulwich import porcelain
+
         # Parse time specifications
         expire_time = None
         expire_unreachable_time = None
@@ -3050,6 +3377,7 @@ class cmd_reflog(Command):
 
     def _run_delete(self, parsed_args: argparse.Namespace) -> None:
         """Delete a specific reflog entry."""
+        from dulwich import porcelain
         from dulwich.reflog import parse_reflog_spec
 
         # Parse refspec (e.g., "HEAD@{1}" or "refs/heads/master@{2}")
@@ -3068,12 +3396,9 @@ class cmd_reflog(Command):
 class cmd_reset(Command):
     """Reset current HEAD to the specified state."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the reset command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the reset command."""
         parser = argparse.ArgumentParser()
         mode_group = parser.add_mutually_exclusive_group()
         mode_group.add_argument(
@@ -3084,7 +3409,17 @@ class cmd_reset(Command):
             "--mixed", action="store_true", help="Reset HEAD and index"
         )
         parser.add_argument("treeish", nargs="?", help="Commit/tree to reset to")
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the reset command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         if parsed_args.hard:
             mode = "hard"
@@ -3103,12 +3438,9 @@ class cmd_reset(Command):
 class cmd_revert(Command):
     """Revert some existing commits."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the revert command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the revert command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "--no-commit",
@@ -3118,7 +3450,17 @@ class cmd_revert(Command):
         )
         parser.add_argument("-m", "--message", help="Custom commit message")
         parser.add_argument("commits", nargs="+", help="Commits to revert")
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the revert command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         result = porcelain.revert(
             ".",
@@ -3134,14 +3476,9 @@ class cmd_revert(Command):
 class cmd_daemon(Command):
     """Run a simple Git protocol server."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the daemon command.
-
-        Args:
-            args: Command line arguments
-        """
-        from dulwich import log_utils
-
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the daemon command."""
         from .protocol import TCP_GIT_PORT
 
         parser = argparse.ArgumentParser()
@@ -3161,7 +3498,17 @@ class cmd_daemon(Command):
         parser.add_argument(
             "gitdir", nargs="?", default=".", help="Git directory to serve"
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the daemon command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import log_utils, porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         log_utils.default_logging_config()
         porcelain.daemon(
@@ -3174,14 +3521,9 @@ class cmd_daemon(Command):
 class cmd_web_daemon(Command):
     """Run a simple HTTP server for Git repositories."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the web-daemon command.
-
-        Args:
-            args: Command line arguments
-        """
-        from dulwich import log_utils
-
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the web-daemon command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "-l",
@@ -3199,7 +3541,17 @@ class cmd_web_daemon(Command):
         parser.add_argument(
             "gitdir", nargs="?", default=".", help="Git directory to serve"
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the web-daemon command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import log_utils, porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         log_utils.default_logging_config()
         porcelain.web_daemon(
@@ -3212,63 +3564,91 @@ class cmd_web_daemon(Command):
 class cmd_write_tree(Command):
     """Create a tree object from the current index."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the write-tree command."""
+        parser = argparse.ArgumentParser()
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the write-tree command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.parse_args(args)
+        from dulwich import porcelain
+
+        self.check_no_args(args)
         sys.stdout.write("{}\n".format(porcelain.write_tree(".").decode()))
 
 
 class cmd_receive_pack(Command):
     """Receive what is pushed into the repository."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the receive-pack command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("gitdir", nargs="?", default=".", help="Git directory")
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the receive-pack command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("gitdir", nargs="?", default=".", help="Git directory")
-        parsed_args = parser.parse_args(args)
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
         porcelain.receive_pack(parsed_args.gitdir)
 
 
 class cmd_upload_pack(Command):
     """Send objects packed back to git-fetch-pack."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the upload-pack command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("gitdir", nargs="?", default=".", help="Git directory")
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the upload-pack command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("gitdir", nargs="?", default=".", help="Git directory")
-        parsed_args = parser.parse_args(args)
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
         porcelain.upload_pack(parsed_args.gitdir)
 
 
 class cmd_shortlog(Command):
     """Show a shortlog of commits by author."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the shortlog command with the given CLI arguments.
-
-        Args:
-            args: List of command line arguments.
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the shortlog command."""
         parser = argparse.ArgumentParser()
         parser.add_argument("gitdir", nargs="?", default=".", help="Git directory")
         parser.add_argument("--summary", action="store_true", help="Show summary only")
         parser.add_argument(
             "--sort", action="store_true", help="Sort authors by commit count"
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the shortlog command with the given CLI arguments.
+
+        Args:
+            args: List of command line arguments.
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         shortlog_items: list[dict[str, str]] = porcelain.shortlog(
             repo=parsed_args.gitdir,
@@ -3292,12 +3672,9 @@ class cmd_shortlog(Command):
 class cmd_status(Command):
     """Show the working tree status."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the status command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the status command."""
         parser = argparse.ArgumentParser()
         parser.add_argument("gitdir", nargs="?", default=".", help="Git directory")
         parser.add_argument(
@@ -3305,71 +3682,91 @@ class cmd_status(Command):
             action="store_true",
             help="Display untracked files in columns",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the status command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
         status = porcelain.status(parsed_args.gitdir)
+        # Paths come back as filesystem bytes, so emit them as-is rather than
+        # decoding each one only for the text layer to encode it again.
+        out = bytearray()
         if any(names for (kind, names) in status.staged.items()):
-            sys.stdout.write("Changes to be committed:\n\n")
+            out += b"Changes to be committed:\n\n"
             for kind, names in status.staged.items():
+                kind_bytes = kind.encode("ascii")
                 for name in names:
-                    sys.stdout.write(f"\t{kind}: {os.fsdecode(name)}\n")
-            sys.stdout.write("\n")
+                    out += b"\t%s: %s\n" % (kind_bytes, name)
+            out += b"\n"
         if status.unstaged:
-            sys.stdout.write("Changes not staged for commit:\n\n")
+            out += b"Changes not staged for commit:\n\n"
             for name in status.unstaged:
-                sys.stdout.write(f"\t{os.fsdecode(name)}\n")
-            sys.stdout.write("\n")
+                out += b"\t%s\n" % name
+            out += b"\n"
         if status.untracked:
-            sys.stdout.write("Untracked files:\n\n")
+            out += b"Untracked files:\n\n"
             if parsed_args.column:
                 # Format untracked files in columns
                 untracked_names = [os.fsdecode(name) for name in status.untracked]
                 output = format_columns(untracked_names, mode="column", indent="\t")
-                sys.stdout.write(output)
+                out += os.fsencode(output)
             else:
                 for name in status.untracked:
-                    sys.stdout.write(f"\t{os.fsdecode(name)}\n")
-            sys.stdout.write("\n")
+                    out += b"\t%s\n" % name
+            out += b"\n"
+        sys.stdout.buffer.write(out)
 
 
 class cmd_ls_remote(Command):
     """List references in a remote repository."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the ls-remote command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument(
+            "--symref", action="store_true", help="Show symbolic references"
+        )
+        parser.add_argument("url", help="Remote URL to list references from")
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the ls-remote command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument(
-            "--symref", action="store_true", help="Show symbolic references"
-        )
-        parser.add_argument("url", help="Remote URL to list references from")
-        parsed_args = parser.parse_args(args)
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
         result = porcelain.ls_remote(parsed_args.url)
 
+        lines = []
         if parsed_args.symref:
             # Show symrefs first, like git does
             for ref, target in sorted(result.symrefs.items()):
                 if target:
-                    sys.stdout.write(f"ref: {target.decode()}\t{ref.decode()}\n")
+                    lines.append(b"ref: " + target + b"\t" + ref + b"\n")
 
         # Show regular refs
-        for ref in sorted(result.refs):
-            sha = result.refs[ref]
+        for ref, sha in sorted(result.refs.items()):
             if sha is not None:
-                sys.stdout.write(f"{sha.decode()}\t{ref.decode()}\n")
+                lines.append(sha + b"\t" + ref + b"\n")
+        sys.stdout.write(b"".join(lines).decode())
 
 
 class cmd_ls_tree(Command):
     """List the contents of a tree object."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the ls-tree command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the ls-tree command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "-r",
@@ -3381,7 +3778,19 @@ class cmd_ls_tree(Command):
             "--name-only", action="store_true", help="Only display name."
         )
         parser.add_argument("treeish", nargs="?", help="Tree-ish to list")
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the ls-tree command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        from .repo import Repo
+
+        parsed_args = self.get_parser().parse_args(args)
         with Repo(".") as repo:
             config = repo.get_config_stack()
             with get_pager(config=config, cmd_name="ls-tree") as outstream:
@@ -3397,12 +3806,9 @@ class cmd_ls_tree(Command):
 class cmd_pack_objects(Command):
     """Create a packed archive of objects."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the pack-objects command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the pack-objects command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "--stdout", action="store_true", help="Write pack to stdout"
@@ -3412,18 +3818,30 @@ class cmd_pack_objects(Command):
             "--no-reuse-deltas", action="store_true", help="Don't reuse existing deltas"
         )
         parser.add_argument("basename", nargs="?", help="Base name for pack files")
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the pack-objects command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        from .objects import ObjectID
+
+        parser = self.get_parser()
         parsed_args = parser.parse_args(args)
 
         if not parsed_args.stdout and not parsed_args.basename:
             parser.error("basename required when not using --stdout")
 
-        object_ids = [ObjectID(line.strip().encode()) for line in sys.stdin.readlines()]
+        object_ids = [ObjectID(sha) for sha in sys.stdin.buffer.read().split()]
         deltify = parsed_args.deltify
         reuse_deltas = not parsed_args.no_reuse_deltas
 
         if parsed_args.stdout:
-            packf = getattr(sys.stdout, "buffer", sys.stdout)
-            assert isinstance(packf, BinaryIO)
+            packf: BinaryIO = sys.stdout.buffer
             idxf = None
             close = []
         else:
@@ -3441,15 +3859,22 @@ class cmd_pack_objects(Command):
 class cmd_unpack_objects(Command):
     """Unpack objects from a packed archive."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the unpack-objects command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("pack_file", help="Pack file to unpack")
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the unpack-objects command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("pack_file", help="Pack file to unpack")
-        parsed_args = parser.parse_args(args)
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         count = porcelain.unpack_objects(parsed_args.pack_file)
         logger.info("Unpacked %d objects", count)
@@ -3458,17 +3883,9 @@ class cmd_unpack_objects(Command):
 class cmd_prune(Command):
     """Prune all unreachable objects from the object database."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the prune command.
-
-        Args:
-            args: Command line arguments
-        """
-        import datetime
-        import time
-
-        from dulwich.object_store import DEFAULT_TEMPFILE_GRACE_PERIOD
-
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the prune command."""
         parser = argparse.ArgumentParser(
             description="Remove temporary pack files left behind by interrupted operations"
         )
@@ -3490,23 +3907,29 @@ class cmd_prune(Command):
             action="store_true",
             help="Report all actions",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the prune command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+        from dulwich.object_store import DEFAULT_TEMPFILE_GRACE_PERIOD
+
+        parsed_args = self.get_parser().parse_args(args)
 
         # Parse expire grace period
         grace_period = DEFAULT_TEMPFILE_GRACE_PERIOD
         if parsed_args.expire:
-            from .approxidate import parse_relative_time
+            from .approxidate import parse_grace_period
 
             try:
-                grace_period = parse_relative_time(parsed_args.expire)
+                grace_period = parse_grace_period(parsed_args.expire)
             except ValueError:
-                # Try to parse as absolute date
-                try:
-                    date = datetime.datetime.strptime(parsed_args.expire, "%Y-%m-%d")
-                    grace_period = int(time.time() - date.timestamp())
-                except ValueError:
-                    logger.error("Invalid expire date: %s", parsed_args.expire)
-                    return 1
+                logger.error("Invalid expire date: %s", parsed_args.expire)
+                return 1
 
         # Progress callback
         def progress(msg: str) -> None:
@@ -3529,18 +3952,25 @@ class cmd_prune(Command):
 class cmd_pull(Command):
     """Fetch from and integrate with another repository or a local branch."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the pull command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("from_location", type=str)
+        parser.add_argument("refspec", type=str, nargs="*")
+        parser.add_argument("--filter", type=str, nargs=1)
+        parser.add_argument("--protocol", type=int)
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the pull command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("from_location", type=str)
-        parser.add_argument("refspec", type=str, nargs="*")
-        parser.add_argument("--filter", type=str, nargs=1)
-        parser.add_argument("--protocol", type=int)
-        parsed_args = parser.parse_args(args)
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
         porcelain.pull(
             ".",
             remote_location=parsed_args.from_location or None,
@@ -3553,17 +3983,24 @@ class cmd_pull(Command):
 class cmd_push(Command):
     """Update remote refs along with associated objects."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the push command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("-f", "--force", action="store_true", help="Force")
+        parser.add_argument("to_location", type=str)
+        parser.add_argument("refspec", type=str, nargs="*")
+        return parser
+
     def run(self, argv: Sequence[str]) -> int | None:
         """Execute the push command.
 
         Args:
             argv: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("-f", "--force", action="store_true", help="Force")
-        parser.add_argument("to_location", type=str)
-        parser.add_argument("refspec", type=str, nargs="*")
-        args = parser.parse_args(argv)
+        from dulwich import porcelain
+
+        args = self.get_parser().parse_args(argv)
         try:
             porcelain.push(
                 ".", args.to_location, args.refspec or None, force=args.force
@@ -3578,16 +4015,23 @@ class cmd_push(Command):
 class cmd_remote_add(Command):
     """Add a remote repository."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the remote-add command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("name", help="Name of the remote")
+        parser.add_argument("url", help="URL of the remote")
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the remote-add command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("name", help="Name of the remote")
-        parser.add_argument("url", help="URL of the remote")
-        parsed_args = parser.parse_args(args)
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
         porcelain.remote_add(".", parsed_args.name, parsed_args.url)
 
 
@@ -3631,14 +4075,21 @@ class cmd_remote(SuperCommand):
 class cmd_submodule_list(Command):
     """List submodules."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the submodule-list command."""
+        parser = argparse.ArgumentParser()
+        return parser
+
     def run(self, argv: Sequence[str]) -> None:
         """Execute the submodule-list command.
 
         Args:
             argv: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.parse_args(argv)
+        from dulwich import porcelain
+
+        self.check_no_args(argv)
         for path, sha in porcelain.submodule_list("."):
             sys.stdout.write(f" {sha} {path}\n")
 
@@ -3646,43 +4097,54 @@ class cmd_submodule_list(Command):
 class cmd_submodule_init(Command):
     """Initialize submodules."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the submodule-init command."""
+        parser = argparse.ArgumentParser()
+        return parser
+
     def run(self, argv: Sequence[str]) -> None:
         """Execute the submodule-init command.
 
         Args:
             argv: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.parse_args(argv)
+        from dulwich import porcelain
+
+        self.check_no_args(argv)
         porcelain.submodule_init(".")
 
 
 class cmd_submodule_add(Command):
     """Add a submodule."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the submodule-add command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("url", help="URL of repository to add as submodule")
+        parser.add_argument("path", nargs="?", help="Path where submodule should live")
+        parser.add_argument("--name", help="Name for the submodule")
+        return parser
+
     def run(self, argv: Sequence[str]) -> None:
         """Execute the submodule-add command.
 
         Args:
             argv: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("url", help="URL of repository to add as submodule")
-        parser.add_argument("path", nargs="?", help="Path where submodule should live")
-        parser.add_argument("--name", help="Name for the submodule")
-        args = parser.parse_args(argv)
+        from dulwich import porcelain
+
+        args = self.get_parser().parse_args(argv)
         porcelain.submodule_add(".", args.url, args.path, args.name)
 
 
 class cmd_submodule_update(Command):
     """Update submodules."""
 
-    def run(self, argv: Sequence[str]) -> None:
-        """Execute the submodule-update command.
-
-        Args:
-            argv: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the submodule-update command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "--init", action="store_true", help="Initialize submodules first"
@@ -3700,7 +4162,17 @@ class cmd_submodule_update(Command):
         parser.add_argument(
             "paths", nargs="*", help="Specific submodule paths to update"
         )
-        args = parser.parse_args(argv)
+        return parser
+
+    def run(self, argv: Sequence[str]) -> None:
+        """Execute the submodule-update command.
+
+        Args:
+            argv: Command line arguments
+        """
+        from dulwich import porcelain
+
+        args = self.get_parser().parse_args(argv)
         paths = args.paths if args.paths else None
         porcelain.submodule_update(
             ".", paths=paths, init=args.init, force=args.force, recursive=args.recursive
@@ -3723,48 +4195,62 @@ class cmd_submodule(SuperCommand):
 class cmd_check_ignore(Command):
     """Check whether files are excluded by gitignore."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the check-ignore command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("paths", nargs="+", help="Paths to check")
+        return parser
+
     def run(self, args: Sequence[str]) -> int:
         """Execute the check-ignore command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("paths", nargs="+", help="Paths to check")
-        parsed_args = parser.parse_args(args)
-        ret = 1
-        for path in porcelain.check_ignore(".", parsed_args.paths):
-            logger.info(path)
-            ret = 0
-        return ret
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
+        ignored = list(porcelain.check_ignore(".", parsed_args.paths))
+        if not ignored:
+            return 1
+        logger.info("%s", "\n".join(ignored))
+        return 0
 
 
 class cmd_check_mailmap(Command):
     """Show canonical names and email addresses of contacts."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the check-mailmap command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("identities", nargs="+", help="Identities to check")
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the check-mailmap command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("identities", nargs="+", help="Identities to check")
-        parsed_args = parser.parse_args(args)
-        for identity in parsed_args.identities:
-            canonical_identity = porcelain.check_mailmap(".", identity)
-            logger.info(canonical_identity)
+        from dulwich import porcelain
+
+        from .repo import Repo
+
+        parsed_args = self.get_parser().parse_args(args)
+        with Repo(".") as repo:
+            for identity in parsed_args.identities:
+                canonical_identity = porcelain.check_mailmap(repo, identity)
+                logger.info(canonical_identity)
 
 
 class cmd_branch(Command):
     """List, create, or delete branches."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the branch command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the branch command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "branch",
@@ -3805,7 +4291,17 @@ class cmd_branch(Command):
             const=None,
             help="List branches matching a pattern",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the branch command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         def print_branches(
             branches: Iterator[bytes] | Sequence[bytes], use_columns: bool = False
@@ -3873,12 +4369,9 @@ class cmd_branch(Command):
 class cmd_checkout(Command):
     """Switch branches or restore working tree files."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the checkout command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the checkout command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "target",
@@ -3897,7 +4390,17 @@ class cmd_checkout(Command):
             type=str,
             help="Create a new branch at the target and switch to it",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the checkout command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
         if not parsed_args.target:
             logger.error("Usage: dulwich checkout TARGET [--force] [-b NEW_BRANCH]")
             return 1
@@ -3918,12 +4421,9 @@ class cmd_checkout(Command):
 class cmd_restore(Command):
     """Restore working tree files."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the restore command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the restore command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "paths",
@@ -3947,7 +4447,17 @@ class cmd_restore(Command):
             action="store_true",
             help="Restore files in the working tree",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the restore command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         # If neither --staged nor --worktree is specified, default to --worktree
         if not parsed_args.staged and not parsed_args.worktree:
@@ -3974,12 +4484,9 @@ class cmd_restore(Command):
 class cmd_switch(Command):
     """Switch branches."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the switch command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the switch command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "target",
@@ -4004,7 +4511,17 @@ class cmd_switch(Command):
             action="store_true",
             help="Switch to a commit in detached HEAD state",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the switch command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         if not parsed_args.target:
             logger.error(
@@ -4029,14 +4546,19 @@ class cmd_switch(Command):
 class cmd_stash_list(Command):
     """List stash entries."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the stash-list command."""
+        parser = argparse.ArgumentParser()
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the stash-list command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.parse_args(args)
+        self.check_no_args(args)
         from .repo import Repo
         from .stash import Stash
 
@@ -4053,14 +4575,21 @@ class cmd_stash_list(Command):
 class cmd_stash_push(Command):
     """Save your local modifications to a new stash."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the stash-push command."""
+        parser = argparse.ArgumentParser()
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the stash-push command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.parse_args(args)
+        from dulwich import porcelain
+
+        self.check_no_args(args)
         porcelain.stash_push(".")
         logger.info("Saved working directory and index state")
 
@@ -4068,14 +4597,21 @@ class cmd_stash_push(Command):
 class cmd_stash_pop(Command):
     """Apply a stash and remove it from the stash list."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the stash-pop command."""
+        parser = argparse.ArgumentParser()
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the stash-pop command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.parse_args(args)
+        from dulwich import porcelain
+
+        self.check_no_args(args)
         porcelain.stash_pop(".")
         logger.info("Restored working directory and index state")
 
@@ -4085,12 +4621,9 @@ class cmd_bisect(SuperCommand):
 
     subcommands: ClassVar[dict[str, type[Command]]] = {}
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the bisect command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the bisect command."""
         parser = argparse.ArgumentParser(prog="dulwich bisect")
         subparsers = parser.add_subparsers(dest="subcommand", help="bisect subcommands")
 
@@ -4138,13 +4671,28 @@ class cmd_bisect(SuperCommand):
 
         # bisect help
         subparsers.add_parser("help", help="Show help")
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the bisect command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        from .objects import Commit, ObjectID
+        from .repo import Repo
 
+        parser = self.get_parser()
         parsed_args = parser.parse_args(args)
 
         if not parsed_args.subcommand:
             parser.print_help()
             return 1
 
+        # Commit to check out next, reported once after dispatch
+        next_sha = None
         try:
             if parsed_args.subcommand == "start":
                 next_sha = porcelain.bisect_start(
@@ -4155,20 +4703,12 @@ class cmd_bisect(SuperCommand):
                     term_bad=parsed_args.term_bad,
                     term_good=parsed_args.term_good,
                 )
-                if next_sha:
-                    logger.info(
-                        "Bisecting: checking out '%s'", next_sha.decode("ascii")
-                    )
 
             elif parsed_args.subcommand == "bad":
-                next_sha = porcelain.bisect_bad(rev=parsed_args.rev)
-                if next_sha:
-                    logger.info(
-                        "Bisecting: checking out '%s'", next_sha.decode("ascii")
-                    )
-                else:
-                    # Bisect complete - find the first bad commit
-                    with porcelain.open_repo_closing(".") as r:
+                with Repo(".") as r:
+                    next_sha = porcelain.bisect_bad(r, rev=parsed_args.rev)
+                    if not next_sha:
+                        # Bisect complete - find the first bad commit
                         bad_ref = os.path.join(r.controldir(), "refs", "bisect", "bad")
                         with open(bad_ref, "rb") as f:
                             bad_sha = ObjectID(f.read().strip())
@@ -4177,27 +4717,18 @@ class cmd_bisect(SuperCommand):
                         message = commit.message.decode(
                             "utf-8", errors="replace"
                         ).split("\n")[0]
-                        logger.info(
-                            "%s is the first bad commit", bad_sha.decode("ascii")
-                        )
-                        logger.info("commit %s", bad_sha.decode("ascii"))
+                        bad_hex = bad_sha.decode("ascii")
+                        logger.info("%s is the first bad commit", bad_hex)
+                        logger.info("commit %s", bad_hex)
                         logger.info("    %s", message)
 
             elif parsed_args.subcommand == "good":
                 next_sha = porcelain.bisect_good(rev=parsed_args.rev)
-                if next_sha:
-                    logger.info(
-                        "Bisecting: checking out '%s'", next_sha.decode("ascii")
-                    )
 
             elif parsed_args.subcommand == "skip":
                 next_sha = porcelain.bisect_skip(
                     revs=parsed_args.revs if parsed_args.revs else None
                 )
-                if next_sha:
-                    logger.info(
-                        "Bisecting: checking out '%s'", next_sha.decode("ascii")
-                    )
 
             elif parsed_args.subcommand == "reset":
                 porcelain.bisect_reset(commit=parsed_args.commit)
@@ -4221,6 +4752,8 @@ class cmd_bisect(SuperCommand):
             logger.error("%s", e)
             return 1
 
+        if next_sha:
+            logger.info("Bisecting: checking out '%s'", next_sha.decode("ascii"))
         return 0
 
 
@@ -4237,35 +4770,56 @@ class cmd_stash(SuperCommand):
 class cmd_ls_files(Command):
     """Show information about files in the index and working tree."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the ls-files command."""
+        parser = argparse.ArgumentParser()
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the ls-files command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.parse_args(args)
-        for name in porcelain.ls_files("."):
-            logger.info(name)
+        from dulwich import porcelain
+
+        self.check_no_args(args)
+        names = porcelain.ls_files(".")
+        if names:
+            logger.info("%s", os.fsdecode(b"\n".join(names)))
 
 
 class cmd_describe(Command):
     """Give an object a human readable name based on an available ref."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the describe command."""
+        parser = argparse.ArgumentParser()
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the describe command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.parse_args(args)
+        from dulwich import porcelain
+
+        self.check_no_args(args)
         logger.info(porcelain.describe("."))
 
 
 class cmd_diagnose(Command):
     """Display diagnostic information about the Python environment."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the diagnose command."""
+        parser = argparse.ArgumentParser()
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the diagnose command.
 
@@ -4273,8 +4827,7 @@ class cmd_diagnose(Command):
             args: Command line arguments
         """
         # TODO: Support creating zip files with diagnostic information
-        parser = argparse.ArgumentParser()
-        parser.parse_args(args)
+        self.check_no_args(args)
 
         # Python version and executable
         logger.info("Python version: %s", sys.version)
@@ -4332,12 +4885,9 @@ class cmd_diagnose(Command):
 class cmd_merge(Command):
     """Join two or more development histories together."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the merge command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the merge command."""
         parser = argparse.ArgumentParser()
         parser.add_argument("commit", type=str, nargs="+", help="Commit(s) to merge")
         parser.add_argument(
@@ -4347,7 +4897,17 @@ class cmd_merge(Command):
             "--no-ff", action="store_true", help="Force create a merge commit"
         )
         parser.add_argument("-m", "--message", type=str, help="Merge commit message")
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the merge command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         try:
             # If multiple commits are provided, pass them as a list
@@ -4366,9 +4926,11 @@ class cmd_merge(Command):
             )
 
             if conflicts:
-                logger.warning("Merge conflicts in %d file(s):", len(conflicts))
-                for conflict_path in conflicts:
-                    logger.warning("  %s", conflict_path.decode())
+                logger.warning(
+                    "Merge conflicts in %d file(s):\n%s",
+                    len(conflicts),
+                    "\n".join(f"  {path.decode()}" for path in conflicts),
+                )
                 if len(parsed_args.commit) > 1:
                     logger.error(
                         "Octopus merge failed; refusing to merge with conflicts."
@@ -4403,12 +4965,9 @@ class cmd_merge(Command):
 class cmd_merge_base(Command):
     """Find the best common ancestor between commits."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the merge-base command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the merge-base command."""
         parser = argparse.ArgumentParser(
             description="Find the best common ancestor between commits",
             prog="dulwich merge-base",
@@ -4430,7 +4989,17 @@ class cmd_merge_base(Command):
             action="store_true",
             help="List commits not reachable from others",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the merge-base command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         try:
             if parsed_args.is_ancestor:
@@ -4469,19 +5038,26 @@ class cmd_merge_base(Command):
 class cmd_notes_add(Command):
     """Add notes to a commit."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the notes-add command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the notes-add command."""
         parser = argparse.ArgumentParser()
         parser.add_argument("object", help="Object to annotate")
         parser.add_argument("-m", "--message", help="Note message", required=True)
         parser.add_argument(
             "--ref", default="commits", help="Notes ref (default: commits)"
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the notes-add command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         porcelain.notes_add(
             ".", parsed_args.object, parsed_args.message, ref=parsed_args.ref
@@ -4491,18 +5067,25 @@ class cmd_notes_add(Command):
 class cmd_notes_show(Command):
     """Show notes for a commit."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the notes-show command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("object", help="Object to show notes for")
+        parser.add_argument(
+            "--ref", default="commits", help="Notes ref (default: commits)"
+        )
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the notes-show command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("object", help="Object to show notes for")
-        parser.add_argument(
-            "--ref", default="commits", help="Notes ref (default: commits)"
-        )
-        parsed_args = parser.parse_args(args)
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         note = porcelain.notes_show(".", parsed_args.object, ref=parsed_args.ref)
         if note:
@@ -4514,18 +5097,25 @@ class cmd_notes_show(Command):
 class cmd_notes_remove(Command):
     """Remove notes for a commit."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the notes-remove command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("object", help="Object to remove notes from")
+        parser.add_argument(
+            "--ref", default="commits", help="Notes ref (default: commits)"
+        )
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the notes-remove command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("object", help="Object to remove notes from")
-        parser.add_argument(
-            "--ref", default="commits", help="Notes ref (default: commits)"
-        )
-        parsed_args = parser.parse_args(args)
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         result = porcelain.notes_remove(".", parsed_args.object, ref=parsed_args.ref)
         if result:
@@ -4537,21 +5127,33 @@ class cmd_notes_remove(Command):
 class cmd_notes_list(Command):
     """List all note objects."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the notes-list command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument(
+            "--ref", default="commits", help="Notes ref (default: commits)"
+        )
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the notes-list command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument(
-            "--ref", default="commits", help="Notes ref (default: commits)"
-        )
-        parsed_args = parser.parse_args(args)
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
-        notes = porcelain.notes_list(".", ref=parsed_args.ref)
-        for object_sha, note_content in notes:
-            logger.info(object_sha.hex())
+        notes = porcelain.notes_list_shas(".", ref=parsed_args.ref)
+        if notes:
+            logger.info(
+                "%s",
+                b"\n".join(
+                    note_sha + b" " + object_sha for object_sha, note_sha in notes
+                ).decode("ascii"),
+            )
 
 
 class cmd_notes(SuperCommand):
@@ -4570,25 +5172,41 @@ class cmd_notes(SuperCommand):
 class cmd_replace_list(Command):
     """List all replacement refs."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the replace-list command."""
+        parser = argparse.ArgumentParser()
+        return parser
+
     def run(self, args: Sequence[str]) -> None:
         """Execute the replace-list command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser()
-        parser.parse_args(args)
+        from dulwich import porcelain
+
+        self.check_no_args(args)
 
         replacements = porcelain.replace_list(".")
-        for object_sha, replacement_sha in replacements:
-            sys.stdout.write(
-                f"{object_sha.decode('ascii')} -> {replacement_sha.decode('ascii')}\n"
-            )
+        sys.stdout.write(
+            b"".join(
+                object_sha + b" -> " + replacement_sha + b"\n"
+                for object_sha, replacement_sha in replacements
+            ).decode("ascii")
+        )
 
 
 class cmd_replace_delete(Command):
     """Delete a replacement ref."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the replace-delete command."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("object", help="Object whose replacement should be removed")
+        return parser
+
     def run(self, args: Sequence[str]) -> int | None:
         """Execute the replace-delete command.
 
@@ -4598,9 +5216,9 @@ class cmd_replace_delete(Command):
         Returns:
             Exit code (0 for success, 1 for error)
         """
-        parser = argparse.ArgumentParser()
-        parser.add_argument("object", help="Object whose replacement should be removed")
-        parsed_args = parser.parse_args(args)
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         try:
             porcelain.replace_delete(".", parsed_args.object)
@@ -4621,6 +5239,14 @@ class cmd_replace(SuperCommand):
 
     default_command = cmd_replace_list
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the replace create form."""
+        parser = argparse.ArgumentParser()
+        parser.add_argument("object", help="Object to replace")
+        parser.add_argument("replacement", help="Replacement object")
+        return parser
+
     def run(self, args: Sequence[str]) -> int | None:
         """Execute the replace command.
 
@@ -4630,13 +5256,12 @@ class cmd_replace(SuperCommand):
         Returns:
             Exit code (0 for success, 1 for error)
         """
+        from dulwich import porcelain
+
         # Special case: if we have exactly 2 args and no subcommand, treat as create
         if len(args) == 2 and args[0] not in self.subcommands:
             # This is the create form: git replace <object> <replacement>
-            parser = argparse.ArgumentParser()
-            parser.add_argument("object", help="Object to replace")
-            parser.add_argument("replacement", help="Replacement object")
-            parsed_args = parser.parse_args(args)
+            parsed_args = self.get_parser().parse_args(args)
 
             porcelain.replace_create(".", parsed_args.object, parsed_args.replacement)
             logger.info(
@@ -4653,15 +5278,9 @@ class cmd_replace(SuperCommand):
 class cmd_cherry(Command):
     """Find commits not merged upstream."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the cherry command.
-
-        Args:
-            args: Command line arguments
-
-        Returns:
-            Exit code (0 for success, 1 for error)
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the cherry command."""
         parser = argparse.ArgumentParser(description="Find commits not merged upstream")
         parser.add_argument(
             "-v",
@@ -4684,7 +5303,20 @@ class cmd_cherry(Command):
             nargs="?",
             help="Limit commits to those after this ref",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the cherry command.
+
+        Args:
+            args: Command line arguments
+
+        Returns:
+            Exit code (0 for success, 1 for error)
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         try:
             results = porcelain.cherry(
@@ -4718,12 +5350,9 @@ class cmd_cherry(Command):
 class cmd_cherry_pick(Command):
     """Apply the changes introduced by some existing commits."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the cherry-pick command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the cherry-pick command."""
         parser = argparse.ArgumentParser(
             description="Apply the changes introduced by some existing commits"
         )
@@ -4745,6 +5374,17 @@ class cmd_cherry_pick(Command):
             action="store_true",
             help="Abort the current cherry-pick operation",
         )
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the cherry-pick command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parser = self.get_parser()
         parsed_args = parser.parse_args(args)
 
         # Check argument validity
@@ -4793,12 +5433,9 @@ class cmd_cherry_pick(Command):
 class cmd_merge_tree(Command):
     """Show three-way merge without touching index."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the merge-tree command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the merge-tree command."""
         parser = argparse.ArgumentParser(
             description="Perform a tree-level merge without touching the working directory"
         )
@@ -4815,7 +5452,17 @@ class cmd_merge_tree(Command):
             action="store_true",
             help="Output only conflict paths, null-terminated",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the merge-tree command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         try:
             # Determine base tree - if only two parsed_args provided, base is None
@@ -4836,18 +5483,18 @@ class cmd_merge_tree(Command):
 
             if parsed_args.name_only:
                 # Output only conflict paths, null-terminated
-                for conflict_path in conflicts:
-                    sys.stdout.buffer.write(conflict_path)
-                    sys.stdout.buffer.write(b"\0")
+                sys.stdout.buffer.write(b"".join(path + b"\0" for path in conflicts))
             else:
                 # Output the merged tree SHA
                 logger.info(merged_tree_id.decode("ascii"))
 
                 # Output conflict information
                 if conflicts:
-                    logger.warning("\nConflicts in %d file(s):", len(conflicts))
-                    for conflict_path in conflicts:
-                        logger.warning("  %s", conflict_path.decode())
+                    logger.warning(
+                        "\nConflicts in %d file(s):\n%s",
+                        len(conflicts),
+                        "\n".join(f"  {path.decode()}" for path in conflicts),
+                    )
 
             return None
 
@@ -4862,15 +5509,9 @@ class cmd_merge_tree(Command):
 class cmd_gc(Command):
     """Cleanup unnecessary files and optimize the local repository."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the gc command.
-
-        Args:
-            args: Command line arguments
-        """
-        import datetime
-        import time
-
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the gc command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "--auto",
@@ -4905,23 +5546,28 @@ class cmd_gc(Command):
             action="store_true",
             help="Only report errors",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the gc command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         # Parse prune grace period
         grace_period = None
         if parsed_args.prune:
-            from .approxidate import parse_relative_time
+            from .approxidate import parse_grace_period
 
             try:
-                grace_period = parse_relative_time(parsed_args.prune)
+                grace_period = parse_grace_period(parsed_args.prune)
             except ValueError:
-                # Try to parse as absolute date
-                try:
-                    date = datetime.datetime.strptime(parsed_args.prune, "%Y-%m-%d")
-                    grace_period = int(time.time() - date.timestamp())
-                except ValueError:
-                    logger.error("Invalid prune date: %s", parsed_args.prune)
-                    return 1
+                logger.error("Invalid prune date: %s", parsed_args.prune)
+                return 1
         elif not parsed_args.no_prune:
             # Default to 2 weeks
             grace_period = 1209600
@@ -4945,25 +5591,22 @@ class cmd_gc(Command):
             # Report results
             if not parsed_args.quiet:
                 if parsed_args.dry_run:
-                    logger.info("\nDry run results:")
-            if not parsed_args.quiet:
-                if parsed_args.dry_run:
-                    print("\nDry run results:")
+                    report = ["\nDry run results:"]
                 else:
-                    logger.info("\nGarbage collection complete:")
+                    report = ["\nGarbage collection complete:"]
 
                 if stats.pruned_objects:
-                    logger.info(
-                        "  Pruned %d unreachable objects", len(stats.pruned_objects)
+                    report.append(
+                        f"  Pruned {len(stats.pruned_objects)} unreachable objects"
                     )
-                    logger.info("  Freed %s", format_bytes(stats.bytes_freed))
+                    report.append(f"  Freed {format_bytes(stats.bytes_freed)}")
 
                 if stats.packs_before != stats.packs_after:
-                    logger.info(
-                        "  Reduced pack files from %d to %d",
-                        stats.packs_before,
-                        stats.packs_after,
+                    report.append(
+                        f"  Reduced pack files from {stats.packs_before} "
+                        f"to {stats.packs_after}"
                     )
+                logger.info("%s", "\n".join(report))
 
         except porcelain.Error as e:
             logger.error("%s", e)
@@ -4972,14 +5615,11 @@ class cmd_gc(Command):
 
 
 class cmd_maintenance(Command):
-    """Run tasks to optimize Git repository data."""
-
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the maintenance command.
+    """Run tasks to optimize Git repository data."""
 
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the maintenance command."""
         parser = argparse.ArgumentParser(
             description="Run tasks to optimize Git repository data"
         )
@@ -5025,7 +5665,17 @@ class cmd_maintenance(Command):
             action="store_true",
             help="Don't error if repository is not registered",
         )
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the maintenance command.
 
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parser = self.get_parser()
         parsed_args = parser.parse_args(args)
 
         if not parsed_args.subcommand:
@@ -5090,12 +5740,9 @@ class cmd_maintenance(Command):
 class cmd_grep(Command):
     """Search for patterns in tracked files."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the grep command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the grep command."""
         parser = argparse.ArgumentParser()
         parser.add_argument("pattern", help="Regular expression pattern to search for")
         parser.add_argument(
@@ -5132,7 +5779,19 @@ class cmd_grep(Command):
             action="store_true",
             help="Do not respect .gitignore patterns",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the grep command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        from .repo import Repo
+
+        parsed_args = self.get_parser().parse_args(args)
 
         # Handle the case where revision might be a pathspec
         revision = parsed_args.revision
@@ -5163,12 +5822,9 @@ class cmd_grep(Command):
 class cmd_count_objects(Command):
     """Count unpacked number of objects and their disk consumption."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the count-objects command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the count-objects command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "-v",
@@ -5176,34 +5832,45 @@ class cmd_count_objects(Command):
             action="store_true",
             help="Display verbose information.",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the count-objects command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         if parsed_args.verbose:
             stats = porcelain.count_objects(".", verbose=True)
-            # Display verbose output
-            logger.info("count: %d", stats.count)
-            logger.info("size: %d", stats.size // 1024)  # Size in KiB
-            assert stats.in_pack is not None
-            logger.info("in-pack: %d", stats.in_pack)
-            assert stats.packs is not None
-            logger.info("packs: %d", stats.packs)
-            assert stats.size_pack is not None
-            logger.info("size-pack: %d", stats.size_pack // 1024)  # Size in KiB
+            if stats.in_pack is None or stats.packs is None or stats.size_pack is None:
+                logger.error("verbose object statistics unavailable")
+                return 1
+            # Display verbose output; sizes are in KiB
+            logger.info(
+                "count: %d\nsize: %d\nin-pack: %d\npacks: %d\nsize-pack: %d",
+                stats.count,
+                stats.size // 1024,
+                stats.in_pack,
+                stats.packs,
+                stats.size_pack // 1024,
+            )
         else:
             # Simple output
             stats = porcelain.count_objects(".", verbose=False)
             logger.info("%d objects, %d kilobytes", stats.count, stats.size // 1024)
+        return None
 
 
 class cmd_rebase(Command):
     """Reapply commits on top of another base tip."""
 
-    def run(self, args: Sequence[str]) -> int:
-        """Execute the rebase command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the rebase command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "upstream", nargs="?", help="Upstream branch to rebase onto"
@@ -5232,104 +5899,203 @@ class cmd_rebase(Command):
         parser.add_argument(
             "--skip", action="store_true", help="Skip current commit and continue"
         )
-        parsed_args = parser.parse_args(args)
+        return parser
 
-        # Handle abort/continue/skip first
-        if parsed_args.abort:
-            try:
-                porcelain.rebase(".", parsed_args.upstream or "HEAD", abort=True)
-                logger.info("Rebase aborted.")
-            except porcelain.Error as e:
-                logger.error("%s", e)
-                return 1
-            return 0
+    def run(self, args: Sequence[str]) -> int:
+        """Execute the rebase command.
 
-        if parsed_args.continue_rebase:
-            try:
-                # Check if interactive rebase is in progress
-                if porcelain.is_interactive_rebase("."):
-                    result = porcelain.rebase(
-                        ".",
-                        parsed_args.upstream or "HEAD",
-                        continue_rebase=True,
-                        interactive=True,
-                    )
-                    if result:
-                        logger.info("Rebase complete.")
-                    else:
-                        logger.info("Rebase paused. Use --continue to resume.")
-                else:
-                    new_shas = porcelain.rebase(
-                        ".", parsed_args.upstream or "HEAD", continue_rebase=True
-                    )
-                    logger.info("Rebase complete.")
-            except porcelain.Error as e:
-                logger.error("%s", e)
-                return 1
-            return 0
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
 
-        if parsed_args.edit_todo:
-            # Edit todo list for interactive rebase
-            try:
-                porcelain.rebase(".", parsed_args.upstream or "HEAD", edit_todo=True)
-                logger.info("Todo list updated.")
-            except porcelain.Error as e:
-                logger.error("%s", e)
-                return 1
-            return 0
+        from .repo import Repo
+
+        parsed_args = self.get_parser().parse_args(args)
 
-        # Normal rebase requires upstream
-        if not parsed_args.upstream:
+        # abort/continue/edit-todo take precedence over starting a new rebase
+        mode_kwargs: dict[str, Any]
+        if parsed_args.abort:
+            mode_kwargs = {"abort": True}
+        elif parsed_args.continue_rebase:
+            mode_kwargs = {"continue_rebase": True}
+        elif parsed_args.edit_todo:
+            mode_kwargs = {"edit_todo": True}
+        elif not parsed_args.upstream:
+            # Normal rebase requires upstream
             logger.error("Missing required argument 'upstream'")
             return 1
+        else:
+            mode_kwargs = {
+                "onto": parsed_args.onto,
+                "branch": parsed_args.branch,
+                "interactive": parsed_args.interactive,
+            }
 
         try:
-            if parsed_args.interactive:
-                # Interactive rebase
-                result = porcelain.rebase(
-                    ".",
-                    parsed_args.upstream,
-                    onto=parsed_args.onto,
-                    branch=parsed_args.branch,
-                    interactive=True,
-                )
-                if result:
-                    logger.info(
-                        "Interactive rebase started. Edit the todo list and save."
-                    )
-                else:
-                    logger.info("No commits to rebase.")
-            else:
-                # Regular rebase
+            with Repo(".") as r:
+                # Check if interactive rebase is in progress
+                if parsed_args.continue_rebase and porcelain.is_interactive_rebase(r):
+                    mode_kwargs["interactive"] = True
                 new_shas = porcelain.rebase(
-                    ".",
-                    parsed_args.upstream,
-                    onto=parsed_args.onto,
-                    branch=parsed_args.branch,
+                    r, parsed_args.upstream or "HEAD", **mode_kwargs
                 )
-
-                if new_shas:
-                    logger.info("Successfully rebased %d commits.", len(new_shas))
-                else:
-                    logger.info("Already up to date.")
-            return 0
-
         except porcelain.Error as e:
             logger.error("%s", e)
             return 1
 
+        if parsed_args.abort:
+            logger.info("Rebase aborted.")
+        elif parsed_args.continue_rebase:
+            if new_shas or not mode_kwargs.get("interactive"):
+                logger.info("Rebase complete.")
+            else:
+                logger.info("Rebase paused. Use --continue to resume.")
+        elif parsed_args.edit_todo:
+            logger.info("Todo list updated.")
+        elif parsed_args.interactive:
+            if new_shas:
+                logger.info("Interactive rebase started. Edit the todo list and save.")
+            else:
+                logger.info("No commits to rebase.")
+        elif new_shas:
+            logger.info("Successfully rebased %d commits.", len(new_shas))
+        else:
+            logger.info("Already up to date.")
+        return 0
 
-class cmd_filter_branch(Command):
-    """Rewrite branches."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the filter-branch command.
+def _write_chunks(fd: int, chunks: Sequence[bytes]) -> None:
+    """Write all of chunks to a file descriptor without joining them.
+
+    Args:
+      fd: File descriptor open for writing
+      chunks: Byte strings to write, in order
+    """
+    views = [memoryview(chunk) for chunk in chunks if chunk]
+    writev = getattr(os, "writev", None)
+    while views:
+        if writev is not None:
+            # Stay within IOV_MAX, which is 1024 on common platforms
+            written = writev(fd, views[:1024])
+        else:
+            written = os.write(fd, views[0])
+        # Drop what was written; short writes resume mid-chunk
+        while views and written >= len(views[0]):
+            written -= len(views[0])
+            views.pop(0)
+        if written:
+            views[0] = views[0][written:]
+
+
+# Characters that need a shell to interpret: operators, redirections,
+# expansions, globs, quoting, comments and variable assignments
+_SHELL_METACHARS_RE = re.compile(r"[|&;<>()$`\\\"'*?\[\]{}#~=!\n]")
+
+
+class _FilterShell:
+    """Long-running shell that executes filter-branch commands.
+
+    Starting /bin/sh through subprocess for every rewritten commit dominates
+    long filter-branch runs, so commands are instead written to a single
+    shell's stdin. Each one is run through ``eval`` in a subshell, which keeps
+    directory changes and variables from leaking into the next invocation and
+    turns syntax errors into a non-zero exit status rather than a desynced
+    command stream. Filters that read and write data get their input and
+    output through files in a private directory.
+    """
+
+    def __init__(self, env: Mapping[str, str]) -> None:
+        """Start the shell.
 
         Args:
-            args: Command line arguments
+          env: Environment for the shell and the commands it runs
+        """
+        import secrets
+
+        self._sentinel = f"__dulwich_filter_done_{secrets.token_hex(8)}__".encode()
+        self._proc = subprocess.Popen(
+            ["/bin/sh", "-s"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            env=env,
+        )
+        self._tmpdir: str | None = None
+
+    def run(self, cmd: str, cwd: str | None = None) -> bool:
+        """Run a command, discarding its output.
+
+        Args:
+          cmd: Shell command to run
+          cwd: Directory to run the command in
+        Returns: True if the command exited successfully
         """
-        import subprocess
+        import shlex
 
+        prefix = f"cd {shlex.quote(cwd)} && " if cwd is not None else ""
+        return self._run(f"({prefix}eval {shlex.quote(cmd)}) </dev/null >/dev/null")
+
+    def filter(self, cmd: str, input_data: bytes) -> bytes | None:
+        """Run a command with input_data on stdin, capturing its stdout.
+
+        Args:
+          cmd: Shell command to run
+          input_data: Data to feed to the command
+        Returns: The command's output, or None if it failed
+        """
+        import shlex
+        import tempfile
+
+        if self._tmpdir is None:
+            self._tmpdir = tempfile.mkdtemp(prefix="dulwich-filter-")
+        in_path = os.path.join(self._tmpdir, "in")
+        out_path = os.path.join(self._tmpdir, "out")
+        with open(in_path, "wb") as f:
+            f.write(input_data)
+        if not self._run(
+            f"(eval {shlex.quote(cmd)}) "
+            f"<{shlex.quote(in_path)} >{shlex.quote(out_path)}"
+        ):
+            return None
+        with open(out_path, "rb") as f:
+            return f.read()
+
+    def _run(self, command: str) -> bool:
+        assert self._proc.stdin is not None
+        assert self._proc.stdout is not None
+        script = f"{command} 2>/dev/null\necho {self._sentinel.decode()} $?\n"
+        try:
+            self._proc.stdin.write(script.encode())
+            self._proc.stdin.flush()
+        except BrokenPipeError:
+            return False
+        line = self._proc.stdout.readline()
+        if not line.startswith(self._sentinel):
+            # The shell went away
+            return False
+        return line[len(self._sentinel) :].strip() == b"0"
+
+    def close(self) -> None:
+        """Shut down the shell."""
+        if self._proc.stdin is not None:
+            try:
+                self._proc.stdin.close()
+            except BrokenPipeError:
+                pass
+        if self._proc.stdout is not None:
+            self._proc.stdout.close()
+        self._proc.wait()
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+
+class cmd_filter_branch(Command):
+    """Rewrite branches."""
+
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the filter-branch command."""
         parser = argparse.ArgumentParser(description="Rewrite branches")
 
         # Supported Git-compatible options
@@ -5343,6 +6109,15 @@ class cmd_filter_branch(Command):
         parser.add_argument("--index-filter", type=str, help="Index filter command")
         parser.add_argument("--parent-filter", type=str, help="Parent filter command")
         parser.add_argument("--msg-filter", type=str, help="Message filter command")
+        parser.add_argument(
+            "--parallel-msg-filter",
+            action="store_true",
+            help=(
+                "Run --msg-filter once per distinct message, in parallel and in "
+                "no particular order, before rewriting; only for filters that "
+                "keep no state between runs"
+            ),
+        )
         parser.add_argument("--commit-filter", type=str, help="Commit filter command")
         parser.add_argument(
             "--tag-name-filter", type=str, help="Tag name filter command"
@@ -5367,8 +6142,23 @@ class cmd_filter_branch(Command):
         parser.add_argument(
             "branch", nargs="?", default="HEAD", help="Branch or ref to rewrite"
         )
+        return parser
 
-        parsed_args = parser.parse_args(args)
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the filter-branch command.
+
+        Args:
+            args: Command line arguments
+        """
+        import threading
+
+        from dulwich import porcelain
+
+        from .objects import Commit, ObjectID, valid_hexsha
+        from .refs import Ref
+        from .repo import Repo
+
+        parsed_args = self.get_parser().parse_args(args)
 
         # Track if any filter fails
         filter_error = False
@@ -5384,80 +6174,207 @@ class cmd_filter_branch(Command):
             extra_env: dict[str, str] | None = None,
         ) -> bytes | None:
             nonlocal filter_error
-            filter_env = env.copy()
-            if extra_env:
-                filter_env.update(extra_env)
-            result = subprocess.run(
-                cmd,
-                shell=True,
-                input=input_data,
-                cwd=cwd,
-                env=filter_env,
-                capture_output=True,
-            )
+            # The shared env is never mutated, so only copy it for overrides
+            filter_env = {**env, **extra_env} if extra_env else env
+            # Plain "program arg..." filters do not need a shell in between
+            argv: str | list[str] = cmd
+            if sys.platform != "win32" and not _SHELL_METACHARS_RE.search(cmd):
+                argv = cmd.split() or cmd
+            try:
+                result = subprocess.run(
+                    argv,
+                    shell=isinstance(argv, str),
+                    input=input_data,
+                    cwd=cwd,
+                    env=filter_env,
+                    capture_output=True,
+                )
+            except OSError:
+                if isinstance(argv, str):
+                    raise
+                # Not an executable (e.g. a shell builtin); let the shell decide
+                result = subprocess.run(
+                    cmd,
+                    shell=True,
+                    input=input_data,
+                    cwd=cwd,
+                    env=filter_env,
+                    capture_output=True,
+                )
             if result.returncode != 0:
                 filter_error = True
                 return None
             return result.stdout
 
+        # Filters run once per commit, so rather than starting a shell for
+        # every run each thread reuses a long-running one of its own
+        filter_shells: list[_FilterShell] = []
+        thread_state = threading.local()
+
+        def get_shell() -> _FilterShell:
+            shell = getattr(thread_state, "shell", None)
+            if shell is None:
+                shell = thread_state.shell = _FilterShell(env)
+                filter_shells.append(shell)
+            return shell
+
+        def run_data_filter(cmd: str, input_data: bytes) -> bytes | None:
+            nonlocal filter_error
+            if sys.platform == "win32":
+                return run_filter(cmd, input_data=input_data)
+            result = get_shell().filter(cmd, input_data)
+            if result is None:
+                filter_error = True
+            return result
+
+        # Message filter output, keyed by original message; only filled in
+        # up front with --parallel-msg-filter
+        filtered_messages: dict[bytes, bytes | None] = {}
+
         # Create filter functions based on arguments
         filter_message = None
         if parsed_args.msg_filter:
 
             def filter_message(message: bytes) -> bytes:
-                result = run_filter(parsed_args.msg_filter, input_data=message)
+                if message in filtered_messages:
+                    result = filtered_messages[message]
+                else:
+                    result = run_data_filter(parsed_args.msg_filter, message)
                 return result if result is not None else message
 
         tree_filter = None
         if parsed_args.tree_filter:
 
             def tree_filter(tree_sha: ObjectID, tmpdir: str) -> ObjectID:
-                from dulwich.objects import Blob, Tree
+                nonlocal filter_error
+                from collections import Counter
+
+                from dulwich.objects import (
+                    S_IFGITLINK,
+                    S_ISGITLINK,
+                    Blob,
+                    ShaFile,
+                    Tree,
+                )
 
-                # Export tree to tmpdir
-                with Repo(".") as r:
-                    tree = r.object_store[tree_sha]
-                    assert isinstance(tree, Tree)
-                    for entry in tree.iteritems():
-                        assert entry.path is not None
-                        assert entry.sha is not None
-                        path = Path(tmpdir) / entry.path.decode()
-                        obj = r.object_store[entry.sha]
-                        if isinstance(obj, Tree):
-                            path.mkdir(exist_ok=True)
-                        else:
-                            assert isinstance(obj, Blob)
-                            path.write_bytes(obj.data)
-
-                    # Run the filter command in the temp directory
+                # Export tree to tmpdir, using the repository opened below
+                entries = list(r.object_store.iter_tree_contents(tree_sha))
+                created_dirs = {tmpdir}
+                # Submodules are checked out as empty directories; remember
+                # their commits so they can be put back as gitlinks
+                gitlinks: dict[str, ObjectID] = {}
+                # Only blobs that occur more than once are kept after being
+                # written, and only until their last occurrence
+                remaining = Counter(
+                    entry.sha
+                    for entry in entries
+                    if entry.mode is not None and not S_ISGITLINK(entry.mode)
+                )
+                blob_chunks: dict[ObjectID, list[bytes]] = {}
+                for entry in entries:
+                    assert entry.path is not None
+                    assert entry.mode is not None
+                    assert entry.sha is not None
+                    path = os.path.join(tmpdir, os.fsdecode(entry.path))
+                    parent = os.path.dirname(path)
+                    if parent not in created_dirs:
+                        os.makedirs(parent, exist_ok=True)
+                        created_dirs.add(parent)
+                    if S_ISGITLINK(entry.mode):
+                        os.mkdir(path)
+                        created_dirs.add(path)
+                        gitlinks[os.path.normpath(path)] = entry.sha
+                        continue
+                    chunks = blob_chunks.pop(entry.sha, None)
+                    if chunks is None:
+                        blob = r.object_store[entry.sha]
+                        assert isinstance(blob, Blob)
+                        chunks = blob.chunked
+                    remaining[entry.sha] -= 1
+                    if remaining[entry.sha]:
+                        blob_chunks[entry.sha] = chunks
+                    if stat.S_ISLNK(entry.mode) and sys.platform != "win32":
+                        os.symlink(b"".join(chunks), path)
+                        continue
+                    # Set the executable bit at creation instead of a chmod
+                    fd = os.open(
+                        path,
+                        os.O_WRONLY
+                        | os.O_CREAT
+                        | os.O_EXCL
+                        | getattr(os, "O_BINARY", 0),
+                        0o777 if entry.mode & 0o100 else 0o666,
+                    )
+                    try:
+                        # Write the chunks as stored rather than joining
+                        # them into one copy of the blob first
+                        _write_chunks(fd, chunks)
+                    finally:
+                        os.close(fd)
+
+                # Run the filter command in the temp directory
+                if sys.platform == "win32":
                     run_filter(parsed_args.tree_filter, cwd=tmpdir)
-
-                    # Rebuild tree from modified temp directory
-                    def build_tree_from_dir(dir_path: str) -> ObjectID:
-                        tree = Tree()
-                        for name in sorted(os.listdir(dir_path)):
-                            if name.startswith("."):
+                else:
+                    if not get_shell().run(parsed_args.tree_filter, cwd=tmpdir):
+                        filter_error = True
+
+                # Rebuild tree from modified temp directory. Directories are
+                # scanned parent-first, so building them in reverse order
+                # completes every subtree before the tree that contains it.
+                trees: dict[str, Tree] = {}
+                new_objects: list[ShaFile] = []
+                pending = [tmpdir]
+                scanned: list[str] = []
+                while pending:
+                    dir_path = pending.pop()
+                    scanned.append(dir_path)
+                    tree = trees[dir_path] = Tree()
+                    with os.scandir(dir_path) as it:
+                        for dir_entry in it:
+                            if dir_entry.name.startswith("."):
+                                continue
+                            if dir_entry.is_symlink():
+                                blob = Blob.from_string(
+                                    os.fsencode(os.readlink(dir_entry.path))
+                                )
+                                file_mode = 0o120000
+                            elif dir_entry.is_dir():
+                                try:
+                                    submodule_sha = gitlinks[
+                                        os.path.normpath(dir_entry.path)
+                                    ]
+                                except KeyError:
+                                    pending.append(dir_entry.path)
+                                else:
+                                    tree.add(
+                                        os.fsencode(dir_entry.name),
+                                        S_IFGITLINK,
+                                        submodule_sha,
+                                    )
                                 continue
-                            path = os.path.join(dir_path, name)
-                            if os.path.isdir(path):
-                                subtree_sha = build_tree_from_dir(path)
-                                tree.add(name.encode(), 0o040000, subtree_sha)
                             else:
-                                with open(path, "rb") as f:
-                                    data = f.read()
-                                blob = Blob.from_string(data)
-                                r.object_store.add_object(blob)
-                                # Use appropriate file mode
-                                mode = os.stat(path).st_mode
-                                if mode & 0o100:
+                                with open(dir_entry.path, "rb") as f:
+                                    blob = Blob.from_string(f.read())
+                                if dir_entry.stat().st_mode & 0o100:
                                     file_mode = 0o100755
                                 else:
                                     file_mode = 0o100644
-                                tree.add(name.encode(), file_mode, blob.id)
-                        r.object_store.add_object(tree)
-                        return tree.id
-
-                    return build_tree_from_dir(tmpdir)
+                            new_objects.append(blob)
+                            tree.add(os.fsencode(dir_entry.name), file_mode, blob.id)
+                for dir_path in reversed(scanned):
+                    tree = trees[dir_path]
+                    new_objects.append(tree)
+                    if dir_path != tmpdir:
+                        trees[os.path.dirname(dir_path)].add(
+                            os.fsencode(os.path.basename(dir_path)), 0o040000, tree.id
+                        )
+                # Most of the rebuilt tree is unchanged; only store objects
+                # that are new, rather than rewriting packed ones as loose
+                for obj in new_objects:
+                    if obj.id not in r.object_store:
+                        r.object_store.add_object(obj)
+                return trees[tmpdir].id
 
         index_filter = None
         if parsed_args.index_filter:
@@ -5472,22 +6389,15 @@ class cmd_filter_branch(Command):
         if parsed_args.parent_filter:
 
             def parent_filter(parents: Sequence[ObjectID]) -> list[ObjectID]:
-                parent_str = " ".join(p.hex() for p in parents)
+                # Object IDs are already hex, so they are passed as-is
                 result = run_filter(
-                    parsed_args.parent_filter, input_data=parent_str.encode()
+                    parsed_args.parent_filter, input_data=b" ".join(parents)
                 )
                 if result is None:
                     return list(parents)
 
-                output = result.decode().strip()
-                if not output:
-                    return []
-                new_parents = []
-                for sha in output.split():
-                    sha_bytes = sha.encode()
-                    if valid_hexsha(sha_bytes):
-                        new_parents.append(ObjectID(sha_bytes))
-                return new_parents
+                # SHAs are ASCII, so the output is parsed without decoding it
+                return [ObjectID(sha) for sha in result.split() if valid_hexsha(sha)]
 
         commit_filter = None
         if parsed_args.commit_filter:
@@ -5496,54 +6406,83 @@ class cmd_filter_branch(Command):
                 commit_obj: Commit, tree_sha: ObjectID
             ) -> ObjectID | None:
                 # The filter receives: tree parent1 parent2...
-                cmd_input = tree_sha.hex()
-                for parent in commit_obj.parents:
-                    cmd_input += " " + parent.hex()
+                cmd_input = b" ".join([tree_sha, *commit_obj.parents])
 
                 result = run_filter(
                     parsed_args.commit_filter,
-                    input_data=cmd_input.encode(),
-                    extra_env={"GIT_COMMIT": commit_obj.id.hex()},
+                    input_data=cmd_input,
+                    extra_env={"GIT_COMMIT": commit_obj.id.decode("ascii")},
                 )
                 if result is None:
                     return None
 
-                output = result.decode().strip()
+                output = result.strip()
                 if not output:
                     return None  # Skip commit
 
                 if valid_hexsha(output):
-                    return ObjectID(output.encode())
+                    return ObjectID(output)
                 return None
 
         tag_name_filter = None
         if parsed_args.tag_name_filter:
 
             def tag_name_filter(tag_name: bytes) -> bytes:
-                result = run_filter(parsed_args.tag_name_filter, input_data=tag_name)
+                result = run_data_filter(parsed_args.tag_name_filter, tag_name)
                 return result if result is not None else tag_name
 
         # Open repo once
         with Repo(".") as r:
             # Check for refs/original if not forcing
             if not parsed_args.force:
-                original_prefix = parsed_args.original.encode() + b"/"
-                for ref in r.refs.allkeys():
-                    if ref.startswith(original_prefix):
-                        logger.error("Cannot create a new backup.")
-                        logger.error(
-                            "A previous backup already exists in %s/",
-                            parsed_args.original,
-                        )
-                        logger.error("Force overwriting the backup with -f")
-                        print("Cannot create a new backup.")
-                        print(
-                            f"A previous backup already exists in {parsed_args.original}/"
-                        )
-                        print("Force overwriting the backup with -f")
-                        return 1
+                # Only the refs under the backup namespace need to be listed
+                original_prefix = Ref(parsed_args.original.encode() + b"/")
+                if r.refs.subkeys(original_prefix):
+                    logger.error("Cannot create a new backup.")
+                    logger.error(
+                        "A previous backup already exists in %s/",
+                        parsed_args.original,
+                    )
+                    logger.error("Force overwriting the backup with -f")
+                    print("Cannot create a new backup.")
+                    print(
+                        f"A previous backup already exists in {parsed_args.original}/"
+                    )
+                    print("Force overwriting the backup with -f")
+                    return 1
 
             try:
+                if parsed_args.msg_filter and parsed_args.parallel_msg_filter:
+                    from concurrent.futures import ThreadPoolExecutor
+
+                    from .objectspec import parse_commit
+
+                    # For stateless filters messages only depend on the
+                    # original commits, so filter them all up front. The work
+                    # happens in child processes, so threads are enough to run
+                    # them in parallel.
+                    try:
+                        head = parse_commit(r, parsed_args.branch)
+                    except (KeyError, ValueError):
+                        # Left for filter_branch to report
+                        pass
+                    else:
+                        messages = list(
+                            {entry.commit.message for entry in r.get_walker([head.id])}
+                        )
+                        with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                            filtered_messages.update(
+                                zip(
+                                    messages,
+                                    executor.map(
+                                        lambda message: run_data_filter(
+                                            parsed_args.msg_filter, message
+                                        ),
+                                        messages,
+                                    ),
+                                )
+                            )
+
                 # Call porcelain.filter_branch with the repo object
                 result = porcelain.filter_branch(
                     r,
@@ -5586,6 +6525,9 @@ class cmd_filter_branch(Command):
             except porcelain.Error as e:
                 logger.error("%s", e)
                 return 1
+            finally:
+                for shell in filter_shells:
+                    shell.close()
 
 
 class cmd_lfs(Command):
@@ -5593,12 +6535,9 @@ class cmd_lfs(Command):
 
     """Git LFS management commands."""
 
-    def run(self, argv: Sequence[str]) -> None:
-        """Execute the lfs command.
-
-        Args:
-            argv: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the lfs command."""
         parser = argparse.ArgumentParser(prog="dulwich lfs")
         subparsers = parser.add_subparsers(dest="subcommand", help="LFS subcommands")
 
@@ -5649,6 +6588,12 @@ class cmd_lfs(Command):
             "--stdin", action="store_true", help="Read pointer from stdin"
         )
 
+        # lfs filter-process
+        subparsers.add_parser(
+            "filter-process",
+            help="Serve clean/smudge requests over git's long-running filter protocol",
+        )
+
         # lfs fetch
         parser_fetch = subparsers.add_parser(
             "fetch", help="Fetch LFS objects from remote"
@@ -5673,7 +6618,17 @@ class cmd_lfs(Command):
 
         # lfs status
         subparsers.add_parser("status", help="Show status of LFS files")
+        return parser
+
+    def run(self, argv: Sequence[str]) -> None:
+        """Execute the lfs command.
+
+        Args:
+            argv: Command line arguments
+        """
+        from dulwich import porcelain
 
+        parser = self.get_parser()
         args = parser.parse_args(argv)
 
         if args.subcommand == "init":
@@ -5741,6 +6696,9 @@ class cmd_lfs(Command):
                 logger.error("--stdin required for smudge command")
                 sys.exit(1)
 
+        elif args.subcommand == "filter-process":
+            porcelain.lfs_filter_process()
+
         elif args.subcommand == "fetch":
             refs = args.refs or None
             count = porcelain.lfs_fetch(remote=args.remote, refs=refs)
@@ -5782,12 +6740,9 @@ class cmd_lfs(Command):
 class cmd_help(Command):
     """Display help information about git."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the help command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the help command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "-a",
@@ -5795,7 +6750,15 @@ class cmd_help(Command):
             action="store_true",
             help="List all commands.",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the help command.
+
+        Args:
+            args: Command line arguments
+        """
+        parsed_args = self.get_parser().parse_args(args)
 
         if parsed_args.all:
             logger.info("Available commands:")
@@ -5813,12 +6776,9 @@ class cmd_help(Command):
 class cmd_format_patch(Command):
     """Prepare patches for e-mail submission."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the format-patch command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the format-patch command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "committish",
@@ -5843,12 +6803,26 @@ class cmd_format_patch(Command):
             action="store_true",
             help="Output patches to stdout",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
 
-        # Parse committish using the new function
-        committish: ObjectID | tuple[ObjectID, ObjectID] | None = None
-        if parsed_args.committish:
-            with Repo(".") as r:
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the format-patch command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        from .objects import ObjectID
+        from .objectspec import parse_commit_range
+        from .repo import Repo
+
+        parsed_args = self.get_parser().parse_args(args)
+
+        with Repo(".") as r:
+            # Parse committish using the new function
+            committish: ObjectID | tuple[ObjectID, ObjectID] | None = None
+            if parsed_args.committish:
                 range_result = parse_commit_range(r, parsed_args.committish)
                 if range_result:
                     # Convert Commit objects to their SHAs
@@ -5860,14 +6834,14 @@ class cmd_format_patch(Command):
                         else parsed_args.committish
                     )
 
-        filenames = porcelain.format_patch(
-            ".",
-            committish=committish,
-            outstream=sys.stdout,
-            outdir=parsed_args.outdir,
-            n=parsed_args.numbered,
-            stdout=parsed_args.stdout,
-        )
+            filenames = porcelain.format_patch(
+                r,
+                committish=committish,
+                outstream=sys.stdout,
+                outdir=parsed_args.outdir,
+                n=parsed_args.numbered,
+                stdout=parsed_args.stdout,
+            )
 
         if not parsed_args.stdout:
             for filename in filenames:
@@ -5877,12 +6851,9 @@ class cmd_format_patch(Command):
 class cmd_mailsplit(Command):
     """Split mbox or Maildir into individual message files."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the mailsplit command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the mailsplit command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "mbox",
@@ -5926,7 +6897,17 @@ class cmd_mailsplit(Command):
             action="store_true",
             help='Input is of the "mboxrd" format and "^>+From " line escaping is reversed',
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the mailsplit command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         # Determine if input is a Maildir
         is_maildir = False
@@ -5963,12 +6944,9 @@ class cmd_mailsplit(Command):
 class cmd_mailinfo(Command):
     """Extract patch information from an email message."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the mailinfo command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the mailinfo command."""
         parser = argparse.ArgumentParser()
         parser.add_argument(
             "msg",
@@ -6012,7 +6990,17 @@ class cmd_mailinfo(Command):
             dest="message_id",
             help="Copy Message-ID to the end of the commit message",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the mailinfo command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         # Call porcelain function
         result = porcelain.mailinfo(
@@ -6034,35 +7022,12 @@ class cmd_mailinfo(Command):
             print(f"Date: {result.author_date}")
 
 
-class cmd_bundle(Command):
-    """Create, unpack, and manipulate bundle files."""
-
-    def run(self, args: Sequence[str]) -> int:
-        """Execute the bundle command.
-
-        Args:
-            args: Command line arguments
-        """
-        if not args:
-            logger.error("Usage: bundle <create|verify|list-heads|unbundle> <options>")
-            return 1
-
-        subcommand = args[0]
-        subargs = args[1:]
-
-        if subcommand == "create":
-            return self._create(subargs)
-        elif subcommand == "verify":
-            return self._verify(subargs)
-        elif subcommand == "list-heads":
-            return self._list_heads(subargs)
-        elif subcommand == "unbundle":
-            return self._unbundle(subargs)
-        else:
-            logger.error("Unknown bundle subcommand: %s", subcommand)
-            return 1
+class cmd_bundle_create(Command):
+    """Create a bundle file."""
 
-    def _create(self, args: Sequence[str]) -> int:
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the bundle create command."""
         parser = argparse.ArgumentParser(prog="bundle create")
         parser.add_argument(
             "-q", "--quiet", action="store_true", help="Suppress progress"
@@ -6075,8 +7040,20 @@ class cmd_bundle(Command):
         parser.add_argument("--stdin", action="store_true", help="Read refs from stdin")
         parser.add_argument("file", help="Output bundle file (use - for stdout)")
         parser.add_argument("refs", nargs="*", help="References or rev-list args")
+        return parser
 
-        parsed_args = parser.parse_args(args)
+    def run(self, args: Sequence[str]) -> int:
+        """Execute the bundle create command.
+
+        Args:
+            args: Command line arguments
+        """
+        from .bundle import create_bundle_from_repo, write_bundle
+        from .objectspec import parse_commit_range
+        from .refs import Ref
+        from .repo import Repo
+
+        parsed_args = self.get_parser().parse_args(args)
 
         repo = Repo(".")
 
@@ -6154,14 +7131,30 @@ class cmd_bundle(Command):
 
         return 0
 
-    def _verify(self, args: Sequence[str]) -> int:
+
+class cmd_bundle_verify(Command):
+    """Verify a bundle file."""
+
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the bundle verify command."""
         parser = argparse.ArgumentParser(prog="bundle verify")
         parser.add_argument(
             "-q", "--quiet", action="store_true", help="Suppress output"
         )
         parser.add_argument("file", help="Bundle file to verify (use - for stdin)")
+        return parser
 
-        parsed_args = parser.parse_args(args)
+    def run(self, args: Sequence[str]) -> int:
+        """Execute the bundle verify command.
+
+        Args:
+            args: Command line arguments
+        """
+        from .bundle import Bundle, read_bundle
+        from .repo import Repo
+
+        parsed_args = self.get_parser().parse_args(args)
 
         repo = Repo(".")
 
@@ -6194,12 +7187,27 @@ class cmd_bundle(Command):
                 bundle = read_bundle(f)
                 return verify_bundle(bundle)
 
-    def _list_heads(self, args: Sequence[str]) -> int:
+
+class cmd_bundle_list_heads(Command):
+    """List the references in a bundle file."""
+
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the bundle list-heads command."""
         parser = argparse.ArgumentParser(prog="bundle list-heads")
         parser.add_argument("file", help="Bundle file (use - for stdin)")
         parser.add_argument("refnames", nargs="*", help="Only show these refs")
+        return parser
 
-        parsed_args = parser.parse_args(args)
+    def run(self, args: Sequence[str]) -> int:
+        """Execute the bundle list-heads command.
+
+        Args:
+            args: Command line arguments
+        """
+        from .bundle import Bundle, read_bundle
+
+        parsed_args = self.get_parser().parse_args(args)
 
         def list_heads(bundle: Bundle) -> None:
             for ref, sha in bundle.references.items():
@@ -6216,13 +7224,29 @@ class cmd_bundle(Command):
 
         return 0
 
-    def _unbundle(self, args: Sequence[str]) -> int:
+
+class cmd_bundle_unbundle(Command):
+    """Unpack a bundle file into the repository."""
+
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the bundle unbundle command."""
         parser = argparse.ArgumentParser(prog="bundle unbundle")
         parser.add_argument("--progress", action="store_true", help="Show progress")
         parser.add_argument("file", help="Bundle file (use - for stdin)")
         parser.add_argument("refnames", nargs="*", help="Only unbundle these refs")
+        return parser
 
-        parsed_args = parser.parse_args(args)
+    def run(self, args: Sequence[str]) -> int:
+        """Execute the bundle unbundle command.
+
+        Args:
+            args: Command line arguments
+        """
+        from .bundle import read_bundle
+        from .repo import Repo
+
+        parsed_args = self.get_parser().parse_args(args)
 
         repo = Repo(".")
 
@@ -6262,17 +7286,45 @@ class cmd_bundle(Command):
         return 0
 
 
-class cmd_worktree_add(Command):
-    """Create a new worktree."""
+class cmd_bundle(Command):
+    """Create, unpack, and manipulate bundle files."""
 
-    """Add a new worktree to the repository."""
+    subcommands: ClassVar[dict[str, type[Command]]] = {
+        "create": cmd_bundle_create,
+        "verify": cmd_bundle_verify,
+        "list-heads": cmd_bundle_list_heads,
+        "unbundle": cmd_bundle_unbundle,
+    }
 
     def run(self, args: Sequence[str]) -> int | None:
-        """Execute the worktree-add command.
+        """Execute the bundle command.
 
         Args:
             args: Command line arguments
         """
+        if not args:
+            logger.error("Usage: bundle <create|verify|list-heads|unbundle> <options>")
+            return 1
+
+        subcommand = args[0]
+        subargs = args[1:]
+
+        try:
+            cmd_kls = self.subcommands[subcommand]
+        except KeyError:
+            logger.error("Unknown bundle subcommand: %s", subcommand)
+            return 1
+        return cmd_kls().run(subargs)
+
+
+class cmd_worktree_add(Command):
+    """Create a new worktree."""
+
+    """Add a new worktree to the repository."""
+
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the worktree-add command."""
         parser = argparse.ArgumentParser(
             description="Add a new worktree", prog="dulwich worktree add"
         )
@@ -6286,8 +7338,15 @@ class cmd_worktree_add(Command):
             "--detach", action="store_true", help="Detach HEAD in new worktree"
         )
         parser.add_argument("--force", action="store_true", help="Force creation")
+        return parser
 
-        parsed_args = parser.parse_args(args)
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the worktree-add command.
+
+        Args:
+            args: Command line arguments
+        """
+        parsed_args = self.get_parser().parse_args(args)
 
         from dulwich import porcelain
 
@@ -6322,12 +7381,9 @@ class cmd_worktree_list(Command):
 
     """List details of each worktree."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the worktree-list command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the worktree-list command."""
         parser = argparse.ArgumentParser(
             description="List worktrees", prog="dulwich worktree list"
         )
@@ -6337,8 +7393,15 @@ class cmd_worktree_list(Command):
         parser.add_argument(
             "--porcelain", action="store_true", help="Machine-readable output"
         )
+        return parser
 
-        parsed_args = parser.parse_args(args)
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the worktree-list command.
+
+        Args:
+            args: Command line arguments
+        """
+        parsed_args = self.get_parser().parse_args(args)
 
         from dulwich import porcelain
 
@@ -6384,19 +7447,23 @@ class cmd_worktree_remove(Command):
 
     """Remove a worktree."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the worktree-remove command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the worktree-remove command."""
         parser = argparse.ArgumentParser(
             description="Remove a worktree", prog="dulwich worktree remove"
         )
         parser.add_argument("worktree", help="Path to worktree to remove")
         parser.add_argument("--force", action="store_true", help="Force removal")
+        return parser
 
-        parsed_args = parser.parse_args(args)
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the worktree-remove command.
+
+        Args:
+            args: Command line arguments
+        """
+        parsed_args = self.get_parser().parse_args(args)
 
         from dulwich import porcelain
 
@@ -6412,12 +7479,9 @@ class cmd_worktree_prune(Command):
 
     """Prune worktree information."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the worktree-prune command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the worktree-prune command."""
         parser = argparse.ArgumentParser(
             description="Prune worktree information", prog="dulwich worktree prune"
         )
@@ -6430,8 +7494,15 @@ class cmd_worktree_prune(Command):
         parser.add_argument(
             "--expire", type=int, help="Expire worktrees older than time (seconds)"
         )
+        return parser
 
-        parsed_args = parser.parse_args(args)
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the worktree-prune command.
+
+        Args:
+            args: Command line arguments
+        """
+        parsed_args = self.get_parser().parse_args(args)
 
         from dulwich import porcelain
 
@@ -6457,19 +7528,23 @@ class cmd_worktree_lock(Command):
 
     """Lock a worktree."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the worktree-lock command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the worktree-lock command."""
         parser = argparse.ArgumentParser(
             description="Lock a worktree", prog="dulwich worktree lock"
         )
         parser.add_argument("worktree", help="Path to worktree to lock")
         parser.add_argument("--reason", help="Reason for locking")
+        return parser
 
-        parsed_args = parser.parse_args(args)
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the worktree-lock command.
+
+        Args:
+            args: Command line arguments
+        """
+        parsed_args = self.get_parser().parse_args(args)
 
         from dulwich import porcelain
 
@@ -6485,18 +7560,22 @@ class cmd_worktree_unlock(Command):
 
     """Unlock a worktree."""
 
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the worktree-unlock command."""
+        parser = argparse.ArgumentParser(
+            description="Unlock a worktree", prog="dulwich worktree unlock"
+        )
+        parser.add_argument("worktree", help="Path to worktree to unlock")
+        return parser
+
     def run(self, args: Sequence[str]) -> int | None:
         """Execute the worktree-unlock command.
 
         Args:
             args: Command line arguments
         """
-        parser = argparse.ArgumentParser(
-            description="Unlock a worktree", prog="dulwich worktree unlock"
-        )
-        parser.add_argument("worktree", help="Path to worktree to unlock")
-
-        parsed_args = parser.parse_args(args)
+        parsed_args = self.get_parser().parse_args(args)
 
         from dulwich import porcelain
 
@@ -6510,19 +7589,23 @@ class cmd_worktree_move(Command):
 
     """Move a worktree."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the worktree-move command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the worktree-move command."""
         parser = argparse.ArgumentParser(
             description="Move a worktree", prog="dulwich worktree move"
         )
         parser.add_argument("worktree", help="Path to worktree to move")
         parser.add_argument("new_path", help="New path for the worktree")
+        return parser
 
-        parsed_args = parser.parse_args(args)
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the worktree-move command.
+
+        Args:
+            args: Command line arguments
+        """
+        parsed_args = self.get_parser().parse_args(args)
 
         from dulwich import porcelain
 
@@ -6540,12 +7623,9 @@ class cmd_worktree_repair(Command):
 
     """Repair worktree administrative files."""
 
-    def run(self, args: Sequence[str]) -> int | None:
-        """Execute the worktree-repair command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the worktree-repair command."""
         parser = argparse.ArgumentParser(
             description="Repair worktree administrative files",
             prog="dulwich worktree repair",
@@ -6555,8 +7635,15 @@ class cmd_worktree_repair(Command):
             nargs="*",
             help="Paths to worktrees to repair (if not specified, repairs all)",
         )
+        return parser
 
-        parsed_args = parser.parse_args(args)
+    def run(self, args: Sequence[str]) -> int | None:
+        """Execute the worktree-repair command.
+
+        Args:
+            args: Command line arguments
+        """
+        parsed_args = self.get_parser().parse_args(args)
 
         from dulwich import porcelain
 
@@ -6593,12 +7680,9 @@ class cmd_worktree(SuperCommand):
 class cmd_rerere(Command):
     """Record and reuse recorded conflict resolutions."""
 
-    def run(self, args: Sequence[str]) -> None:
-        """Execute the rerere command.
-
-        Args:
-            args: Command line arguments
-        """
+    @classmethod
+    def build_parser(cls) -> argparse.ArgumentParser:
+        """Build the argument parser for the rerere command."""
         parser = argparse.ArgumentParser()
         parser.add_argument("gitdir", nargs="?", default=".", help="Git directory")
         parser.add_argument(
@@ -6617,7 +7701,17 @@ class cmd_rerere(Command):
             default=60,
             help="Maximum age in days for gc (default: 60)",
         )
-        parsed_args = parser.parse_args(args)
+        return parser
+
+    def run(self, args: Sequence[str]) -> None:
+        """Execute the rerere command.
+
+        Args:
+            args: Command line arguments
+        """
+        from dulwich import porcelain
+
+        parsed_args = self.get_parser().parse_args(args)
 
         if parsed_args.subcommand is None:
             # Record current conflicts
@@ -6765,6 +7859,36 @@ commands = {
 }
 
 
+_GLOBAL_OPTIONS = {
+    "--no-pager": "--no-pager",
+    "--pager": "--pager",
+    "--help": "--help",
+    "-h": "--help",
+}
+
+
+def _split_global_options(argv: Sequence[str]) -> tuple[set[str], list[str]]:
+    """Split leading global options from the command and its arguments.
+
+    Only options that appear before the command name are treated as global
+    options; everything from the first other argument onwards is left for
+    the command itself.
+
+    Args:
+        argv: Command line arguments
+
+    Returns:
+        Tuple of (set of global options seen, remaining arguments)
+    """
+    global_opts = set()
+    for i, arg in enumerate(argv):
+        try:
+            global_opts.add(_GLOBAL_OPTIONS[arg])
+        except KeyError:
+            return global_opts, list(argv[i:])
+    return global_opts, []
+
+
 def main(argv: Sequence[str] | None = None) -> int | None:
     """Main entry point for the Dulwich CLI.
 
@@ -6782,26 +7906,16 @@ def main(argv: Sequence[str] | None = None) -> int | None:
         argv = sys.argv[1:]
 
     # Parse only the global options and command, stop at first positional
-    parser = argparse.ArgumentParser(
-        prog="dulwich",
-        description="Simple command-line interface to Dulwich",
-        add_help=False,  # We'll handle help ourselves
-    )
-    parser.add_argument("--no-pager", action="store_true", help="Disable pager")
-    parser.add_argument("--pager", action="store_true", help="Force enable pager")
-    parser.add_argument("--help", "-h", action="store_true", help="Show help")
-
-    # Parse known args to separate global options from command args
-    global_args, remaining = parser.parse_known_args(argv)
+    global_opts, remaining = _split_global_options(argv)
 
     # Apply global pager settings
-    if global_args.no_pager:
+    if "--no-pager" in global_opts:
         disable_pager()
-    elif global_args.pager:
+    elif "--pager" in global_opts:
         enable_pager()
 
     # Handle help
-    if global_args.help or not remaining:
+    if "--help" in global_opts or not remaining:
         parser = argparse.ArgumentParser(
             prog="dulwich", description="Simple command-line interface to Dulwich"
         )
@@ -6837,6 +7951,10 @@ def main(argv: Sequence[str] | None = None) -> int | None:
 
 def _main() -> None:
     if "DULWICH_PDB" in os.environ and getattr(signal, "SIGQUIT", None):
+        # Load pdb up front so the handler doesn't run a full import from
+        # inside a signal frame.
+        import pdb  # noqa: F401
+
         signal.signal(signal.SIGQUIT, signal_quit)  # type: ignore[attr-defined,unused-ignore]
     signal.signal(signal.SIGINT, signal_int)
 
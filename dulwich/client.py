@@ -778,8 +778,7 @@ def _read_side_band64k_data(pkt_seq: Iterable[bytes]) -> Iterator[tuple[int, byt
       pkt_seq: Sequence of packets to read
     """
     for pkt in pkt_seq:
-        channel = ord(pkt[:1])
-        yield channel, pkt[1:]
+        yield pkt[0], pkt[1:]
 
 
 def find_capability(
@@ -947,7 +946,9 @@ def _handle_upload_pack_tail(
 
         for chan, data in _read_side_band64k_data(proto.read_pkt_seq()):
             if chan == SIDE_BAND_CHANNEL_DATA:
-                pack_data(data)
+                # Packets carrying only the channel byte have nothing to write
+                if data:
+                    pack_data(data)
             elif chan == SIDE_BAND_CHANNEL_PROGRESS:
                 progress(data)
             else:
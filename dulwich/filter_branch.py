@@ -70,6 +70,7 @@ class CommitFilter:
         subdirectory_filter: bytes | None = None,
         prune_empty: bool = False,
         tag_name_filter: Callable[[bytes], bytes | None] | None = None,
+        tempdir: str | None = None,
     ):
         """Initialize a commit filter.
 
@@ -94,6 +95,8 @@ class CommitFilter:
           subdirectory_filter: Optional subdirectory path to extract as new root
           prune_empty: Whether to prune commits that become empty
           tag_name_filter: Optional callable to rename tags
+          tempdir: Directory to create tree filter checkouts in (defaults
+            to the tempfile module's default)
         """
         self.object_store = object_store
         self.filter_fn = filter_fn
@@ -110,6 +113,7 @@ class CommitFilter:
         self._old_to_new: dict[ObjectID, ObjectID] = {}
         self._processed: set[ObjectID] = set()
         self._tree_cache: dict[ObjectID, ObjectID] = {}  # Cache for filtered trees
+        self.tempdir = tempdir
 
     def _filter_tree_with_subdirectory(
         self, tree_sha: ObjectID, subdirectory: bytes
@@ -176,7 +180,7 @@ class CommitFilter:
             return tree_sha
 
         # Create temporary directory
-        with tempfile.TemporaryDirectory() as tmpdir:
+        with tempfile.TemporaryDirectory(dir=self.tempdir) as tmpdir:
             # Check out tree to temp directory
             # We need a proper checkout implementation here
             # For now, pass tmpdir to filter and let it handle checkout
@@ -26,6 +26,7 @@ and maintaining Git repositories.
 """
 
 __all__ = [
+    "BatchedProgress",
     "CommitGraphTask",
     "GcTask",
     "IncrementalRepackTask",
@@ -43,13 +44,18 @@ __all__ = [
 
 import logging
 import os
+import threading
+import time
 from abc import ABC, abstractmethod
 from collections.abc import Callable
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, ClassVar
 
 if TYPE_CHECKING:
+    from .config import Config
+    from .pack import Pack
     from .repo import BaseRepo, Repo
 
 logger = logging.getLogger(__name__)
@@ -73,11 +79,85 @@ class MaintenanceResult:
     errors: dict[str, str] = field(default_factory=dict)
 
 
+class BatchedProgress:
+    """Progress callback that passes messages on in batches.
+
+    Tasks such as gc report progress for every object they look at. Rather
+    than handing each message to the wrapped callback, which typically writes
+    it out right away, bursts of messages are collected and passed on as one
+    newline-separated string at most every interval seconds. A message that
+    arrives when nothing has been passed on for interval seconds is passed on
+    right away. Messages that are not strings, such as the in-place byte
+    progress lines from pack writing, are passed on unchanged and in order.
+
+    Batches are passed on from whichever thread reports progress, without
+    holding any lock that other reporting threads wait on. If another thread
+    is already passing a batch on, new messages stay queued for the next
+    batch. Messages queued during a burst are passed on by the next report
+    after the interval, so call flush() before a long step that reports
+    nothing, and once done.
+    """
+
+    def __init__(self, progress: Callable[[str], None], interval: float = 0.1):
+        """Initialize the wrapper.
+
+        Args:
+            progress: Callback to pass batched messages to
+            interval: Minimum time in seconds between batches
+        """
+        self._progress = progress
+        self._interval = interval
+        self._pending: list[str] = []
+        self._lock = threading.Lock()
+        # Held while passing a batch on, so batches stay in order
+        self._delivering = threading.Lock()
+        # Nothing has been passed on yet, so the first message goes straight out
+        self._next_flush = time.monotonic()
+
+    def __call__(self, message: str) -> None:
+        """Queue a progress message."""
+        with self._lock:
+            self._pending.append(message)
+            if time.monotonic() < self._next_flush:
+                return
+        self._deliver(blocking=False)
+
+    def flush(self) -> None:
+        """Pass all queued messages on to the wrapped callback."""
+        self._deliver(blocking=True)
+
+    def _deliver(self, blocking: bool) -> None:
+        if not self._delivering.acquire(blocking=blocking):
+            # Another thread is passing a batch on; ours follows later
+            return
+        try:
+            with self._lock:
+                pending, self._pending = self._pending, []
+                self._next_flush = time.monotonic() + self._interval
+            batch: list[str] = []
+            for message in pending:
+                if isinstance(message, str):
+                    batch.append(message)
+                    continue
+                if batch:
+                    self._progress("\n".join(batch))
+                    batch = []
+                self._progress(message)
+            if batch:
+                self._progress("\n".join(batch))
+        finally:
+            self._delivering.release()
+
+
 class MaintenanceTask(ABC):
     """Base class for maintenance tasks."""
 
     name: str = ""
 
+    # Parts of the repository the task modifies. Tasks sharing a resource run
+    # one after another, in order; tasks with disjoint resources may overlap.
+    resources: ClassVar[frozenset[str]] = frozenset({"objects", "refs"})
+
     def __init__(
         self,
         repo: "BaseRepo",
@@ -95,6 +175,11 @@ class MaintenanceTask(ABC):
         self.auto = auto
         self.progress = progress
 
+    def _flush_progress(self) -> None:
+        """Pass on progress messages still held back before a long step."""
+        if isinstance(self.progress, BatchedProgress):
+            self.progress.flush()
+
     @abstractmethod
     def run(self) -> bool:
         """Run the maintenance task.
@@ -103,16 +188,21 @@ class MaintenanceTask(ABC):
             True if successful, False otherwise
         """
 
-    def is_enabled(self) -> bool:
+    def is_enabled(self, config: "Config | None" = None) -> bool:
         """Check if task is enabled in repository configuration.
 
+        Args:
+            config: Optional repository configuration to use instead of
+                reading it from the repository
+
         Returns:
             True if task is enabled
         """
         if not self.name:
             return False
 
-        config = self.repo.get_config()
+        if config is None:
+            config = self.repo.get_config()
 
         try:
             enabled = config.get_boolean(
@@ -136,6 +226,8 @@ class GcTask(MaintenanceTask):
     """Garbage collection maintenance task."""
 
     name = "gc"
+    # Repacks and prunes objects, and packs refs
+    resources = frozenset({"objects", "refs"})
 
     def default_enabled(self) -> bool:
         """GC is enabled by default."""
@@ -153,6 +245,7 @@ class GcTask(MaintenanceTask):
         if self.progress:
             self.progress("Running gc task")
         assert isinstance(self.repo, Repo)
+        self._flush_progress()
         garbage_collect(self.repo, auto=self.auto, progress=self.progress)
         return True
 
@@ -161,6 +254,9 @@ class CommitGraphTask(MaintenanceTask):
     """Commit-graph maintenance task."""
 
     name = "commit-graph"
+    # Should see the result of the object tasks that precede it, and reads
+    # every ref, so must not overlap with tasks that rewrite them
+    resources = frozenset({"objects", "refs"})
 
     def default_enabled(self) -> bool:
         """Commit-graph is enabled by default."""
@@ -178,6 +274,7 @@ class CommitGraphTask(MaintenanceTask):
         # Get all refs
         refs = list(self.repo.refs.as_dict().values())
         if refs:
+            self._flush_progress()
             self.repo.object_store.write_commit_graph(refs, reachable=True)
         return True
 
@@ -189,6 +286,7 @@ class LooseObjectsTask(MaintenanceTask):
     """
 
     name = "loose-objects"
+    resources = frozenset({"objects"})
 
     def run(self) -> bool:
         """Pack loose objects.
@@ -203,6 +301,7 @@ class LooseObjectsTask(MaintenanceTask):
 
         # Pack loose objects using the object store's method
         assert isinstance(self.repo.object_store, PackBasedObjectStore)
+        self._flush_progress()
         count = self.repo.object_store.pack_loose_objects(progress=self.progress)
 
         if self.progress and count > 0:
@@ -211,6 +310,39 @@ class LooseObjectsTask(MaintenanceTask):
         return True
 
 
+def _select_geometric_repack(packs: list["Pack"], factor: int = 2) -> list["Pack"]:
+    """Select the packs to merge so pack sizes form a geometric progression.
+
+    This follows ``git repack --geometric``: with packs ordered by object
+    count, every pack should hold at least ``factor`` times as many objects
+    as the next smaller one. The packs below the highest point where that
+    fails are merged, together with any larger pack the merged result would
+    not be ``factor`` times smaller than.
+
+    Args:
+        packs: Packs in the object store
+        factor: Required size ratio between consecutive packs
+
+    Returns:
+        Packs to merge, smallest first
+    """
+    by_size = sorted(packs, key=len)
+    counts = [len(pack) for pack in by_size]
+
+    split = 0
+    for i in range(len(counts) - 1, 0, -1):
+        if counts[i - 1] * factor > counts[i]:
+            split = i
+            break
+
+    merged = sum(counts[:split])
+    while split < len(counts) and merged * factor > counts[split]:
+        merged += counts[split]
+        split += 1
+
+    return by_size[:split]
+
+
 class IncrementalRepackTask(MaintenanceTask):
     """Incremental-repack maintenance task.
 
@@ -218,6 +350,7 @@ class IncrementalRepackTask(MaintenanceTask):
     """
 
     name = "incremental-repack"
+    resources = frozenset({"objects"})
 
     def run(self) -> bool:
         """Consolidate pack files incrementally.
@@ -230,7 +363,6 @@ class IncrementalRepackTask(MaintenanceTask):
         if self.progress:
             self.progress("Running incremental-repack task")
 
-        # Get all packs sorted by size
         assert isinstance(self.repo.object_store, PackBasedObjectStore)
         packs = self.repo.object_store.packs
         if len(packs) <= 1:
@@ -251,11 +383,19 @@ class IncrementalRepackTask(MaintenanceTask):
                     )
                 return True
 
-        # Perform a full repack to consolidate all packs
+        # Only merge the small packs that break a geometric progression,
+        # leaving the large, stable packs untouched
+        selected = _select_geometric_repack(packs)
+        if len(selected) <= 1:
+            if self.progress:
+                self.progress("Pack sizes already form a geometric progression")
+            return True
+
         if self.progress:
-            self.progress(f"Consolidating {len(packs)} pack files")
+            self.progress(f"Consolidating {len(selected)} of {len(packs)} pack files")
+        self._flush_progress()
 
-        count = self.repo.object_store.repack(progress=self.progress)
+        count = self.repo.object_store.repack(progress=self.progress, packs=selected)
 
         if self.progress:
             self.progress(f"Repacked {count} objects")
@@ -267,6 +407,7 @@ class PackRefsTask(MaintenanceTask):
     """Pack-refs maintenance task."""
 
     name = "pack-refs"
+    resources = frozenset({"refs"})
 
     def run(self) -> bool:
         """Pack loose references.
@@ -276,6 +417,7 @@ class PackRefsTask(MaintenanceTask):
         """
         if self.progress:
             self.progress("Running pack-refs task")
+        self._flush_progress()
 
         self.repo.refs.pack_refs(all=True)
         return True
@@ -288,6 +430,8 @@ class PrefetchTask(MaintenanceTask):
     """
 
     name = "prefetch"
+    # Fetching adds packs and updates remote-tracking refs
+    resources = frozenset({"objects", "refs"})
 
     def run(self) -> bool:
         """Prefetch remote refs.
@@ -304,35 +448,45 @@ class PrefetchTask(MaintenanceTask):
         config = self.repo.get_config()
 
         # Get all configured remotes
-        remotes = set()
-        for section in config.sections():
-            if len(section) == 2 and section[0] == b"remote":
-                remotes.add(section[1].decode())
+        remotes = {
+            section[1].decode()
+            for section in config.sections()
+            if len(section) == 2 and section[0] == b"remote"
+        }
 
         if not remotes:
             if self.progress:
                 self.progress("No remotes configured, skipping prefetch")
             return True
 
-        # Fetch from each remote
-        success = True
-        for remote_name in sorted(remotes):
-            try:
-                if self.progress:
-                    self.progress(f"Fetching from {remote_name}")
+        assert isinstance(self.repo, Repo)
+        repo_path = self.repo.path
 
+        def fetch_remote(remote_name: str) -> None:
+            # Each fetch gets its own repository handle, so concurrent fetches
+            # do not share object store or ref caches
+            with Repo(repo_path) as r:
                 # Fetch quietly without updating working tree
                 # The fetch operation will update refs under refs/remotes/
-                assert isinstance(self.repo, Repo)
-                fetch(
-                    self.repo,
-                    remote_location=remote_name,
-                    quiet=True,
-                )
-            except Exception as e:
-                # Log error and mark as failed
-                logger.error(f"Failed to fetch from {remote_name}: {e}")
-                success = False
+                fetch(r, remote_location=remote_name, quiet=True)
+
+        # Fetches are network-bound, so run them concurrently
+        success = True
+        remote_names = sorted(remotes)
+        with ThreadPoolExecutor(max_workers=min(len(remote_names), 8)) as executor:
+            futures = []
+            for remote_name in remote_names:
+                if self.progress:
+                    self.progress(f"Fetching from {remote_name}")
+                futures.append(executor.submit(fetch_remote, remote_name))
+            self._flush_progress()
+            for remote_name, future in zip(remote_names, futures):
+                try:
+                    future.result()
+                except Exception as e:
+                    # Log error and mark as failed
+                    logger.error(f"Failed to fetch from {remote_name}: {e}")
+                    success = False
 
         return success
 
@@ -366,12 +520,15 @@ def get_enabled_tasks(
         return [name for name in task_filter if name in MAINTENANCE_TASKS]
 
     enabled_tasks = []
+    config = repo.get_config()
 
     # Check each task to see if it's enabled
     for task_name, task_class in MAINTENANCE_TASKS.items():
+        if not task_class.name:
+            continue
         # Create temporary task instance to check if enabled
         task = task_class(repo, auto=False, progress=None)
-        if task.is_enabled():
+        if task.is_enabled(config=config):
             enabled_tasks.append(task_name)
 
     return enabled_tasks
@@ -389,7 +546,12 @@ def run_maintenance(
         repo: Repository object
         tasks: Optional list of specific task names to run
         auto: If True, only run tasks if needed
-        progress: Optional progress callback
+        progress: Optional progress callback. Tasks normally run one after
+            another and call it directly. If two of the tasks work on
+            unrelated parts of the repository, they run concurrently; the
+            callback is then called from worker threads, and messages are
+            batched by BatchedProgress and may arrive several to a call,
+            separated by newlines
 
     Returns:
         MaintenanceResult with task execution results
@@ -397,28 +559,74 @@ def run_maintenance(
     result = MaintenanceResult()
 
     enabled_tasks = get_enabled_tasks(repo, tasks)
+    task_classes = [
+        (task_name, MAINTENANCE_TASKS[task_name])
+        for task_name in enabled_tasks
+        if task_name in MAINTENANCE_TASKS
+    ]
+    # Only start worker threads if at least two tasks can actually overlap
+    concurrent = any(
+        not (task_class.resources & other_class.resources)
+        for i, (_, task_class) in enumerate(task_classes)
+        for _, other_class in task_classes[i + 1 :]
+    )
+    batched_progress = None
+    task_progress = progress
+    if concurrent and progress is not None:
+        batched_progress = task_progress = BatchedProgress(progress)
+    outcomes: dict[str, bool | str] = {}
+
+    def run_task(
+        task_name: str, task_class: type[MaintenanceTask], after: list[Future[None]]
+    ) -> None:
+        wait(after)
+        try:
+            task = task_class(repo, auto=auto, progress=task_progress)
+            outcomes[task_name] = task.run()
+        except Exception as e:
+            outcomes[task_name] = str(e)
+            logger.error(f"Task {task_name} failed: {e}")
+        finally:
+            # Pass on the task's last messages rather than holding them
+            # until another task reports progress
+            if batched_progress is not None:
+                batched_progress.flush()
+
+    if not concurrent:
+        for task_name, task_class in task_classes:
+            run_task(task_name, task_class, [])
+    else:
+        # A task waits for every earlier task that touches one of its
+        # resources; tasks working on unrelated parts of the repository run
+        # concurrently.
+        with ThreadPoolExecutor(max_workers=len(task_classes)) as executor:
+            scheduled: list[tuple[frozenset[str], Future[None]]] = []
+            for task_name, task_class in task_classes:
+                after = [
+                    future
+                    for resources, future in scheduled
+                    if resources & task_class.resources
+                ]
+                scheduled.append(
+                    (
+                        task_class.resources,
+                        executor.submit(run_task, task_name, task_class, after),
+                    )
+                )
 
     for task_name in enabled_tasks:
         result.tasks_run.append(task_name)
-
-        task_class = MAINTENANCE_TASKS.get(task_name)
-        if not task_class:
+        if task_name not in MAINTENANCE_TASKS:
             result.tasks_failed.append(task_name)
             result.errors[task_name] = "Unknown task"
             continue
-
-        try:
-            task = task_class(repo, auto=auto, progress=progress)
-            success = task.run()
-
-            if success:
-                result.tasks_succeeded.append(task_name)
-            else:
-                result.tasks_failed.append(task_name)
-        except Exception as e:
+        outcome = outcomes[task_name]
+        if outcome is True:
+            result.tasks_succeeded.append(task_name)
+        else:
             result.tasks_failed.append(task_name)
-            result.errors[task_name] = str(e)
-            logger.error(f"Task {task_name} failed: {e}")
+            if isinstance(outcome, str):
+                result.errors[task_name] = outcome
 
     return result
 
@@ -850,19 +850,19 @@ class Notes:
 
         return commit.id
 
-    def list_notes(
+    def list_note_shas(
         self,
         notes_ref: bytes | None = None,
         config: "StackedConfig | None" = None,
-    ) -> list[tuple[ObjectID, bytes]]:
-        """List all notes in a notes ref.
+    ) -> list[tuple[ObjectID, ObjectID]]:
+        """List the objects that have notes, without reading the note contents.
 
         Args:
             notes_ref: The notes ref to use, or None to use the default
             config: Config to read notes.displayRef from
 
         Returns:
-            List of tuples of (object_sha, note_content)
+            List of tuples of (object_sha, note_sha)
         """
         notes_ref = self.get_notes_ref(notes_ref, config)
         try:
@@ -885,9 +885,24 @@ class Notes:
         if not isinstance(notes_tree, Tree):
             return []
 
-        notes_tree_obj = NotesTree(notes_tree, self._object_store)
+        return list(NotesTree(notes_tree, self._object_store).list_notes())
+
+    def list_notes(
+        self,
+        notes_ref: bytes | None = None,
+        config: "StackedConfig | None" = None,
+    ) -> list[tuple[ObjectID, bytes]]:
+        """List all notes in a notes ref.
+
+        Args:
+            notes_ref: The notes ref to use, or None to use the default
+            config: Config to read notes.displayRef from
+
+        Returns:
+            List of tuples of (object_sha, note_content)
+        """
         result: list[tuple[ObjectID, bytes]] = []
-        for object_sha, note_sha in notes_tree_obj.list_notes():
+        for object_sha, note_sha in self.list_note_shas(notes_ref, config):
             note_obj = self._object_store[note_sha]
             if isinstance(note_obj, Blob):
                 result.append((object_sha, note_obj.data))
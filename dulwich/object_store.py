@@ -28,6 +28,7 @@ __all__ = [
     "INFODIR",
     "PACKDIR",
     "PACK_MODE",
+    "PACK_WRITE_BUFFER_SIZE",
     "BaseObjectStore",
     "BitmapReachability",
     "BucketBasedObjectStore",
@@ -204,11 +205,41 @@ PACKDIR = "pack"
 # would requite some rather significant adjustments to the test suite
 PACK_MODE = 0o444 if sys.platform != "win32" else 0o644
 
+# Buffer size for incoming pack files; received pack data arrives in many
+# small pieces, so coalesce them into fewer, larger writes
+PACK_WRITE_BUFFER_SIZE = 64 * 1024
+
 # Grace period for cleaning up temporary pack files (in seconds)
 # Matches git's default of 2 weeks
 DEFAULT_TEMPFILE_GRACE_PERIOD = 14 * 24 * 60 * 60  # 2 weeks
 
 
+def _fadvise_willneed(paths: Iterable[str]) -> None:
+    """Ask the OS to start reading files into the page cache.
+
+    posix_fadvise returns immediately and the kernel reads ahead in the
+    background, so the I/O overlaps with whatever the caller does next.
+    This is a no-op on platforms without posix_fadvise.
+
+    Args:
+      paths: Paths of files that are about to be read
+    """
+    fadvise = getattr(os, "posix_fadvise", None)
+    if fadvise is None:
+        return
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
 def find_shallow(
     store: ObjectContainer, heads: Iterable[ObjectID], depth: int
 ) -> tuple[set[ObjectID], set[ObjectID]]:
@@ -1048,6 +1079,9 @@ class PackBasedObjectStore(PackCapableObjectStore, PackedObjectContainer):
     def _get_loose_object(self, sha: ObjectID | RawObjectID) -> ShaFile | None:
         raise NotImplementedError(self._get_loose_object)
 
+    def _prefetch_packs(self, packs: Sequence[Pack]) -> None:
+        """Hint that the data of the given packs is about to be read."""
+
     def delete_loose_object(self, sha: ObjectID) -> None:
         """Delete a loose object.
 
@@ -1081,6 +1115,7 @@ class PackBasedObjectStore(PackCapableObjectStore, PackedObjectContainer):
         self,
         exclude: Set[bytes] | None = None,
         progress: Callable[[str], None] | None = None,
+        packs: Sequence[Pack] | None = None,
     ) -> int:
         """Repack the packs in this repository.
 
@@ -1090,22 +1125,27 @@ class PackBasedObjectStore(PackCapableObjectStore, PackedObjectContainer):
         Args:
           exclude: Optional set of object SHAs to exclude from repacking
           progress: Optional progress reporting callback
+          packs: Optional subset of packs to consolidate; loose objects and
+            other packs are then left alone
         """
         if exclude is None:
             exclude = set()
 
         loose_objects = set()
         excluded_loose_objects = set()
-        for sha in self._iter_loose_objects():
-            if sha not in exclude:
-                obj = self._get_loose_object(sha)
-                if obj is not None:
-                    loose_objects.add(obj)
-            else:
-                excluded_loose_objects.add(sha)
+        if packs is None:
+            for sha in self._iter_loose_objects():
+                if sha not in exclude:
+                    obj = self._get_loose_object(sha)
+                    if obj is not None:
+                        loose_objects.add(obj)
+                else:
+                    excluded_loose_objects.add(sha)
+            packs = self.packs
 
+        self._prefetch_packs(packs)
         objects: set[tuple[ShaFile, None]] = {(obj, None) for obj in loose_objects}
-        old_packs = {p.name(): p for p in self.packs}
+        old_packs = {p.name(): p for p in packs}
         for name, pack in old_packs.items():
             objects.update(
                 (obj, None) for obj in pack.iterobjects() if obj.id not in exclude
@@ -1704,6 +1744,9 @@ class DiskObjectStore(PackBasedObjectStore):
         # Check from object dir
         return hex_to_filename(os.fspath(self.path), sha)
 
+    def _prefetch_packs(self, packs: Sequence[Pack]) -> None:
+        _fadvise_willneed(pack._data_path for pack in packs)
+
     def _iter_loose_objects(self) -> Iterator[ObjectID]:
         for base in os.listdir(self.path):
             if len(base) != 2:
@@ -1973,7 +2016,7 @@ class DiskObjectStore(PackBasedObjectStore):
         import tempfile
 
         fd, path = tempfile.mkstemp(dir=self.path, prefix="tmp_pack_")
-        with os.fdopen(fd, "w+b") as f:
+        with os.fdopen(fd, "w+b", buffering=PACK_WRITE_BUFFER_SIZE) as f:
             os.chmod(path, PACK_MODE)
             indexer = PackIndexer(
                 f,
@@ -2002,7 +2045,7 @@ class DiskObjectStore(PackBasedObjectStore):
         import tempfile
 
         fd, path = tempfile.mkstemp(dir=self.pack_dir, suffix=".pack")
-        f = os.fdopen(fd, "w+b")
+        f = os.fdopen(fd, "w+b", buffering=PACK_WRITE_BUFFER_SIZE)
         mask = self.file_mode if self.file_mode is not None else PACK_MODE
         os.chmod(path, mask)
 
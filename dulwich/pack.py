@@ -100,7 +100,7 @@ __all__ = [
 import binascii
 from collections import defaultdict, deque
 from contextlib import suppress
-from io import BytesIO, UnsupportedOperation
+from io import UnsupportedOperation
 
 try:
     from cdifflib import CSequenceMatcher as SequenceMatcher
@@ -175,6 +175,9 @@ PACK_SPOOL_FILE_MAX_SIZE = 16 * 1024 * 1024
 # Default pack index version to use when none is specified
 DEFAULT_PACK_INDEX_VERSION = 2
 
+# Pack header: signature, version and number of objects
+_PACK_HEADER = struct.Struct(">4sLL")
+
 
 OldUnpackedObject = tuple[bytes | int, list[bytes]] | list[bytes]
 ResolveExtRefFn = Callable[[bytes], tuple[int, OldUnpackedObject]]
@@ -1290,15 +1293,14 @@ def read_pack_header(read: Callable[[int], bytes]) -> tuple[int, int]:
     Returns: Tuple of (pack version, number of objects). If no data is
         available to read, returns (None, None).
     """
-    header = read(12)
+    header = read(_PACK_HEADER.size)
     if not header:
         raise AssertionError("file too short to contain pack")
-    if header[:4] != b"PACK":
+    if not header.startswith(b"PACK"):
         raise AssertionError(f"Invalid pack header {header!r}")
-    (version,) = unpack_from(b">L", header, 4)
+    _signature, version, num_objects = _PACK_HEADER.unpack_from(header)
     if version not in (2, 3):
         raise AssertionError(f"Version was {version}")
-    (num_objects,) = unpack_from(b">L", header, 8)
     return (version, num_objects)
 
 
@@ -1439,9 +1441,11 @@ class PackStreamReader:
         self.sha = hash_func()
         self._hash_size = len(hash_func().digest())
         self._offset = 0
-        self._rbuf = BytesIO()
-        # trailer is a deque to avoid memory allocation on small reads
-        self._trailer: deque[int] = deque()
+        # data read ahead of the current position, consumed from _rbuf_pos
+        self._rbuf = b""
+        self._rbuf_pos = 0
+        # the last hash_size bytes read, held back from the hash
+        self._trailer = bytearray()
         self._zlib_bufsize = zlib_bufsize
 
     def _read(self, read: Callable[[int], bytes], size: int) -> bytes:
@@ -1458,32 +1462,29 @@ class PackStreamReader:
         """
         data = read(size)
 
-        # maintain a trailer of the last hash_size bytes we've read
+        # maintain a trailer of the last hash_size bytes we've read and
+        # hash everything before it
         n = len(data)
         self._offset += n
-        tn = len(self._trailer)
-        if n >= self._hash_size:
-            to_pop = tn
-            to_add = self._hash_size
+        hash_size = self._hash_size
+        if n >= hash_size:
+            # The whole previous trailer is now followed by enough data
+            if self._trailer:
+                self.sha.update(self._trailer)
+            view = memoryview(data)
+            self.sha.update(view[: n - hash_size])
+            self._trailer = bytearray(view[n - hash_size :])
         else:
-            to_pop = max(n + tn - self._hash_size, 0)
-            to_add = n
-        self.sha.update(
-            bytes(bytearray([self._trailer.popleft() for _ in range(to_pop)]))
-        )
-        self._trailer.extend(data[-to_add:])
-
-        # hash everything but the trailer
-        self.sha.update(data[:-to_add])
+            trailer = self._trailer
+            trailer += data
+            excess = len(trailer) - hash_size
+            if excess > 0:
+                self.sha.update(trailer[:excess])
+                del trailer[:excess]
         return data
 
     def _buf_len(self) -> int:
-        buf = self._rbuf
-        start = buf.tell()
-        buf.seek(0, SEEK_END)
-        end = buf.tell()
-        buf.seek(start)
-        return end - start
+        return len(self._rbuf) - self._rbuf_pos
 
     @property
     def offset(self) -> int:
@@ -1492,21 +1493,28 @@ class PackStreamReader:
 
     def read(self, size: int) -> bytes:
         """Read, blocking until size bytes are read."""
-        buf_len = self._buf_len()
-        if buf_len >= size:
-            return self._rbuf.read(size)
-        buf_data = self._rbuf.read()
-        self._rbuf = BytesIO()
-        return buf_data + self._read(self.read_all, size - buf_len)
+        pos = self._rbuf_pos
+        end = pos + size
+        if end <= len(self._rbuf):
+            self._rbuf_pos = end
+            return self._rbuf[pos:end]
+        buf_data = self._rbuf[pos:]
+        self._rbuf = b""
+        self._rbuf_pos = 0
+        return buf_data + self._read(self.read_all, size - len(buf_data))
 
     def recv(self, size: int) -> bytes:
         """Read up to size bytes, blocking until one byte is read."""
-        buf_len = self._buf_len()
-        if buf_len:
-            data = self._rbuf.read(size)
-            if size >= buf_len:
-                self._rbuf = BytesIO()
-            return data
+        pos = self._rbuf_pos
+        if pos < len(self._rbuf):
+            end = pos + size
+            if end >= len(self._rbuf):
+                data = self._rbuf[pos:] if pos else self._rbuf
+                self._rbuf = b""
+                self._rbuf_pos = 0
+                return data
+            self._rbuf_pos = end
+            return self._rbuf[pos:end]
         return self._read(self.read_some, size)
 
     def __len__(self) -> int:
@@ -1536,23 +1544,29 @@ class PackStreamReader:
         """
         _pack_version, self._num_objects = read_pack_header(self.read)
 
+        read = self.read
+        recv = self.recv
+        hash_func = self.hash_func
+        zlib_bufsize = self._zlib_bufsize
         for _ in range(self._num_objects):
             offset = self.offset
             unpacked, unused = unpack_object(
-                self.read,
-                self.hash_func,
-                read_some=self.recv,
+                read,
+                hash_func,
+                read_some=recv,
                 compute_crc32=compute_crc32,
-                zlib_bufsize=self._zlib_bufsize,
+                zlib_bufsize=zlib_bufsize,
             )
             unpacked.offset = offset
 
-            # prepend any unused data to current read buffer
-            buf = BytesIO()
-            buf.write(unused)
-            buf.write(self._rbuf.read())
-            buf.seek(0)
-            self._rbuf = buf
+            # prepend any unused data to current read buffer; recv() hands
+            # out everything buffered, so usually there is nothing to join
+            if unused:
+                if self._rbuf_pos < len(self._rbuf):
+                    self._rbuf = unused + self._rbuf[self._rbuf_pos :]
+                else:
+                    self._rbuf = unused
+                self._rbuf_pos = 0
 
             yield unpacked
 
@@ -1617,10 +1631,10 @@ class PackStreamCopier(PackStreamReader):
         for i, unpacked in enumerate(self.read_objects()):
             if self._delta_iter:
                 self._delta_iter.record(unpacked)
-            if progress is not None:
-                progress(f"copying pack entries: {i}/{len(self)}\r".encode("ascii"))
+            if progress is not None and i % 1000 == 0:
+                progress(b"copying pack entries: %d/%d\r" % (i, len(self)))
         if progress is not None:
-            progress(f"copied {i} pack entries\n".encode("ascii"))
+            progress(b"copied %d pack entries\n" % i)
 
 
 def obj_sha(
@@ -3016,9 +3030,7 @@ def write_pack(
 
 def pack_header_chunks(num_objects: int) -> Iterator[bytes]:
     """Yield chunks for a pack header."""
-    yield b"PACK"  # Pack header
-    yield struct.pack(b">L", 2)  # Pack version
-    yield struct.pack(b">L", num_objects)  # Number of objects in pack
+    yield _PACK_HEADER.pack(b"PACK", 2, num_objects)
 
 
 def write_pack_header(
@@ -3066,14 +3078,14 @@ def find_reusable_deltas(
         )
     ):
         if progress is not None and i % 1000 == 0:
-            progress(f"checking for reusable deltas: {i}/{len(object_ids)}\r".encode())
+            progress(b"checking for reusable deltas: %d/%d\r" % (i, len(object_ids)))
         if unpacked.pack_type_num == REF_DELTA:
             hexsha = sha_to_hex(unpacked.delta_base)  # type: ignore
             if hexsha in object_ids or hexsha in other_haves:
                 yield unpacked
                 reused += 1
     if progress is not None:
-        progress((f"found {reused} deltas to reuse\n").encode())
+        progress(b"found %d deltas to reuse\n" % reused)
 
 
 def deltify_pack_objects(
@@ -3160,7 +3172,7 @@ def deltas_from_sorted_objects(
     possible_bases: deque[tuple[bytes, int, list[bytes]]] = deque()
     for i, (o, path) in enumerate(objects):
         if progress is not None and i % 1000 == 0:
-            progress((f"generating deltas: {i}\r").encode())
+            progress(b"generating deltas: %d\r" % i)
         raw = o.as_raw_chunks()
         winner = raw
         winner_len = sum(map(len, winner))
@@ -3450,7 +3462,7 @@ class PackChunkGenerator:
         for i, unpacked in enumerate(records):
             type_num = unpacked.pack_type_num
             if progress is not None and i % 1000 == 0:
-                progress((f"writing pack data: {i}/{num_records}\r").encode("ascii"))
+                progress(b"writing pack data: %d/%d\r" % (i, num_records))
             raw: list[bytes] | tuple[int, list[bytes]] | tuple[bytes, list[bytes]]
             if unpacked.delta_base is not None:
                 assert isinstance(unpacked.delta_base, bytes), (
@@ -153,6 +153,7 @@ __all__ = [
     "is_interactive_rebase",
     "lfs_clean",
     "lfs_fetch",
+    "lfs_filter_process",
     "lfs_init",
     "lfs_ls_files",
     "lfs_migrate",
@@ -180,6 +181,7 @@ __all__ = [
     "no_merged_branches",
     "notes_add",
     "notes_list",
+    "notes_list_shas",
     "notes_remove",
     "notes_show",
     "open_repo",
@@ -270,6 +272,7 @@ import logging
 import os
 import posixpath
 import re
+import shutil
 import stat
 import sys
 import time
@@ -404,6 +407,7 @@ from ..trailers import add_trailer_to_message, format_trailers, parse_trailers
 from .lfs import (
     lfs_clean,
     lfs_fetch,
+    lfs_filter_process,
     lfs_init,
     lfs_ls_files,
     lfs_migrate,
@@ -418,6 +422,7 @@ from .lfs import (
 from .notes import (
     notes_add,
     notes_list,
+    notes_list_shas,
     notes_remove,
     notes_show,
 )
@@ -7081,6 +7086,33 @@ def annotate(
 blame = annotate
 
 
+# Memory-backed filesystem used for tree filter checkouts when it has room
+_SHM_DIR = "/dev/shm"
+_SHM_MIN_FREE = 1024 * 1024 * 1024
+
+
+def _memory_tempdir(min_free: int = _SHM_MIN_FREE) -> str | None:
+    """Return a memory-backed directory for tree filter checkouts.
+
+    filter_branch() only uses this when the user has not picked a temporary
+    directory through TMPDIR, TEMP or TMP.
+
+    Args:
+      min_free: Number of bytes that must be free on the filesystem
+
+    Returns:
+      Path to a writable memory-backed directory, or None if there is none
+      with enough free space
+    """
+    try:
+        free = shutil.disk_usage(_SHM_DIR).free
+    except OSError:
+        return None
+    if free < min_free or not os.access(_SHM_DIR, os.W_OK | os.X_OK):
+        return None
+    return _SHM_DIR
+
+
 def filter_branch(
     repo: RepoPath = ".",
     branch: str | bytes = "HEAD",
@@ -7139,6 +7171,15 @@ def filter_branch(
     """
     from ..filter_branch import CommitFilter, filter_refs
 
+    # Tree filters write out and read back every rewritten tree, so check
+    # them out on a memory-backed filesystem unless the user picked a
+    # temporary directory.
+    tempdir = None
+    if tree_filter is not None and not any(
+        os.environ.get(name) for name in ("TMPDIR", "TEMP", "TMP")
+    ):
+        tempdir = _memory_tempdir()
+
     with open_repo_closing(repo) as r:
         # Parse branch/committish
         if isinstance(branch, str):
@@ -7189,6 +7230,7 @@ def filter_branch(
             subdirectory_filter=subdirectory_filter,
             prune_empty=prune_empty,
             tag_name_filter=tag_name_filter,
+            tempdir=tempdir,
         )
 
         # Tag callback for renaming tags
@@ -25,8 +25,9 @@ import fnmatch
 import logging
 import os
 import stat
+import sys
 from collections.abc import Sequence
-from typing import Any
+from typing import Any, BinaryIO
 
 from dulwich.index import (
     ConflictedIndexEntry,
@@ -227,6 +228,105 @@ def lfs_smudge(
         return filter_driver.smudge(pointer_content)
 
 
+def lfs_filter_process(
+    repo: str | os.PathLike[str] | Repo = ".",
+    instream: BinaryIO | None = None,
+    outstream: BinaryIO | None = None,
+) -> None:
+    """Serve clean/smudge requests over Git's long-running filter protocol.
+
+    This is the equivalent of ``git lfs filter-process``: a single process
+    handles every file git needs filtered, rather than git starting a new
+    clean or smudge process for each one. Requests are served until the
+    client closes the stream.
+
+    Args:
+      repo: Path to repository
+      instream: Stream to read requests from (defaults to stdin)
+      outstream: Stream to write responses to (defaults to stdout)
+    """
+    from ..errors import HangupException
+    from ..lfs import LFSFilterDriver, LFSStore
+    from ..protocol import Protocol
+    from . import open_repo_closing
+
+    if instream is None:
+        instream = sys.stdin.buffer
+    if outstream is None:
+        outstream = sys.stdout.buffer
+
+    proto = Protocol(instream.read, outstream.write)
+
+    def read_until_flush() -> list[bytes]:
+        pkts = []
+        while (pkt := proto.read_pkt_line()) is not None:
+            pkts.append(pkt)
+        return pkts
+
+    with open_repo_closing(repo) as r:
+        filter_driver = LFSFilterDriver(
+            LFSStore.from_repo(r), config=r.get_config_stack()
+        )
+
+        # Handshake
+        welcome = [pkt.rstrip(b"\n") for pkt in read_until_flush()]
+        if b"git-filter-client" not in welcome or b"version=2" not in welcome:
+            raise ValueError(f"Unsupported filter protocol handshake: {welcome!r}")
+        proto.write_pkt_line(b"git-filter-server\n")
+        proto.write_pkt_line(b"version=2\n")
+        proto.write_pkt_line(None)
+        capabilities = {pkt.rstrip(b"\n") for pkt in read_until_flush()}
+        for capability in (b"capability=clean", b"capability=smudge"):
+            if capability in capabilities:
+                proto.write_pkt_line(capability + b"\n")
+        proto.write_pkt_line(None)
+        outstream.flush()
+
+        while True:
+            try:
+                headers = read_until_flush()
+            except HangupException:
+                # Client is done
+                return
+            command = pathname = b""
+            for header in headers:
+                key, _, value = header.rstrip(b"\n").partition(b"=")
+                if key == b"command":
+                    command = value
+                elif key == b"pathname":
+                    pathname = value
+            data = b"".join(read_until_flush())
+
+            try:
+                if command == b"clean":
+                    result = filter_driver.clean(data)
+                elif command == b"smudge":
+                    result = filter_driver.smudge(data, pathname)
+                else:
+                    raise ValueError(f"Unsupported filter command: {command!r}")
+            except Exception as e:
+                logging.warning(
+                    "LFS %s failed for %s: %s",
+                    command.decode(errors="replace"),
+                    pathname.decode(errors="replace"),
+                    e,
+                )
+                proto.write_pkt_line(b"status=error\n")
+                proto.write_pkt_line(None)
+                outstream.flush()
+                continue
+
+            proto.write_pkt_line(b"status=success\n")
+            proto.write_pkt_line(None)
+            # Maximum pkt-line payload is 65516 bytes
+            for i in range(0, len(result), 65516):
+                proto.write_pkt_line(result[i : i + 65516])
+            proto.write_pkt_line(None)
+            # Empty list: keep the status sent above
+            proto.write_pkt_line(None)
+            outstream.flush()
+
+
 def lfs_ls_files(
     repo: str | os.PathLike[str] | Repo = ".",
     ref: str | bytes | None = None,
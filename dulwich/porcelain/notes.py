@@ -183,3 +183,27 @@ def notes_list(
         config = r.get_config_stack()
 
         return r.notes.list_notes(notes_ref, config=config)
+
+
+def notes_list_shas(
+    repo: "RepoPath", ref: bytes = b"commits"
+) -> list[tuple[ObjectID, ObjectID]]:
+    """List the objects that have notes, without reading the note contents.
+
+    Args:
+      repo: Path to repository
+      ref: Notes ref to use (defaults to "commits" for refs/notes/commits)
+
+    Returns:
+      List of tuples of (object_sha, note_sha)
+    """
+    from . import DEFAULT_ENCODING, open_repo_closing
+
+    with open_repo_closing(repo) as r:
+        if isinstance(ref, str):
+            ref = ref.encode(DEFAULT_ENCODING)
+
+        notes_ref = _make_notes_ref(ref)
+        config = r.get_config_stack()
+
+        return r.notes.list_note_shas(notes_ref, config=config)
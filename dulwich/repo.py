@@ -1631,7 +1631,11 @@ class Repo(BaseRepo):
             current = os.path.dirname(current)
         parts.reverse()
         for part in parts:
-            os.mkdir(part)
+            try:
+                os.mkdir(part)
+            except FileExistsError:
+                # Created by a concurrent writer, e.g. another fetch
+                continue
             if dir_mode is not None:
                 os.chmod(part, dir_mode)
         if committer is None:
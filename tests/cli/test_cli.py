@@ -23,17 +23,19 @@
 
 """Tests for dulwich.cli."""
 
+import importlib.util
 import io
 import logging
 import os
 import shutil
+import subprocess
 import sys
 import tempfile
 import unittest
-from unittest import skipIf
-from unittest.mock import MagicMock, patch
+from unittest import skipIf, skipUnless
+from unittest.mock import ANY, MagicMock, patch
 
-from dulwich import cli
+from dulwich import cli, porcelain
 from dulwich.cli import (
     AutoFlushBinaryIOWrapper,
     AutoFlushTextIOWrapper,
@@ -43,17 +45,70 @@ from dulwich.cli import (
     launch_editor,
     write_columns,
 )
+from dulwich.object_store import BaseObjectStore
+from dulwich.objects import S_IFGITLINK, Blob, Tree
+from dulwich.pack import Pack
 from dulwich.repo import Repo
 from dulwich.tests.utils import (
     build_commit_graph,
 )
 
-from .. import TestCase
+from .. import DependencyMissing, TestCase
+
+# External tools used by shell-based filter-branch tests; checked once so
+# tests lacking them are skipped before their fixture is set up.
+_HAS_SED = shutil.which("sed") is not None
+_HAS_TR = shutil.which("tr") is not None
+_HAS_CUT = shutil.which("cut") is not None
+_HAS_GREP = shutil.which("grep") is not None
+_HAS_GIT = shutil.which("git") is not None
+
+
+def _fixture_tmpdir() -> str | None:
+    """Return the parent directory for CLI test repositories.
+
+    DULWICH_TEST_TMPDIR takes precedence; otherwise /dev/shm is used when it
+    is writable, since these tests are dominated by small-file I/O.
+    Returning None leaves the choice to the tempfile module.
+    """
+    tmpdir = os.environ.get("DULWICH_TEST_TMPDIR")
+    if tmpdir:
+        return tmpdir
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK | os.X_OK):
+        return "/dev/shm"
+    return None
 
 
 class DulwichCliTestCase(TestCase):
     """Base class for CLI tests."""
 
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        # Build the fixture repository once per class; every test then starts
+        # from its own copy rather than re-running init and any setup commits.
+        template_dir = tempfile.TemporaryDirectory(
+            dir=_fixture_tmpdir(), ignore_cleanup_errors=True
+        )
+        cls.addClassCleanup(template_dir.cleanup)
+        cls._template_path = os.path.join(template_dir.name, "repo")
+        os.mkdir(cls._template_path)
+        with (
+            patch.dict(
+                os.environ, {"HOME": "/nonexistent", "GIT_CONFIG_NOSYSTEM": "1"}
+            ),
+            Repo.init(cls._template_path) as repo,
+        ):
+            cls.build_template(repo)
+
+    @classmethod
+    def build_template(cls, repo: Repo) -> None:
+        """Populate the per-class template repository.
+
+        Args:
+          repo: Freshly initialised repository to populate
+        """
+
     def setUp(self) -> None:
         super().setUp()
         # Suppress expected error logging during CLI tests
@@ -67,56 +122,78 @@ class DulwichCliTestCase(TestCase):
         root_logger.setLevel(logging.CRITICAL)
         self.addCleanup(root_logger.setLevel, original_root_level)
 
-        self.test_dir = tempfile.mkdtemp()
-        self.addCleanup(shutil.rmtree, self.test_dir)
+        test_dir = tempfile.TemporaryDirectory(
+            dir=_fixture_tmpdir(), ignore_cleanup_errors=True
+        )
+        self.addCleanup(test_dir.cleanup)
+        self.test_dir = test_dir.name
         self.repo_path = os.path.join(self.test_dir, "repo")
-        os.mkdir(self.repo_path)
-        self.repo = Repo.init(self.repo_path)
+        shutil.copytree(self._template_path, self.repo_path, symlinks=True)
+        self.repo = Repo(self.repo_path)
         self.addCleanup(self.repo.close)
 
+    @staticmethod
+    def _write_file(path, content):
+        """Create or truncate path with content, without the text I/O stack."""
+        if isinstance(content, str):
+            content = content.encode("utf-8")
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, content)
+        finally:
+            os.close(fd)
+
+    def _commit(self, message, *paths):
+        """Stage paths and commit them without going through the CLI.
+
+        Fixture setup uses this so that only the command under test is run
+        through ``cli.main``.
+        """
+        porcelain.add(self.repo, [os.path.join(self.repo_path, p) for p in paths])
+        return porcelain.commit(self.repo, message=message)
+
     def _run_cli(self, *args, stdout_stream=None):
         """Run CLI command and capture output."""
 
-        class MockStream:
+        class MockStream(io.TextIOWrapper):
             def __init__(self):
-                self._buffer = io.BytesIO()
-                self.buffer = self._buffer
-
-            def write(self, data):
-                if isinstance(data, bytes):
-                    self._buffer.write(data)
-                else:
-                    self._buffer.write(data.encode("utf-8"))
+                super().__init__(
+                    io.BytesIO(), encoding="utf-8", newline="\n", write_through=True
+                )
 
             def getvalue(self):
-                value = self._buffer.getvalue()
+                value = self.buffer.getvalue()
                 try:
                     return value.decode("utf-8")
                 except UnicodeDecodeError:
                     return value
 
-            def __getattr__(self, name):
-                return getattr(self._buffer, name)
-
         old_stdout = sys.stdout
         old_stderr = sys.stderr
         old_cwd = os.getcwd()
 
-        try:
-            # Use custom stdout_stream if provided, otherwise use MockStream
-            if stdout_stream:
-                sys.stdout = stdout_stream
-                if not hasattr(sys.stdout, "buffer"):
-                    sys.stdout.buffer = sys.stdout
-            else:
-                sys.stdout = MockStream()
+        # A custom stdout_stream is a binary stream; it becomes the buffer
+        # of a text stdout so the command can write either kind of output.
+        if stdout_stream is not None:
+            stdout = io.TextIOWrapper(
+                stdout_stream, encoding="utf-8", newline="\n", write_through=True
+            )
+        else:
+            stdout = MockStream()
 
+        try:
+            sys.stdout = stdout
             sys.stderr = MockStream()
 
             os.chdir(self.repo_path)
             result = cli.main(list(args))
-            return result, sys.stdout.getvalue(), sys.stderr.getvalue()
+            if stdout_stream is not None:
+                return result, stdout_stream.getvalue(), sys.stderr.getvalue()
+            return result, stdout.getvalue(), sys.stderr.getvalue()
         finally:
+            if stdout_stream is not None:
+                # Don't let the wrapper close the caller's stream
+                stdout.detach()
             sys.stdout = old_stdout
             sys.stderr = old_stderr
             os.chdir(old_cwd)
@@ -131,6 +208,17 @@ class InitCommandTest(DulwichCliTestCase):
         _result, _stdout, _stderr = self._run_cli("init", new_repo_path)
         self.assertTrue(os.path.exists(os.path.join(new_repo_path, ".git")))
 
+    def test_init_defaults_to_cwd(self):
+        # The default path follows the cwd of each run, not of the first one
+        old_cwd = os.getcwd()
+        self.addCleanup(os.chdir, old_cwd)
+        for name in ("first", "second"):
+            path = os.path.join(self.test_dir, name)
+            os.mkdir(path)
+            os.chdir(path)
+            cli.main(["init"])
+            self.assertTrue(os.path.exists(os.path.join(path, ".git")))
+
     def test_init_bare(self):
         # Create a new directory for bare repo
         bare_repo_path = os.path.join(self.test_dir, "bare_repo")
@@ -223,6 +311,31 @@ class HelperFunctionsTest(TestCase):
         self.assertAlmostEqual(expected, result, delta=2)
 
 
+class CommandParserTest(TestCase):
+    """Tests for per-class argument parser caching."""
+
+    def test_parser_is_cached(self):
+        parser = cli.cmd_add.get_parser()
+        self.assertIs(parser, cli.cmd_add.get_parser())
+        self.assertEqual(["a", "b"], parser.parse_args(["a", "b"]).path)
+        # Parsing must not leave state behind on the cached parser
+        self.assertEqual(["c"], parser.parse_args(["c"]).path)
+
+    def test_parser_not_shared_between_commands(self):
+        self.assertIsNot(cli.cmd_add.get_parser(), cli.cmd_rm.get_parser())
+        self.assertIsNot(cli.Command.get_parser(), cli.cmd_add.get_parser())
+
+    def test_check_no_args(self):
+        with patch.object(cli.cmd_write_tree, "get_parser") as get_parser:
+            cli.cmd_write_tree.check_no_args([])
+        get_parser.assert_not_called()
+
+        with patch("sys.stderr", io.StringIO()):
+            with self.assertRaises(SystemExit) as cm:
+                cli.cmd_write_tree.check_no_args(["unexpected"])
+        self.assertEqual(2, cm.exception.code)
+
+
 class AddCommandTest(DulwichCliTestCase):
     """Tests for add command."""
 
@@ -260,8 +373,7 @@ class RmCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Add test file")
+        self._commit("Add test file", "test.txt")
 
         # Now remove it from index and working directory
         _result, _stdout, _stderr = self._run_cli("rm", "test.txt")
@@ -269,6 +381,63 @@ class RmCommandTest(DulwichCliTestCase):
         self.assertNotIn(b"test.txt", self.repo.open_index())
 
 
+class DumpIndexCommandTest(DulwichCliTestCase):
+    """Tests for dump-index command."""
+
+    def test_dump_index(self):
+        for name in ("a.txt", "b.txt"):
+            with open(os.path.join(self.repo_path, name), "w") as f:
+                f.write(name)
+        self._run_cli("add", "a.txt", "b.txt")
+
+        index_path = os.path.join(self.repo_path, ".git", "index")
+        with self.assertLogs("dulwich.cli", level="INFO") as cm:
+            self._run_cli("dump-index", index_path)
+        self.assertEqual(1, len(cm.records))
+        lines = cm.records[0].getMessage().splitlines()
+        self.assertEqual(2, len(lines))
+        self.assertTrue(lines[0].startswith("b'a.txt' IndexEntry("))
+        self.assertTrue(lines[1].startswith("b'b.txt' IndexEntry("))
+
+
+class AnnotateCommandTest(DulwichCliTestCase):
+    """Tests for annotate command."""
+
+    def test_annotate(self):
+        test_file = os.path.join(self.repo_path, "test.txt")
+        with open(test_file, "w") as f:
+            f.write("line one\n")
+        self._commit("First", "test.txt")
+        first = self.repo.head()
+        with open(test_file, "a") as f:
+            f.write("line two\n")
+        self._commit("Second", "test.txt")
+        second = self.repo.head()
+
+        _result, stdout, _stderr = self._run_cli("annotate", "test.txt")
+        self.assertEqual(
+            f"{first[:8].decode()} line one\n{second[:8].decode()} line two\n",
+            stdout,
+        )
+
+
+class ReflogCommandTest(DulwichCliTestCase):
+    """Tests for reflog command."""
+
+    def test_reflog(self):
+        test_file = os.path.join(self.repo_path, "test.txt")
+        with open(test_file, "w") as f:
+            f.write("test content")
+        self._commit("Initial", "test.txt")
+        head = self.repo.head()
+
+        _result, stdout, _stderr = self._run_cli("reflog")
+        self.assertEqual(f"{head[:8].decode()} HEAD@{{0}}: commit: Initial\n", stdout)
+
+        _result, stdout, _stderr = self._run_cli("reflog", "--all")
+        self.assertIn(f"{head[:8].decode()} HEAD: commit: Initial\n", stdout)
+
+
 class CommitCommandTest(DulwichCliTestCase):
     """Tests for commit command."""
 
@@ -478,6 +647,26 @@ class StatusCommandTest(DulwichCliTestCase):
         self.assertIn("Untracked files:", stdout)
         self.assertIn("untracked.txt", stdout)
 
+    def test_status_staged_and_unstaged(self):
+        for name in ("a.txt", "b.txt"):
+            with open(os.path.join(self.repo_path, name), "w") as f:
+                f.write("one")
+        self._commit("Initial", "a.txt", "b.txt")
+        with open(os.path.join(self.repo_path, "a.txt"), "w") as f:
+            f.write("two")
+        self._run_cli("add", "a.txt")
+        with open(os.path.join(self.repo_path, "b.txt"), "w") as f:
+            f.write("two")
+
+        _result, stdout, _stderr = self._run_cli("status")
+        self.assertEqual(
+            "Changes to be committed:\n\n"
+            "\tmodify: a.txt\n\n"
+            "Changes not staged for commit:\n\n"
+            "\tb.txt\n\n",
+            stdout,
+        )
+
     def test_status_with_column(self):
         # Create multiple untracked files
         for i in range(5):
@@ -513,37 +702,34 @@ class BranchCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         # Create branch
         _result, _stdout, _stderr = self._run_cli("branch", "test-branch")
-        self.assertIn(b"refs/heads/test-branch", self.repo.refs.keys())
+        self.assertIn(b"refs/heads/test-branch", self.repo.refs)
 
     def test_branch_delete(self):
         # Create initial commit and branch
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
-        self._run_cli("branch", "test-branch")
+        self._commit("Initial", "test.txt")
+        porcelain.branch_create(self.repo, "test-branch")
 
         # Delete branch
         _result, _stdout, _stderr = self._run_cli("branch", "-d", "test-branch")
-        self.assertNotIn(b"refs/heads/test-branch", self.repo.refs.keys())
+        self.assertNotIn(b"refs/heads/test-branch", self.repo.refs)
 
     def test_branch_list_all(self):
         # Create initial commit
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         # Create local test branches
-        self._run_cli("branch", "feature-1")
-        self._run_cli("branch", "feature-2")
+        porcelain.branch_create(self.repo, "feature-1")
+        porcelain.branch_create(self.repo, "feature-2")
 
         # Setup a remote and create remote branches
         self.repo.refs[b"refs/remotes/origin/master"] = self.repo.refs[
@@ -575,8 +761,7 @@ class BranchCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         master_sha = self.repo.refs[b"refs/heads/master"]
 
@@ -587,8 +772,7 @@ class BranchCommandTest(DulwichCliTestCase):
         test_file2 = os.path.join(self.repo_path, "test2.txt")
         with open(test_file2, "w") as f:
             f.write("test2")
-        self._run_cli("add", "test2.txt")
-        self._run_cli("commit", "--message=New branch commit")
+        self._commit("New branch commit", "test2.txt")
 
         new_branch_sha = self.repo.refs[b"HEAD"]
 
@@ -611,8 +795,7 @@ class BranchCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         master_sha = self.repo.refs[b"refs/heads/master"]
 
@@ -623,8 +806,7 @@ class BranchCommandTest(DulwichCliTestCase):
         test_file2 = os.path.join(self.repo_path, "test2.txt")
         with open(test_file2, "w") as f:
             f.write("test2")
-        self._run_cli("add", "test2.txt")
-        self._run_cli("commit", "--message=New branch commit")
+        self._commit("New branch commit", "test2.txt")
         new_branch_sha = self.repo.refs[b"HEAD"]
 
         # Switch back to master
@@ -647,8 +829,7 @@ class BranchCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         # Setup a remote and create remote branches
         self.repo.refs[b"refs/remotes/origin/master"] = self.repo.refs[
@@ -679,30 +860,28 @@ class BranchCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         initial_commit_sha = self.repo.refs[b"HEAD"]
 
         # Create first branch from initial commit
-        self._run_cli("branch", "branch-1")
+        porcelain.branch_create(self.repo, "branch-1")
 
         # Make a new commit on master
         test_file2 = os.path.join(self.repo_path, "test2.txt")
         with open(test_file2, "w") as f:
             f.write("test2")
-        self._run_cli("add", "test2.txt")
-        self._run_cli("commit", "--message=Second commit")
+        self._commit("Second commit", "test2.txt")
 
         second_commit_sha = self.repo.refs[b"HEAD"]
 
         # Create second branch from current master (contains both commits)
-        self._run_cli("branch", "branch-2")
+        porcelain.branch_create(self.repo, "branch-2")
 
         # Create third branch that doesn't contain the second commit
         # Switch to initial commit and create branch from there
         self.repo.refs[b"HEAD"] = initial_commit_sha
-        self._run_cli("branch", "branch-3")
+        porcelain.branch_create(self.repo, "branch-3")
 
         # Switch back to master
         self.repo.refs[b"HEAD"] = second_commit_sha
@@ -746,12 +925,11 @@ class BranchCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
-        self._run_cli("branch", "feature-1")
-        self._run_cli("branch", "feature-2")
-        self._run_cli("branch", "feature-3")
+        porcelain.branch_create(self.repo, "feature-1")
+        porcelain.branch_create(self.repo, "feature-2")
+        porcelain.branch_create(self.repo, "feature-3")
 
         # Run branch --column
         result, stdout, _stderr = self._run_cli("branch", "--all", "--column")
@@ -773,13 +951,12 @@ class BranchCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         # Create local branches
-        self._run_cli("branch", "feature-1")
-        self._run_cli("branch", "feature-2")
-        self._run_cli("branch", "branch-1")
+        porcelain.branch_create(self.repo, "feature-1")
+        porcelain.branch_create(self.repo, "feature-2")
+        porcelain.branch_create(self.repo, "branch-1")
 
         # Run `branch --list` with a pattern "feature-*"
         result, stdout, _stderr = self._run_cli(
@@ -943,9 +1120,8 @@ class CheckoutCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
-        self._run_cli("branch", "test-branch")
+        self._commit("Initial", "test.txt")
+        porcelain.branch_create(self.repo, "test-branch")
 
         # Checkout branch
         _result, _stdout, _stderr = self._run_cli("checkout", "test-branch")
@@ -962,12 +1138,11 @@ class TagCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         # Create tag
         _result, _stdout, _stderr = self._run_cli("tag", "v1.0")
-        self.assertIn(b"refs/tags/v1.0", self.repo.refs.keys())
+        self.assertIn(b"refs/tags/v1.0", self.repo.refs)
 
 
 class VerifyCommitCommandTest(DulwichCliTestCase):
@@ -978,13 +1153,13 @@ class VerifyCommitCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         # Mock the porcelain.verify_commit function since we don't have GPG setup
-        with patch("dulwich.cli.porcelain.verify_commit") as mock_verify:
+        with patch("dulwich.porcelain.verify_commit") as mock_verify:
             _result, stdout, _stderr = self._run_cli("verify-commit", "HEAD")
-            mock_verify.assert_called_once_with(".", "HEAD")
+            mock_verify.assert_called_once_with(ANY, "HEAD")
+            self.assertIsInstance(mock_verify.call_args.args[0], Repo)
             self.assertIn("Good signature", stdout)
 
     def test_verify_commit_multiple(self):
@@ -992,18 +1167,19 @@ class VerifyCommitCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test1")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=First")
+        self._commit("First", "test.txt")
 
         with open(test_file, "w") as f:
             f.write("test2")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Second")
+        self._commit("Second", "test.txt")
 
         # Mock the porcelain.verify_commit function
-        with patch("dulwich.cli.porcelain.verify_commit") as mock_verify:
+        with patch("dulwich.porcelain.verify_commit") as mock_verify:
             _result, stdout, _stderr = self._run_cli("verify-commit", "HEAD", "HEAD~1")
             self.assertEqual(mock_verify.call_count, 2)
+            # The repository is opened once and shared by both verifications
+            first, second = mock_verify.call_args_list
+            self.assertIs(first.args[0], second.args[0])
             self.assertIn("HEAD", stdout)
             self.assertIn("HEAD~1", stdout)
 
@@ -1012,14 +1188,14 @@ class VerifyCommitCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         # Mock the porcelain.verify_commit function
-        with patch("dulwich.cli.porcelain.verify_commit") as mock_verify:
+        with patch("dulwich.porcelain.verify_commit") as mock_verify:
             # Test that verify-commit without arguments defaults to HEAD
             _result, stdout, _stderr = self._run_cli("verify-commit")
-            mock_verify.assert_called_once_with(".", "HEAD")
+            mock_verify.assert_called_once_with(ANY, "HEAD")
+            self.assertIsInstance(mock_verify.call_args.args[0], Repo)
             self.assertIn("Good signature", stdout)
 
 
@@ -1031,16 +1207,16 @@ class VerifyTagCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         # Create an annotated tag
-        self._run_cli("tag", "--annotated", "v1.0")
+        porcelain.tag_create(self.repo, "v1.0", annotated=True)
 
         # Mock the porcelain.verify_tag function since we don't have GPG setup
-        with patch("dulwich.cli.porcelain.verify_tag") as mock_verify:
+        with patch("dulwich.porcelain.verify_tag") as mock_verify:
             _result, stdout, _stderr = self._run_cli("verify-tag", "v1.0")
-            mock_verify.assert_called_once_with(".", "v1.0")
+            mock_verify.assert_called_once_with(ANY, "v1.0")
+            self.assertIsInstance(mock_verify.call_args.args[0], Repo)
             self.assertIn("Good signature", stdout)
 
     def test_verify_tag_multiple(self):
@@ -1048,15 +1224,14 @@ class VerifyTagCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         # Create multiple annotated tags
-        self._run_cli("tag", "--annotated", "v1.0")
-        self._run_cli("tag", "--annotated", "v2.0")
+        porcelain.tag_create(self.repo, "v1.0", annotated=True)
+        porcelain.tag_create(self.repo, "v2.0", annotated=True)
 
         # Mock the porcelain.verify_tag function
-        with patch("dulwich.cli.porcelain.verify_tag") as mock_verify:
+        with patch("dulwich.porcelain.verify_tag") as mock_verify:
             _result, stdout, _stderr = self._run_cli("verify-tag", "v1.0", "v2.0")
             self.assertEqual(mock_verify.call_count, 2)
             self.assertIn("v1.0", stdout)
@@ -1069,14 +1244,11 @@ class DiffCommandTest(DulwichCliTestCase):
     def test_diff_working_tree(self):
         # Create and commit a file
         test_file = os.path.join(self.repo_path, "test.txt")
-        with open(test_file, "w") as f:
-            f.write("initial content\n")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._write_file(test_file, "initial content\n")
+        self._commit("Initial", "test.txt")
 
         # Modify the file
-        with open(test_file, "w") as f:
-            f.write("initial content\nmodified\n")
+        self._write_file(test_file, "initial content\nmodified\n")
 
         # Test unstaged diff
         _result, stdout, _stderr = self._run_cli("diff")
@@ -1085,14 +1257,11 @@ class DiffCommandTest(DulwichCliTestCase):
     def test_diff_staged(self):
         # Create initial commit
         test_file = os.path.join(self.repo_path, "test.txt")
-        with open(test_file, "w") as f:
-            f.write("initial content\n")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._write_file(test_file, "initial content\n")
+        self._commit("Initial", "test.txt")
 
         # Modify and stage the file
-        with open(test_file, "w") as f:
-            f.write("initial content\nnew file\n")
+        self._write_file(test_file, "initial content\nnew file\n")
         self._run_cli("add", "test.txt")
 
         # Test staged diff
@@ -1102,14 +1271,11 @@ class DiffCommandTest(DulwichCliTestCase):
     def test_diff_cached(self):
         # Create initial commit
         test_file = os.path.join(self.repo_path, "test.txt")
-        with open(test_file, "w") as f:
-            f.write("initial content\n")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._write_file(test_file, "initial content\n")
+        self._commit("Initial", "test.txt")
 
         # Modify and stage the file
-        with open(test_file, "w") as f:
-            f.write("initial content\nnew file\n")
+        self._write_file(test_file, "initial content\nnew file\n")
         self._run_cli("add", "test.txt")
 
         # Test cached diff (alias for staged)
@@ -1119,15 +1285,11 @@ class DiffCommandTest(DulwichCliTestCase):
     def test_diff_commit(self):
         # Create two commits
         test_file = os.path.join(self.repo_path, "test.txt")
-        with open(test_file, "w") as f:
-            f.write("first version\n")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=First")
+        self._write_file(test_file, "first version\n")
+        self._commit("First", "test.txt")
 
-        with open(test_file, "w") as f:
-            f.write("first version\nsecond line\n")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Second")
+        self._write_file(test_file, "first version\nsecond line\n")
+        self._commit("Second", "test.txt")
 
         # Add working tree changes
         with open(test_file, "a") as f:
@@ -1140,18 +1302,14 @@ class DiffCommandTest(DulwichCliTestCase):
     def test_diff_two_commits(self):
         # Create two commits
         test_file = os.path.join(self.repo_path, "test.txt")
-        with open(test_file, "w") as f:
-            f.write("first version\n")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=First")
+        self._write_file(test_file, "first version\n")
+        self._commit("First", "test.txt")
 
         # Get first commit SHA
         first_commit = self.repo.refs[b"HEAD"].decode()
 
-        with open(test_file, "w") as f:
-            f.write("first version\nsecond line\n")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Second")
+        self._write_file(test_file, "first version\nsecond line\n")
+        self._commit("Second", "test.txt")
 
         # Get second commit SHA
         second_commit = self.repo.refs[b"HEAD"].decode()
@@ -1163,21 +1321,16 @@ class DiffCommandTest(DulwichCliTestCase):
     def test_diff_commit_vs_working_tree(self):
         # Test that diff <commit> shows working tree vs commit (not commit vs parent)
         test_file = os.path.join(self.repo_path, "test.txt")
-        with open(test_file, "w") as f:
-            f.write("first version\n")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=First")
+        self._write_file(test_file, "first version\n")
+        self._commit("First", "test.txt")
 
         first_commit = self.repo.refs[b"HEAD"].decode()
 
-        with open(test_file, "w") as f:
-            f.write("first version\nsecond line\n")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Second")
+        self._write_file(test_file, "first version\nsecond line\n")
+        self._commit("Second", "test.txt")
 
         # Add changes to working tree
-        with open(test_file, "w") as f:
-            f.write("completely different\n")
+        self._write_file(test_file, "completely different\n")
 
         # diff <first_commit> should show working tree vs first commit
         _result, stdout, _stderr = self._run_cli("diff", first_commit)
@@ -1193,23 +1346,16 @@ class DiffCommandTest(DulwichCliTestCase):
         os.makedirs(subdir)
         file3 = os.path.join(subdir, "file3.txt")
 
-        with open(file1, "w") as f:
-            f.write("content1\n")
-        with open(file2, "w") as f:
-            f.write("content2\n")
-        with open(file3, "w") as f:
-            f.write("content3\n")
+        self._write_file(file1, "content1\n")
+        self._write_file(file2, "content2\n")
+        self._write_file(file3, "content3\n")
 
-        self._run_cli("add", ".")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", ".")
 
         # Modify all files
-        with open(file1, "w") as f:
-            f.write("modified1\n")
-        with open(file2, "w") as f:
-            f.write("modified2\n")
-        with open(file3, "w") as f:
-            f.write("modified3\n")
+        self._write_file(file1, "modified1\n")
+        self._write_file(file2, "modified2\n")
+        self._write_file(file3, "modified3\n")
 
         # Test diff with specific file
         _result, stdout, _stderr = self._run_cli("diff", "--", "file1.txt")
@@ -1239,8 +1385,7 @@ class DiffCommandTest(DulwichCliTestCase):
 
         # Test diff with commit and paths
         first_commit = self.repo.refs[b"HEAD"].decode()
-        with open(file1, "w") as f:
-            f.write("newer1\n")
+        self._write_file(file1, "newer1\n")
         _result, stdout, _stderr = self._run_cli(
             "diff", first_commit, "--", "file1.txt"
         )
@@ -1252,14 +1397,11 @@ class DiffCommandTest(DulwichCliTestCase):
     def test_diff_stat(self):
         # Create and commit a file
         test_file = os.path.join(self.repo_path, "test.txt")
-        with open(test_file, "w") as f:
-            f.write("initial content\n")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._write_file(test_file, "initial content\n")
+        self._commit("Initial", "test.txt")
 
         # Modify the file
-        with open(test_file, "w") as f:
-            f.write("initial content\nmodified\n")
+        self._write_file(test_file, "initial content\nmodified\n")
 
         # Test --stat output
         _result, stdout, _stderr = self._run_cli("diff", "--stat")
@@ -1272,12 +1414,12 @@ class DiffCommandTest(DulwichCliTestCase):
 class FilterBranchCommandTest(DulwichCliTestCase):
     """Tests for filter-branch command."""
 
-    def setUp(self):
-        super().setUp()
+    @classmethod
+    def build_template(cls, repo):
         # Create a more complex repository structure for testing
         # Create some files in subdirectories
-        os.makedirs(os.path.join(self.repo_path, "subdir"))
-        os.makedirs(os.path.join(self.repo_path, "other"))
+        os.makedirs(os.path.join(repo.path, "subdir"))
+        os.makedirs(os.path.join(repo.path, "other"))
 
         # Create files
         files = {
@@ -1289,31 +1431,30 @@ class FilterBranchCommandTest(DulwichCliTestCase):
         }
 
         for path, content in files.items():
-            file_path = os.path.join(self.repo_path, path)
-            with open(file_path, "w") as f:
-                f.write(content)
+            file_path = os.path.join(repo.path, path)
+            cls._write_file(file_path, content)
 
         # Add all files and create initial commit
-        self._run_cli("add", ".")
-        self._run_cli("commit", "--message=Initial commit")
+        porcelain.add(repo, [os.path.join(repo.path, path) for path in files])
+        porcelain.commit(repo, message="Initial commit")
 
         # Create a second commit modifying subdir
-        with open(os.path.join(self.repo_path, "subdir/file1.txt"), "a") as f:
+        with open(os.path.join(repo.path, "subdir/file1.txt"), "a") as f:
             f.write("\nModified content")
-        self._run_cli("add", "subdir/file1.txt")
-        self._run_cli("commit", "--message=Modify subdir file")
+        porcelain.add(repo, [os.path.join(repo.path, "subdir/file1.txt")])
+        porcelain.commit(repo, message="Modify subdir file")
 
         # Create a third commit in other dir
-        with open(os.path.join(self.repo_path, "other/file3.txt"), "a") as f:
+        with open(os.path.join(repo.path, "other/file3.txt"), "a") as f:
             f.write("\nMore content")
-        self._run_cli("add", "other/file3.txt")
-        self._run_cli("commit", "--message=Modify other file")
+        porcelain.add(repo, [os.path.join(repo.path, "other/file3.txt")])
+        porcelain.commit(repo, message="Modify other file")
 
         # Create a branch
-        self._run_cli("branch", "test-branch")
+        porcelain.branch_create(repo, "test-branch")
 
         # Create a tag
-        self._run_cli("tag", "v1.0")
+        porcelain.tag_create(repo, "v1.0")
 
     def test_filter_branch_subdirectory_filter(self):
         """Test filter-branch with subdirectory filter."""
@@ -1342,14 +1483,13 @@ class FilterBranchCommandTest(DulwichCliTestCase):
         self.assertFalse(os.path.exists(os.path.join(self.repo_path, "subdir")))
 
         # Check that original refs were backed up
-        original_refs = [
-            ref for ref in self.repo.refs.keys() if ref.startswith(b"refs/original/")
-        ]
+        original_refs = self.repo.refs.keys(base=b"refs/original/")
         self.assertTrue(
             len(original_refs) > 0, "No original refs found after filter-branch"
         )
 
     @skipIf(sys.platform == "win32", "sed command not available on Windows")
+    @skipUnless(_HAS_SED, "sed command not available")
     def test_filter_branch_msg_filter(self):
         """Test filter-branch with message filter."""
         # Run filter-branch to prepend [FILTERED] to commit messages
@@ -1365,6 +1505,119 @@ class FilterBranchCommandTest(DulwichCliTestCase):
         self.assertIn("[FILTERED] Modify subdir file", stdout)
         self.assertIn("[FILTERED] Initial commit", stdout)
 
+    @skipIf(sys.platform == "win32", "cat command not available on Windows")
+    def test_filter_branch_parent_filter_without_shell(self):
+        """Test filter-branch with a parent filter that needs no shell."""
+        with patch("subprocess.run", wraps=subprocess.run) as mock_run:
+            result, _stdout, _stderr = self._run_cli(
+                "filter-branch", "--parent-filter", "cat"
+            )
+        self.assertEqual(result, 0)
+        self.assertEqual(["cat"], mock_run.call_args.args[0])
+        self.assertFalse(mock_run.call_args.kwargs["shell"])
+
+    @skipIf(sys.platform == "win32", "POSIX shell")
+    def test_filter_branch_msg_filter_runs_once_per_message(self):
+        """Messages are filtered once each, without a process per commit."""
+        with (
+            patch("subprocess.run", wraps=subprocess.run) as mock_run,
+            patch.object(
+                cli._FilterShell,
+                "filter",
+                autospec=True,
+                side_effect=cli._FilterShell.filter,
+            ) as mock_filter,
+        ):
+            result, _stdout, _stderr = self._run_cli(
+                "filter-branch",
+                "--msg-filter",
+                "tr a-z A-Z",
+                "--tag-name-filter",
+                "cat",
+            )
+        self.assertEqual(result, 0)
+        mock_run.assert_not_called()
+        self.assertEqual(
+            [b"Initial commit", b"Modify other file", b"Modify subdir file", b"v1.0"],
+            sorted(call.args[2].strip() for call in mock_filter.call_args_list),
+        )
+
+        result, stdout, _stderr = self._run_cli("log")
+        self.assertIn("INITIAL COMMIT", stdout)
+
+    def _duplicate_message_history(self):
+        """Add commits whose messages repeat earlier ones."""
+        for i, message in enumerate(["Update", "Update", "Initial commit", "Update"]):
+            self._write_file(os.path.join(self.repo_path, "root.txt"), f"{i}\n")
+            self._commit(message, "root.txt")
+
+    def _rewritten_messages(self):
+        return [
+            entry.commit.message
+            for entry in self.repo.get_walker([self.repo.refs[b"refs/heads/master"]])
+        ]
+
+    @skipIf(sys.platform == "win32", "tr command not available on Windows")
+    @skipUnless(_HAS_TR, "tr command not available")
+    def test_filter_branch_parallel_msg_filter_matches_serial(self):
+        """--parallel-msg-filter gives the same history as a serial run."""
+        self._duplicate_message_history()
+        head = self.repo.refs[b"refs/heads/master"]
+
+        result, _stdout, _stderr = self._run_cli(
+            "filter-branch", "--msg-filter", "tr a-z A-Z"
+        )
+        self.assertEqual(result, 0)
+        serial_head = self.repo.refs[b"refs/heads/master"]
+        serial = self._rewritten_messages()
+
+        self.repo.refs[b"refs/heads/master"] = head
+        result, _stdout, _stderr = self._run_cli(
+            "filter-branch",
+            "--force",
+            "--parallel-msg-filter",
+            "--msg-filter",
+            "tr a-z A-Z",
+        )
+        self.assertEqual(result, 0)
+        self.assertEqual(serial, self._rewritten_messages())
+        self.assertEqual(serial_head, self.repo.refs[b"refs/heads/master"])
+        self.assertEqual(3, serial.count(b"UPDATE"))
+
+    @skipIf(sys.platform == "win32", "POSIX shell")
+    def test_filter_branch_msg_filter_stateful(self):
+        """Without --parallel-msg-filter the filter runs per commit, in order."""
+        self._duplicate_message_history()
+        counter = os.path.join(self.test_dir, "counter")
+        msg_filter = (
+            f"n=$(($(cat {counter} 2>/dev/null || echo 0) + 1)); "
+            f"echo $n > {counter}; "
+            'printf "%s " "$n"; cat'
+        )
+        result, _stdout, _stderr = self._run_cli(
+            "filter-branch", "--msg-filter", msg_filter
+        )
+        self.assertEqual(result, 0)
+        messages = list(reversed(self._rewritten_messages()))
+        self.assertEqual(
+            list(range(1, len(messages) + 1)),
+            [int(message.split(b" ", 1)[0]) for message in messages],
+        )
+        # Repeated messages were filtered again, each with its own count
+        self.assertEqual(
+            [b"4 Update", b"5 Update", b"7 Update"],
+            [m.rstrip(b"\n") for m in messages if m.endswith(b"Update")],
+        )
+
+    def test_filter_branch_msg_filter_builtin(self):
+        """Shell builtins fall back to running through the shell."""
+        with self.assertLogs("dulwich.cli", level="ERROR") as cm:
+            result, _stdout, _stderr = self._run_cli(
+                "filter-branch", "--msg-filter", "exit 3"
+            )
+        self.assertEqual(result, 1)
+        self.assertIn("Filter command failed", cm.output[-1])
+
     def test_filter_branch_env_filter(self):
         """Test filter-branch with environment filter."""
         # Run filter-branch to change author email
@@ -1384,8 +1637,7 @@ class FilterBranchCommandTest(DulwichCliTestCase):
         # Create a commit that only touches files outside subdir
         with open(os.path.join(self.repo_path, "root.txt"), "a") as f:
             f.write("\nNew line")
-        self._run_cli("add", "root.txt")
-        self._run_cli("commit", "--message=Modify root file only")
+        self._commit("Modify root file only", "root.txt")
 
         # Run filter-branch to extract subdir with prune-empty
         result, stdout, _stderr = self._run_cli(
@@ -1399,6 +1651,7 @@ class FilterBranchCommandTest(DulwichCliTestCase):
         self.assertNotIn("Modify root file only", stdout)
 
     @skipIf(sys.platform == "win32", "sed command not available on Windows")
+    @skipUnless(_HAS_SED, "sed command not available")
     def test_filter_branch_force(self):
         """Test filter-branch with force option."""
         # Run filter-branch once with a filter that actually changes something
@@ -1409,9 +1662,7 @@ class FilterBranchCommandTest(DulwichCliTestCase):
 
         # Check that backup refs were created
         # The implementation backs up refs under refs/original/
-        original_refs = [
-            ref for ref in self.repo.refs.keys() if ref.startswith(b"refs/original/")
-        ]
+        original_refs = self.repo.refs.keys(base=b"refs/original/")
         self.assertTrue(len(original_refs) > 0, "No original refs found")
 
         # Run again without force - should fail
@@ -1430,15 +1681,36 @@ class FilterBranchCommandTest(DulwichCliTestCase):
         )
         self.assertEqual(result, 0)
 
+    @skipIf(sys.platform == "win32", "tr command not available on Windows")
+    @skipUnless(_HAS_TR, "tr command not available")
+    def test_filter_branch_packed_backup(self):
+        """Backups that were moved to packed-refs are still detected."""
+        result, _stdout, _stderr = self._run_cli(
+            "filter-branch", "--msg-filter", "tr a-z A-Z"
+        )
+        self.assertEqual(result, 0)
+        self.repo.refs.pack_refs(all=True)
+        self.assertIn(
+            b"refs/original/refs/heads/master", self.repo.refs.get_packed_refs()
+        )
+
+        with self.assertLogs("dulwich.cli", level="ERROR") as cm:
+            result, _stdout, _stderr = self._run_cli(
+                "filter-branch", "--msg-filter", "tr A-Z a-z"
+            )
+        self.assertEqual(result, 1)
+        self.assertIn("Cannot create a new backup", cm.output[0])
+
     @skipIf(sys.platform == "win32", "sed command not available on Windows")
+    @skipUnless(_HAS_SED, "sed command not available")
     def test_filter_branch_specific_branch(self):
         """Test filter-branch on a specific branch."""
         # Switch to test-branch and add a commit
         self._run_cli("checkout", "test-branch")
-        with open(os.path.join(self.repo_path, "branch-file.txt"), "w") as f:
-            f.write("Branch specific file")
-        self._run_cli("add", "branch-file.txt")
-        self._run_cli("commit", "--message=Branch commit")
+        self._write_file(
+            os.path.join(self.repo_path, "branch-file.txt"), "Branch specific file"
+        )
+        self._commit("Branch commit", "branch-file.txt")
 
         # Run filter-branch on the test-branch
         with self.assertLogs("dulwich.cli", level="INFO") as cm:
@@ -1474,6 +1746,145 @@ class FilterBranchCommandTest(DulwichCliTestCase):
         result, stdout, _stderr = self._run_cli("ls-tree", "HEAD")
         self.assertNotIn("root.txt", stdout)
 
+    @skipIf(sys.platform == "win32", "POSIX file modes")
+    def test_filter_branch_tree_filter_keeps_nested_files(self):
+        """Tree filters see and preserve the full tree, including modes."""
+        script = os.path.join(self.repo_path, "subdir", "run.sh")
+        self._write_file(script, "#!/bin/sh\n")
+        os.chmod(script, 0o755)
+        self._commit("Add script", "subdir/run.sh")
+
+        result, _stdout, _stderr = self._run_cli(
+            "filter-branch", "--tree-filter", "rm -f root.txt"
+        )
+        self.assertEqual(result, 0)
+
+        result, stdout, _stderr = self._run_cli("ls-tree", "-r", "HEAD")
+        self.assertNotIn("root.txt", stdout)
+        self.assertIn("subdir/file1.txt", stdout)
+        self.assertIn("other/file3.txt", stdout)
+        self.assertRegex(stdout, r"100755 blob [0-9a-f]{40}\tsubdir/run.sh")
+
+    @skipIf(sys.platform == "win32", "POSIX file modes")
+    def test_filter_branch_tree_filter_noop(self):
+        """A tree filter that changes nothing reproduces the same trees."""
+        tree_before = self.repo[self.repo.head()].tree
+        result, _stdout, _stderr = self._run_cli(
+            "filter-branch", "--tree-filter", "true"
+        )
+        self.assertEqual(result, 0)
+        self.assertEqual(tree_before, self.repo[self.repo.head()].tree)
+
+    @skipIf(sys.platform == "win32", "POSIX shell syntax")
+    def test_filter_branch_tree_filter_duplicate_blobs(self):
+        """Identical files are read from the store once per checkout."""
+        for name in ["dup1.txt", "dup2.txt", "dup3.txt"]:
+            self._write_file(os.path.join(self.repo_path, name), "same\n")
+        self._commit("Add duplicates", "dup1.txt", "dup2.txt", "dup3.txt")
+        dup_sha = Blob.from_string(b"same\n").id
+
+        reads = []
+        getitem = BaseObjectStore.__getitem__
+
+        def counting_getitem(store, sha):
+            reads.append(sha)
+            return getitem(store, sha)
+
+        with patch.object(BaseObjectStore, "__getitem__", counting_getitem):
+            result, _stdout, _stderr = self._run_cli(
+                "filter-branch",
+                "--tree-filter",
+                "test ! -e dup1.txt || (cmp dup1.txt dup2.txt && cmp dup1.txt dup3.txt)",
+            )
+        self.assertEqual(result, 0)
+        self.assertEqual(1, reads.count(dup_sha))
+
+    def _commit_submodule(self):
+        """Commit a gitlink entry at ``subdir/module`` and return its sha."""
+        module_sha = b"1" * 40
+        head_tree = self.repo[self.repo[self.repo.head()].tree]
+        subdir = self.repo[head_tree[b"subdir"][1]]
+        assert isinstance(subdir, Tree)
+        subdir.add(b"module", S_IFGITLINK, module_sha)
+        head_tree.add(b"subdir", 0o040000, subdir.id)
+        self.repo.object_store.add_objects([(subdir, None), (head_tree, None)])
+        self.repo.get_worktree().commit(message=b"Add submodule", tree=head_tree.id)
+        return module_sha
+
+    @skipIf(sys.platform == "win32", "POSIX shell syntax")
+    def test_filter_branch_tree_filter_keeps_submodules(self):
+        """Submodules come back as gitlinks unless the filter removes them."""
+        module_sha = self._commit_submodule()
+        tree_before = self.repo[self.repo.head()].tree
+
+        result, _stdout, _stderr = self._run_cli(
+            "filter-branch", "--tree-filter", "true"
+        )
+        self.assertEqual(result, 0)
+        self.assertEqual(tree_before, self.repo[self.repo.head()].tree)
+        subdir = self.repo[self.repo[tree_before][b"subdir"][1]]
+        self.assertEqual((S_IFGITLINK, module_sha), subdir[b"module"])
+
+        result, _stdout, _stderr = self._run_cli(
+            "filter-branch", "--force", "--tree-filter", "rm -rf subdir/module"
+        )
+        self.assertEqual(result, 0)
+        tree = self.repo[self.repo.head()].tree
+        subdir = self.repo[self.repo[tree][b"subdir"][1]]
+        self.assertNotIn(b"module", subdir)
+        self.assertIn(b"file1.txt", subdir)
+
+    @skipIf(sys.platform == "win32", "POSIX file modes")
+    def test_filter_branch_tree_filter_keeps_packed_objects(self):
+        """Unchanged packed objects are not written again as loose objects."""
+        self._run_cli("gc", "--quiet")
+        self.assertEqual(0, porcelain.count_objects(self.repo_path).count)
+
+        result, _stdout, _stderr = self._run_cli(
+            "filter-branch", "--tree-filter", "true"
+        )
+        self.assertEqual(result, 0)
+        self.assertEqual(0, porcelain.count_objects(self.repo_path).count)
+
+    def test_write_chunks(self):
+        """Blob chunks are written out in order without being joined."""
+        chunks = [b"%d," % i for i in range(3000)] + [b""]
+        path = os.path.join(self.test_dir, "chunks")
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | getattr(os, "O_BINARY", 0))
+        try:
+            cli._write_chunks(fd, chunks)
+        finally:
+            os.close(fd)
+        with open(path, "rb") as f:
+            self.assertEqual(b"".join(chunks), f.read())
+
+    @skipIf(sys.platform == "win32", "POSIX shell syntax")
+    def test_filter_branch_tree_filter_isolated(self):
+        """Tree filter state does not leak between commits."""
+        # A leaked "cd" or variable would make the second run write elsewhere
+        tree_filter = (
+            'test -z "$SEEN" && SEEN=1 && mkdir -p out && cd out && : > marker'
+        )
+        result, _stdout, _stderr = self._run_cli(
+            "filter-branch", "--tree-filter", tree_filter
+        )
+        self.assertEqual(result, 0)
+
+        result, stdout, _stderr = self._run_cli("ls-tree", "-r", "HEAD")
+        self.assertIn("out/marker", stdout)
+
+    @skipIf(sys.platform == "win32", "POSIX shell syntax")
+    def test_filter_branch_tree_filter_fails(self):
+        """Failing or malformed tree filters are reported."""
+        for tree_filter in ["false", "echo 'unterminated"]:
+            with self.assertLogs("dulwich.cli", level="ERROR") as cm:
+                result, _stdout, _stderr = self._run_cli(
+                    "filter-branch", "--force", "--tree-filter", tree_filter
+                )
+            self.assertEqual(result, 1)
+            self.assertIn("Filter command failed", cm.output[-1])
+
+    @skipUnless(_HAS_GIT, "git command not available")
     def test_filter_branch_index_filter(self):
         """Test filter-branch with index filter."""
         # Use an index filter to remove a file from the index
@@ -1484,18 +1895,20 @@ class FilterBranchCommandTest(DulwichCliTestCase):
 
         self.assertEqual(result, 0)
 
+    @skipUnless(_HAS_CUT, "cut command not available")
     def test_filter_branch_parent_filter(self):
         """Test filter-branch with parent filter."""
         # Create a merge commit first
         self._run_cli("checkout", "HEAD", "-b", "feature")
-        with open(os.path.join(self.repo_path, "feature.txt"), "w") as f:
-            f.write("Feature")
-        self._run_cli("add", "feature.txt")
-        self._run_cli("commit", "--message=Feature commit")
+        self._write_file(os.path.join(self.repo_path, "feature.txt"), "Feature")
+        self._commit("Feature commit", "feature.txt")
 
         self._run_cli("checkout", "master")
         self._run_cli("merge", "feature", "--message=Merge feature")
 
+        merge = self.repo[self.repo.head()]
+        first_parent = merge.parents[0]
+
         # Use parent filter to linearize history (remove second parent)
         parent_filter = "cut -d' ' -f1"
         result, _stdout, _stderr = self._run_cli(
@@ -1503,7 +1916,13 @@ class FilterBranchCommandTest(DulwichCliTestCase):
         )
 
         self.assertEqual(result, 0)
+        new_merge = self.repo[self.repo.head()]
+        self.assertEqual(1, len(new_merge.parents))
+        self.assertEqual(
+            self.repo[first_parent].tree, self.repo[new_merge.parents[0]].tree
+        )
 
+    @skipUnless(_HAS_GREP, "grep command not available")
     def test_filter_branch_commit_filter(self):
         """Test filter-branch with commit filter."""
         # Use commit filter to skip commits with certain messages
@@ -1521,6 +1940,7 @@ class FilterBranchCommandTest(DulwichCliTestCase):
         # Note: This test may fail because the commit filter syntax is simplified
         # In real Git, skip_commit is a function, but our implementation may differ
 
+    @skipUnless(_HAS_SED, "sed command not available")
     def test_filter_branch_tag_name_filter(self):
         """Test filter-branch with tag name filter."""
         # Run filter-branch with tag name filter to rename tags
@@ -1535,7 +1955,7 @@ class FilterBranchCommandTest(DulwichCliTestCase):
         self.assertEqual(result, 0)
 
         # Check that tag was renamed
-        self.assertIn(b"refs/tags/version-1.0", self.repo.refs.keys())
+        self.assertIn(b"refs/tags/version-1.0", self.repo.refs)
 
     def test_filter_branch_errors(self):
         """Test filter-branch error handling."""
@@ -1561,8 +1981,7 @@ class ShowCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Test commit")
+        self._commit("Test commit", "test.txt")
 
         _result, stdout, _stderr = self._run_cli("show", "HEAD")
         self.assertIn("Test commit", stdout)
@@ -1577,11 +1996,10 @@ class ShowRefCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Test commit")
+        self._commit("Test commit", "test.txt")
 
         # Create a branch
-        self._run_cli("branch", "test-branch")
+        porcelain.branch_create(self.repo, "test-branch")
 
         # Get the exact SHAs
         master_sha = self.repo.refs[b"refs/heads/master"].decode()
@@ -1603,8 +2021,7 @@ class ShowRefCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Test commit")
+        self._commit("Test commit", "test.txt")
 
         # Get the exact SHAs
         head_sha = self.repo.refs[b"HEAD"].decode()
@@ -1624,11 +2041,10 @@ class ShowRefCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Test commit")
-        self._run_cli("branch", "feature-1")
-        self._run_cli("branch", "feature-2")
-        self._run_cli("branch", "bugfix-1")
+        self._commit("Test commit", "test.txt")
+        porcelain.branch_create(self.repo, "feature-1")
+        porcelain.branch_create(self.repo, "feature-2")
+        porcelain.branch_create(self.repo, "bugfix-1")
 
         # Get the exact SHA for master
         master_sha = self.repo.refs[b"refs/heads/master"].decode()
@@ -1647,9 +2063,8 @@ class ShowRefCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Test commit")
-        self._run_cli("tag", "v1.0")
+        self._commit("Test commit", "test.txt")
+        porcelain.tag_create(self.repo, "v1.0")
 
         # Get the exact SHA for master
         master_sha = self.repo.refs[b"refs/heads/master"].decode()
@@ -1668,10 +2083,9 @@ class ShowRefCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Test commit")
-        self._run_cli("tag", "v1.0")
-        self._run_cli("tag", "v2.0")
+        self._commit("Test commit", "test.txt")
+        porcelain.tag_create(self.repo, "v1.0")
+        porcelain.tag_create(self.repo, "v2.0")
 
         # Get the exact SHAs for tags
         v1_sha = self.repo.refs[b"refs/tags/v1.0"].decode()
@@ -1691,8 +2105,7 @@ class ShowRefCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Test commit")
+        self._commit("Test commit", "test.txt")
 
         # Get the exact SHA for master
         master_sha = self.repo.refs[b"refs/heads/master"].decode()
@@ -1713,8 +2126,7 @@ class ShowRefCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Test commit")
+        self._commit("Test commit", "test.txt")
 
         # Get the exact SHA for master
         master_sha = self.repo.refs[b"refs/heads/master"].decode()
@@ -1740,8 +2152,7 @@ class ShowRefCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Test commit")
+        self._commit("Test commit", "test.txt")
 
         # Check if existing ref exists
         result, _stdout, _stderr = self._run_cli(
@@ -1761,8 +2172,7 @@ class ShowRefCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Test commit")
+        self._commit("Test commit", "test.txt")
 
         # Run show-ref with --quiet - should not log anything
         result, _stdout, _stderr = self._run_cli("show-ref", "--quiet")
@@ -1774,8 +2184,7 @@ class ShowRefCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Test commit")
+        self._commit("Test commit", "test.txt")
 
         # Get the exact SHA for master
         master_sha = self.repo.refs[b"refs/heads/master"].decode()
@@ -1794,8 +2203,7 @@ class ShowRefCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Test commit")
+        self._commit("Test commit", "test.txt")
 
         # Search for non-existent pattern
         result, _stdout, _stderr = self._run_cli("show-ref", "nonexistent")
@@ -1811,16 +2219,14 @@ class ShowBranchCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("initial content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial commit")
+        self._commit("Initial commit", "test.txt")
 
         # Create a branch and add a commit
-        self._run_cli("branch", "branch1")
+        porcelain.branch_create(self.repo, "branch1")
         self._run_cli("checkout", "branch1")
         with open(test_file, "a") as f:
             f.write("\nbranch1 content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Branch1 commit")
+        self._commit("Branch1 commit", "test.txt")
 
         # Switch back to master
         self._run_cli("checkout", "master")
@@ -1848,12 +2254,11 @@ class ShowBranchCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("initial content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial commit")
+        self._commit("Initial commit", "test.txt")
 
         # Create branches
-        self._run_cli("branch", "branch1")
-        self._run_cli("branch", "branch2")
+        porcelain.branch_create(self.repo, "branch1")
+        porcelain.branch_create(self.repo, "branch2")
 
         # Run show-branch --list
         with self.assertLogs("dulwich.cli", level="INFO") as cm:
@@ -1874,16 +2279,14 @@ class ShowBranchCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("initial content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial commit")
+        self._commit("Initial commit", "test.txt")
 
         # Create a branch and add a commit
-        self._run_cli("branch", "branch1")
+        porcelain.branch_create(self.repo, "branch1")
         self._run_cli("checkout", "branch1")
         with open(test_file, "a") as f:
             f.write("\nbranch1 content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Branch1 commit")
+        self._commit("Branch1 commit", "test.txt")
 
         # Run show-branch --independent
         with self.assertLogs("dulwich.cli", level="INFO") as cm:
@@ -1902,26 +2305,23 @@ class ShowBranchCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("initial content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial commit")
+        self._commit("Initial commit", "test.txt")
 
         # Get the initial commit SHA
         initial_sha = self.repo.refs[b"HEAD"]
 
         # Create a branch and add a commit
-        self._run_cli("branch", "branch1")
+        porcelain.branch_create(self.repo, "branch1")
         self._run_cli("checkout", "branch1")
         with open(test_file, "a") as f:
             f.write("\nbranch1 content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Branch1 commit")
+        self._commit("Branch1 commit", "test.txt")
 
         # Switch back to master and add a different commit
         self._run_cli("checkout", "master")
         with open(test_file, "a") as f:
             f.write("\nmaster content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Master commit")
+        self._commit("Master commit", "test.txt")
 
         # Run show-branch --merge-base
         with self.assertLogs("dulwich.cli", level="INFO") as cm:
@@ -2201,10 +2601,51 @@ class FormatPatchCommandTest(DulwichCliTestCase):
         self.assertEqual(stdout.strip(), "")
 
 
+class PackObjectsCommandTest(DulwichCliTestCase):
+    """Tests for pack-objects command."""
+
+    def test_pack_objects_from_stdin(self):
+        test_file = os.path.join(self.repo_path, "test.txt")
+        with open(test_file, "w") as f:
+            f.write("test")
+        self._commit("Initial", "test.txt")
+        commit = self.repo[self.repo.head()]
+
+        basename = os.path.join(self.test_dir, "out")
+        old_stdin = sys.stdin
+        try:
+            sys.stdin = io.BytesIO(commit.id + b"\n" + commit.tree + b"\n\n")
+            sys.stdin.buffer = sys.stdin
+            self._run_cli("pack-objects", basename)
+        finally:
+            sys.stdin = old_stdin
+
+        with Pack(basename, object_format=self.repo.object_format) as pack:
+            self.assertEqual(2, len(pack))
+            self.assertIn(commit.id, pack)
+            self.assertIn(commit.tree, pack)
+
+    def test_pack_objects_to_stdout(self):
+        test_file = os.path.join(self.repo_path, "test.txt")
+        with open(test_file, "w") as f:
+            f.write("test")
+        self._commit("Initial", "test.txt")
+
+        old_stdin = sys.stdin
+        try:
+            sys.stdin = io.BytesIO(self.repo.head() + b"\n")
+            sys.stdin.buffer = sys.stdin
+            stdout_stream = io.BytesIO()
+            self._run_cli("pack-objects", "--stdout", stdout_stream=stdout_stream)
+        finally:
+            sys.stdin = old_stdin
+        self.assertEqual(b"PACK", stdout_stream.getvalue()[:4])
+
+
 class FetchPackCommandTest(DulwichCliTestCase):
     """Tests for fetch-pack command."""
 
-    @patch("dulwich.cli.get_transport_and_path")
+    @patch("dulwich.client.get_transport_and_path")
     def test_fetch_pack_basic(self, mock_transport):
         # Mock the transport
         mock_client = MagicMock()
@@ -2225,22 +2666,19 @@ class LsRemoteCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         # Test basic ls-remote
         _result, stdout, _stderr = self._run_cli("ls-remote", self.repo_path)
-        lines = stdout.strip().split("\n")
-        self.assertTrue(any("HEAD" in line for line in lines))
-        self.assertTrue(any("refs/heads/master" in line for line in lines))
+        head = self.repo.head().decode()
+        self.assertEqual(f"{head}\tHEAD\n{head}\trefs/heads/master\n", stdout)
 
     def test_ls_remote_symref(self):
         # Create a commit
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         # Test ls-remote with --symref option
         _result, stdout, _stderr = self._run_cli(
@@ -2292,8 +2730,7 @@ class ArchiveCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test content")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         # Archive produces binary output, so use BytesIO
         _result, stdout, _stderr = self._run_cli(
@@ -2312,8 +2749,7 @@ class ForEachRefCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         with self.assertLogs("dulwich.cli", level="INFO") as cm:
             _result, _stdout, _stderr = self._run_cli("for-each-ref")
@@ -2331,9 +2767,8 @@ class PackRefsCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
-        self._run_cli("branch", "test-branch")
+        self._commit("Initial", "test.txt")
+        porcelain.branch_create(self.repo, "test-branch")
 
         _result, _stdout, _stderr = self._run_cli("pack-refs", "--all")
         # Check that packed-refs file exists
@@ -2350,8 +2785,7 @@ class SubmoduleCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         _result, _stdout, _stderr = self._run_cli("submodule")
         # Should not crash on repo without submodules
@@ -2366,6 +2800,73 @@ class SubmoduleCommandTest(DulwichCliTestCase):
         # Should not crash
 
 
+class BisectCommandTest(DulwichCliTestCase):
+    """Tests for bisect command."""
+
+    def test_bisect_to_first_bad_commit(self):
+        test_file = os.path.join(self.repo_path, "test.txt")
+        commits = []
+        for i in range(3):
+            with open(test_file, "w") as f:
+                f.write(f"content {i}")
+            self._run_cli("add", "test.txt")
+            self._run_cli("commit", f"--message=Commit {i}")
+            commits.append(self.repo.head())
+
+        self._run_cli("bisect", "start", commits[2].decode(), commits[0].decode())
+        with self.assertLogs("dulwich.cli", level="INFO") as cm:
+            result, _stdout, _stderr = self._run_cli("bisect", "bad")
+        self.assertEqual(0, result)
+        self.assertEqual(
+            [
+                f"{commits[1].decode()} is the first bad commit",
+                f"commit {commits[1].decode()}",
+                "    Commit 1",
+            ],
+            [record.getMessage() for record in cm.records],
+        )
+
+    def test_bisect_start_reports_checkout(self):
+        test_file = os.path.join(self.repo_path, "test.txt")
+        commits = []
+        for i in range(3):
+            with open(test_file, "w") as f:
+                f.write(f"content {i}")
+            self._run_cli("add", "test.txt")
+            self._run_cli("commit", f"--message=Commit {i}")
+            commits.append(self.repo.head())
+
+        with self.assertLogs("dulwich.cli", level="INFO") as cm:
+            result, _stdout, _stderr = self._run_cli(
+                "bisect", "start", commits[2].decode(), commits[0].decode()
+            )
+        self.assertEqual(0, result)
+        self.assertEqual(
+            [f"Bisecting: checking out '{commits[1].decode()}'"],
+            [record.getMessage() for record in cm.records],
+        )
+
+
+class NotesCommandTest(DulwichCliTestCase):
+    """Tests for notes command."""
+
+    def test_notes_list(self):
+        test_file = os.path.join(self.repo_path, "test.txt")
+        with open(test_file, "w") as f:
+            f.write("test")
+        self._commit("Initial", "test.txt")
+        head = self.repo.head()
+        self._run_cli("notes", "add", "--message=A note", head.decode())
+
+        [(_object_sha, note_sha)] = self.repo.notes.list_note_shas()
+        with self.assertLogs("dulwich.cli", level="INFO") as cm:
+            self._run_cli("notes", "list")
+        self.assertEqual(
+            [f"{note_sha.decode()} {head.decode()}"],
+            [record.getMessage() for record in cm.records],
+        )
+
+
 class StashCommandTest(DulwichCliTestCase):
     """Tests for stash commands."""
 
@@ -2378,8 +2879,7 @@ class StashCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("initial")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         # Modify file
         with open(test_file, "w") as f:
@@ -2405,18 +2905,16 @@ class MergeCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("initial")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         # Create and checkout new branch
-        self._run_cli("branch", "feature")
+        porcelain.branch_create(self.repo, "feature")
         self._run_cli("checkout", "feature")
 
         # Make changes in feature branch
         with open(test_file, "w") as f:
             f.write("feature changes")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Feature commit")
+        self._commit("Feature commit", "test.txt")
 
         # Go back to main
         self._run_cli("checkout", "master")
@@ -2425,6 +2923,34 @@ class MergeCommandTest(DulwichCliTestCase):
         _result, _stdout, _stderr = self._run_cli("merge", "feature")
 
 
+class MergeTreeCommandTest(DulwichCliTestCase):
+    """Tests for merge-tree command."""
+
+    def setUp(self):
+        super().setUp()
+        if importlib.util.find_spec("merge3") is None:
+            raise DependencyMissing("merge3")
+
+    def _make_tree(self, files):
+        tree = Tree()
+        for name, content in files.items():
+            blob = Blob.from_string(content)
+            self.repo.object_store.add_object(blob)
+            tree.add(name, 0o100644, blob.id)
+        self.repo.object_store.add_object(tree)
+        return tree.id.decode()
+
+    def test_name_only_conflicts(self):
+        base = self._make_tree({b"a.txt": b"base\n", b"b.txt": b"base\n"})
+        ours = self._make_tree({b"a.txt": b"ours\n", b"b.txt": b"ours\n"})
+        theirs = self._make_tree({b"a.txt": b"theirs\n", b"b.txt": b"theirs\n"})
+
+        _result, stdout, _stderr = self._run_cli(
+            "merge-tree", "--name-only", base, ours, theirs
+        )
+        self.assertEqual("a.txt\0b.txt\0", stdout)
+
+
 class HelpCommandTest(DulwichCliTestCase):
     """Tests for help command."""
 
@@ -2443,6 +2969,33 @@ class HelpCommandTest(DulwichCliTestCase):
             self.assertIn("commit", log_output)
 
 
+class GlobalOptionsTest(DulwichCliTestCase):
+    """Tests for global options handled before the command name."""
+
+    def test_no_command_shows_help(self):
+        result, stdout, _stderr = self._run_cli("--no-pager")
+        self.assertEqual(1, result)
+        self.assertIn("usage: dulwich", stdout)
+
+    def test_global_option_before_command(self):
+        with open(os.path.join(self.repo_path, "test.txt"), "w") as f:
+            f.write("test content")
+        self._run_cli("--no-pager", "add", "test.txt")
+        self.assertIn(b"test.txt", self.repo.open_index())
+
+    def test_help_after_command_is_passed_to_command(self):
+        with self.assertRaises(SystemExit) as cm:
+            self._run_cli("add", "--help")
+        self.assertEqual(0, cm.exception.code)
+
+    def test_split_global_options(self):
+        self.assertEqual(
+            ({"--no-pager", "--help"}, ["log", "--pager"]),
+            cli._split_global_options(["--no-pager", "-h", "log", "--pager"]),
+        )
+        self.assertEqual((set(), []), cli._split_global_options([]))
+
+
 class RemoteCommandTest(DulwichCliTestCase):
     """Tests for remote commands."""
 
@@ -2475,6 +3028,10 @@ class CheckIgnoreCommandTest(DulwichCliTestCase):
             self.assertIn("test.log", log_output)
             self.assertNotIn("test.txt", log_output)
 
+    def test_check_ignore_none_ignored(self):
+        result, _stdout, _stderr = self._run_cli("check-ignore", "test.txt")
+        self.assertEqual(1, result)
+
 
 class LsFilesCommandTest(DulwichCliTestCase):
     """Tests for ls-files command."""
@@ -2489,10 +3046,9 @@ class LsFilesCommandTest(DulwichCliTestCase):
 
         with self.assertLogs("dulwich.cli", level="INFO") as cm:
             _result, _stdout, _stderr = self._run_cli("ls-files")
-            log_output = "\n".join(cm.output)
-            self.assertIn("a.txt", log_output)
-            self.assertIn("b.txt", log_output)
-            self.assertIn("c.txt", log_output)
+        self.assertEqual(
+            ["a.txt\nb.txt\nc.txt"], [record.getMessage() for record in cm.records]
+        )
 
 
 class LsTreeCommandTest(DulwichCliTestCase):
@@ -2506,8 +3062,7 @@ class LsTreeCommandTest(DulwichCliTestCase):
         with open(os.path.join(self.repo_path, "subdir", "nested.txt"), "w") as f:
             f.write("nested content")
 
-        self._run_cli("add", ".")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", ".")
 
         _result, stdout, _stderr = self._run_cli("ls-tree", "HEAD")
         self.assertIn("file.txt", stdout)
@@ -2519,8 +3074,7 @@ class LsTreeCommandTest(DulwichCliTestCase):
         with open(os.path.join(self.repo_path, "subdir", "nested.txt"), "w") as f:
             f.write("nested")
 
-        self._run_cli("add", ".")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", ".")
 
         _result, stdout, _stderr = self._run_cli("ls-tree", "-r", "HEAD")
         self.assertIn("subdir/nested.txt", stdout)
@@ -2534,9 +3088,8 @@ class DescribeCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
-        self._run_cli("tag", "v1.0")
+        self._commit("Initial", "test.txt")
+        porcelain.tag_create(self.repo, "v1.0")
 
         with self.assertLogs("dulwich.cli", level="INFO") as cm:
             _result, _stdout, _stderr = self._run_cli("describe")
@@ -2551,8 +3104,7 @@ class FsckCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
+        self._commit("Initial", "test.txt")
 
         _result, _stdout, _stderr = self._run_cli("fsck")
         # Should complete without errors
@@ -2568,8 +3120,7 @@ class GrepCommandTest(DulwichCliTestCase):
         with open(os.path.join(self.repo_path, "file2.txt"), "w") as f:
             f.write("foo bar\n")
 
-        self._run_cli("add", "file1.txt", "file2.txt")
-        self._run_cli("commit", "--message=Add files")
+        self._commit("Add files", "file1.txt", "file2.txt")
 
         _result, stdout, _stderr = self._run_cli("grep", "world")
         self.assertEqual("file1.txt:hello world\n", stdout.replace("\r\n", "\n"))
@@ -2578,8 +3129,7 @@ class GrepCommandTest(DulwichCliTestCase):
         with open(os.path.join(self.repo_path, "test.txt"), "w") as f:
             f.write("line1\nline2\nline3\n")
 
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Add test")
+        self._commit("Add test", "test.txt")
 
         _result, stdout, _stderr = self._run_cli("grep", "-n", "line")
         self.assertEqual(
@@ -2591,8 +3141,7 @@ class GrepCommandTest(DulwichCliTestCase):
         with open(os.path.join(self.repo_path, "case.txt"), "w") as f:
             f.write("Hello World\n")
 
-        self._run_cli("add", "case.txt")
-        self._run_cli("commit", "--message=Add case")
+        self._commit("Add case", "case.txt")
 
         _result, stdout, _stderr = self._run_cli("grep", "-i", "hello")
         self.assertEqual("case.txt:Hello World\n", stdout.replace("\r\n", "\n"))
@@ -2601,8 +3150,7 @@ class GrepCommandTest(DulwichCliTestCase):
         with open(os.path.join(self.repo_path, "empty.txt"), "w") as f:
             f.write("nothing here\n")
 
-        self._run_cli("add", "empty.txt")
-        self._run_cli("commit", "--message=Add empty")
+        self._commit("Add empty", "empty.txt")
 
         _result, stdout, _stderr = self._run_cli("grep", "nonexistent")
         self.assertEqual("", stdout)
@@ -2642,6 +3190,115 @@ class RepackCommandTest(DulwichCliTestCase):
         self.assertTrue(any(f.endswith(".bitmap") for f in os.listdir(pack_dir)))
 
 
+class GcCommandTest(DulwichCliTestCase):
+    """Tests for gc command."""
+
+    def test_gc_dry_run(self):
+        test_file = os.path.join(self.repo_path, "test.txt")
+        with open(test_file, "w") as f:
+            f.write("test")
+        self._commit("Initial", "test.txt")
+
+        with self.assertLogs("dulwich.cli", level="INFO") as cm:
+            result, stdout, _stderr = self._run_cli("gc", "--dry-run")
+        self.assertIsNone(result)
+        self.assertEqual("", stdout)
+        # The report is a single record following the progress output
+        self.assertEqual("\nDry run results:", cm.records[-1].getMessage())
+        self.assertEqual(
+            1,
+            sum("Dry run results" in record.getMessage() for record in cm.records),
+        )
+
+    def test_gc_prune_relative(self):
+        for prune, grace_period in [
+            ("2.weeks.ago", 1209600),
+            ("3 days ago", 259200),
+            ("now", 0),
+        ]:
+            with patch("dulwich.porcelain.gc") as mock_gc:
+                self._run_cli("gc", "--quiet", f"--prune={prune}")
+            self.assertEqual(grace_period, mock_gc.call_args.kwargs["grace_period"])
+
+    def test_gc_prune_invalid(self):
+        with patch("dulwich.porcelain.gc") as mock_gc:
+            with self.assertLogs("dulwich.cli", level="ERROR") as cm:
+                result, _stdout, _stderr = self._run_cli("gc", "--prune=soonish")
+        self.assertEqual(1, result)
+        mock_gc.assert_not_called()
+        self.assertIn("Invalid prune date: soonish", cm.output[0])
+
+    def test_gc_prune_matches_prune_expire(self):
+        # gc --prune and prune --expire accept the same syntax
+        for value in ["2weeks ago", "2024-13-45"]:
+            with (
+                patch("dulwich.porcelain.gc") as mock_gc,
+                patch("dulwich.porcelain.prune") as mock_prune,
+                self.assertLogs("dulwich.cli", level="ERROR"),
+            ):
+                self.assertEqual(1, self._run_cli("gc", f"--prune={value}")[0])
+                self.assertEqual(1, self._run_cli("prune", f"--expire={value}")[0])
+            mock_gc.assert_not_called()
+            mock_prune.assert_not_called()
+
+
+class CountObjectsCommandTest(DulwichCliTestCase):
+    """Tests for count-objects command."""
+
+    def test_count_objects_verbose(self):
+        test_file = os.path.join(self.repo_path, "test.txt")
+        with open(test_file, "w") as f:
+            f.write("test")
+        self._commit("Initial", "test.txt")
+
+        stats = porcelain.count_objects(self.repo_path, verbose=True)
+        with self.assertLogs("dulwich.cli", level="INFO") as cm:
+            self._run_cli("count-objects", "--verbose")
+        self.assertEqual(
+            [
+                f"count: 3\nsize: {stats.size // 1024}\n"
+                "in-pack: 0\npacks: 0\nsize-pack: 0"
+            ],
+            [record.getMessage() for record in cm.records],
+        )
+
+
+class RebaseCommandTest(DulwichCliTestCase):
+    """Tests for rebase command."""
+
+    def setUp(self):
+        super().setUp()
+        test_file = os.path.join(self.repo_path, "test.txt")
+        with open(test_file, "w") as f:
+            f.write("test")
+        self._commit("Initial", "test.txt")
+        porcelain.branch_create(self.repo, "upstream")
+
+    def test_rebase_missing_upstream(self):
+        with self.assertLogs("dulwich.cli", level="ERROR") as cm:
+            result, _stdout, _stderr = self._run_cli("rebase")
+        self.assertEqual(1, result)
+        self.assertIn("Missing required argument 'upstream'", cm.output[0])
+
+    def test_rebase_up_to_date(self):
+        with self.assertLogs("dulwich.cli", level="INFO") as cm:
+            result, _stdout, _stderr = self._run_cli("rebase", "upstream")
+        self.assertEqual(0, result)
+        self.assertEqual(
+            ["Already up to date."], [record.getMessage() for record in cm.records]
+        )
+
+    def test_rebase_abort(self):
+        with patch("dulwich.porcelain.rebase", return_value=[]) as mock_rebase:
+            with self.assertLogs("dulwich.cli", level="INFO") as cm:
+                result, _stdout, _stderr = self._run_cli("rebase", "--abort")
+        self.assertEqual(0, result)
+        mock_rebase.assert_called_once_with(ANY, "HEAD", abort=True)
+        self.assertEqual(
+            ["Rebase aborted."], [record.getMessage() for record in cm.records]
+        )
+
+
 class ResetCommandTest(DulwichCliTestCase):
     """Tests for reset command."""
 
@@ -2650,14 +3307,12 @@ class ResetCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("first")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=First")
+        self._commit("First", "test.txt")
         first_commit = self.repo.head()
 
         with open(test_file, "w") as f:
             f.write("second")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Second")
+        self._commit("Second", "test.txt")
 
         # Reset soft
         _result, _stdout, _stderr = self._run_cli(
@@ -2700,9 +3355,8 @@ class SymbolicRefCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "test.txt")
         with open(test_file, "w") as f:
             f.write("test")
-        self._run_cli("add", "test.txt")
-        self._run_cli("commit", "--message=Initial")
-        self._run_cli("branch", "test-branch")
+        self._commit("Initial", "test.txt")
+        porcelain.branch_create(self.repo, "test-branch")
 
         _result, _stdout, _stderr = self._run_cli(
             "symbolic-ref", "HEAD", "refs/heads/test-branch"
@@ -2723,19 +3377,17 @@ class BundleCommandTest(DulwichCliTestCase):
         test_file = os.path.join(self.repo_path, "file1.txt")
         with open(test_file, "w") as f:
             f.write("Content of file1\n")
-        self._run_cli("add", "file1.txt")
-        self._run_cli("commit", "--message=Initial commit")
+        self._commit("Initial commit", "file1.txt")
 
         # Create second commit
         test_file2 = os.path.join(self.repo_path, "file2.txt")
         with open(test_file2, "w") as f:
             f.write("Content of file2\n")
-        self._run_cli("add", "file2.txt")
-        self._run_cli("commit", "--message=Add file2")
+        self._commit("Add file2", "file2.txt")
 
         # Create a branch and tag for testing
-        self._run_cli("branch", "feature")
-        self._run_cli("tag", "v1.0")
+        porcelain.branch_create(self.repo, "feature")
+        porcelain.tag_create(self.repo, "v1.0")
 
     def test_bundle_create_basic(self):
         """Test basic bundle creation."""
@@ -3082,8 +3734,7 @@ class BundleCommandTest(DulwichCliTestCase):
         test_file3 = os.path.join(self.repo_path, "file3.txt")
         with open(test_file3, "w") as f:
             f.write("Content of file3\n")
-        self._run_cli("add", "file3.txt")
-        self._run_cli("commit", "--message=Add file3")
+        self._commit("Add file3", "file3.txt")
 
         # Get commit SHAs
         result, stdout, _stderr = self._run_cli("log")
@@ -3154,6 +3805,14 @@ class FormatBytesTestCase(TestCase):
         self.assertEqual("1.0 TB", format_bytes(1024 * 1024 * 1024 * 1024))
         self.assertEqual("5.0 TB", format_bytes(1024 * 1024 * 1024 * 1024 * 5))
         self.assertEqual("1000.0 TB", format_bytes(1024 * 1024 * 1024 * 1024 * 1000))
+        self.assertEqual(
+            "2048.0 TB", format_bytes(1024 * 1024 * 1024 * 1024 * 1024 * 2)
+        )
+
+    def test_fractional(self):
+        """Test formatting non-integral byte counts."""
+        self.assertEqual("0.5 B", format_bytes(0.5))
+        self.assertEqual("1023.5 B", format_bytes(1023.5))
 
 
 class GetPagerTest(TestCase):
@@ -3980,7 +4639,7 @@ class ReplaceCommandTest(DulwichCliTestCase):
 
         # Verify the replacement ref was created
         replace_ref = b"refs/replace/" + c1.id
-        self.assertIn(replace_ref, self.repo.refs.keys())
+        self.assertIn(replace_ref, self.repo.refs)
         self.assertEqual(c2.id, self.repo.refs[replace_ref])
 
     def test_replace_list_empty(self):
@@ -4001,8 +4660,7 @@ class ReplaceCommandTest(DulwichCliTestCase):
 
         # List replacements
         _result, stdout, _stderr = self._run_cli("replace", "list")
-        self.assertIn(c1_str, stdout)
-        self.assertIn(c2_str, stdout)
+        self.assertEqual(f"{c1_str} -> {c2_str}\n", stdout)
 
     def test_replace_default_list(self):
         """Test that replace without subcommand defaults to list."""
@@ -4033,13 +4691,13 @@ class ReplaceCommandTest(DulwichCliTestCase):
 
         # Verify it exists
         replace_ref = b"refs/replace/" + c1.id
-        self.assertIn(replace_ref, self.repo.refs.keys())
+        self.assertIn(replace_ref, self.repo.refs)
 
         # Delete the replacement
         _result, _stdout, _stderr = self._run_cli("replace", "delete", c1_str)
 
         # Verify it's gone
-        self.assertNotIn(replace_ref, self.repo.refs.keys())
+        self.assertNotIn(replace_ref, self.repo.refs)
 
     def test_replace_delete_nonexistent(self):
         """Test deleting a nonexistent replacement ref fails."""
@@ -35,6 +35,7 @@ import threading
 import time
 from io import BytesIO, StringIO
 from unittest import skipIf
+from unittest.mock import patch
 
 from dulwich import porcelain
 from dulwich.client import SendPackResult
@@ -9479,6 +9480,50 @@ class FilterBranchTests(PorcelainTestCase):
         new_commit = self.repo[new_head]
         self.assertTrue(new_commit.message.startswith(b"Second: First: "))
 
+    def _tree_filter_parents(self):
+        checkouts = []
+
+        def tree_filter(tree_sha, tmpdir):
+            checkouts.append(os.path.dirname(tmpdir))
+            return None
+
+        porcelain.filter_branch(
+            self.repo_path, "master", tree_filter=tree_filter, force=True
+        )
+        return set(checkouts)
+
+    def test_filter_branch_tree_filter_memory_tempdir(self):
+        """Tree filters use the memory-backed directory by default."""
+        shm_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, shm_dir)
+        for name in ("TMPDIR", "TEMP", "TMP"):
+            self.overrideEnv(name, None)
+        with patch("dulwich.porcelain._memory_tempdir", return_value=shm_dir):
+            self.assertEqual({shm_dir}, self._tree_filter_parents())
+
+    def test_memory_tempdir(self):
+        """The memory-backed directory is only used when it has room."""
+        shm_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, shm_dir)
+        with patch("dulwich.porcelain._SHM_DIR", shm_dir):
+            self.assertEqual(shm_dir, porcelain._memory_tempdir(min_free=0))
+            self.assertIsNone(porcelain._memory_tempdir(min_free=2**62))
+        with patch("dulwich.porcelain._SHM_DIR", "/nonexistent"):
+            self.assertIsNone(porcelain._memory_tempdir(min_free=0))
+
+    def test_filter_branch_tree_filter_honours_tempdir_env(self):
+        """An explicit TMPDIR, TEMP or TMP overrides the memory-backed directory."""
+        shm_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, shm_dir)
+        for name in ("TMPDIR", "TEMP", "TMP"):
+            self.overrideEnv(name, None)
+        for name in ("TMPDIR", "TEMP", "TMP"):
+            with (
+                patch.dict(os.environ, {name: tempfile.gettempdir()}),
+                patch("dulwich.porcelain._memory_tempdir", return_value=shm_dir),
+            ):
+                self.assertNotIn(shm_dir, self._tree_filter_parents())
+
 
 class StashTests(PorcelainTestCase):
     def setUp(self) -> None:
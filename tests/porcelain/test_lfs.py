@@ -24,9 +24,11 @@
 import os
 import tempfile
 import unittest
+from io import BytesIO
 
 from dulwich import porcelain
 from dulwich.lfs import LFSPointer, LFSStore
+from dulwich.protocol import Protocol
 from dulwich.repo import Repo
 from tests import TestCase
 
@@ -149,6 +151,79 @@ class LFSPorcelainTestCase(TestCase):
 
         self.assertEqual(smudged_content, test_content)
 
+    def test_lfs_filter_process(self):
+        """Test serving clean and smudge over the filter process protocol."""
+        porcelain.lfs_init(self.repo)
+        content = b"This is test content for the filter process"
+
+        request = BytesIO()
+        client = Protocol(None, request.write)
+        client.write_pkt_line(b"git-filter-client\n")
+        client.write_pkt_line(b"version=2\n")
+        client.write_pkt_line(None)
+        client.write_pkt_line(b"capability=clean\n")
+        client.write_pkt_line(b"capability=smudge\n")
+        client.write_pkt_line(b"capability=delay\n")
+        client.write_pkt_line(None)
+        client.write_pkt_line(b"command=clean\n")
+        client.write_pkt_line(b"pathname=test.bin\n")
+        client.write_pkt_line(None)
+        client.write_pkt_line(content)
+        client.write_pkt_line(None)
+        client.write_pkt_line(b"command=unknown\n")
+        client.write_pkt_line(None)
+        client.write_pkt_line(None)
+        request.seek(0)
+
+        response = BytesIO()
+        with self.assertLogs(level="WARNING") as cm:
+            porcelain.lfs_filter_process(self.repo, request, response)
+        self.assertIn("Unsupported filter command", cm.output[0])
+        response.seek(0)
+        server = Protocol(response.read, None)
+
+        def read_until_flush():
+            pkts = []
+            while (pkt := server.read_pkt_line()) is not None:
+                pkts.append(pkt)
+            return pkts
+
+        self.assertEqual([b"git-filter-server\n", b"version=2\n"], read_until_flush())
+        self.assertEqual(
+            [b"capability=clean\n", b"capability=smudge\n"], read_until_flush()
+        )
+        self.assertEqual([b"status=success\n"], read_until_flush())
+        pointer = LFSPointer.from_bytes(b"".join(read_until_flush()))
+        self.assertIsNotNone(pointer)
+        self.assertEqual(len(content), pointer.size)
+        self.assertEqual([], read_until_flush())
+        self.assertEqual([b"status=error\n"], read_until_flush())
+        self.assertEqual(b"", response.read())
+
+        # Smudging the pointer in a new session returns the content
+        request = BytesIO()
+        client = Protocol(None, request.write)
+        client.write_pkt_line(b"git-filter-client\n")
+        client.write_pkt_line(b"version=2\n")
+        client.write_pkt_line(None)
+        client.write_pkt_line(b"capability=smudge\n")
+        client.write_pkt_line(None)
+        client.write_pkt_line(b"command=smudge\n")
+        client.write_pkt_line(b"pathname=test.bin\n")
+        client.write_pkt_line(None)
+        client.write_pkt_line(pointer.to_bytes())
+        client.write_pkt_line(None)
+        request.seek(0)
+
+        response = BytesIO()
+        porcelain.lfs_filter_process(self.repo, request, response)
+        response.seek(0)
+        server = Protocol(response.read, None)
+        read_until_flush()
+        self.assertEqual([b"capability=smudge\n"], read_until_flush())
+        self.assertEqual([b"status=success\n"], read_until_flush())
+        self.assertEqual(content, b"".join(read_until_flush()))
+
     def test_lfs_ls_files(self):
         """Test listing LFS files."""
         # Initialize repo with some LFS files
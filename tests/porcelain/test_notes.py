@@ -131,6 +131,16 @@ class TestPorcelainNotes(TestCase):
         self.assertEqual(b"Note 1", notes_dict[self.test_commit_id])
         self.assertEqual(b"Note 2", notes_dict[commit2_id])
 
+    def test_notes_list_shas(self):
+        """Test listing noted objects without their contents."""
+        self.assertEqual([], porcelain.notes_list_shas(self.test_dir))
+        porcelain.notes_add(self.test_dir, self.test_commit_id, "Note 1")
+
+        [(object_sha, note_sha)] = porcelain.notes_list_shas(self.test_dir)
+        self.assertEqual(self.test_commit_id, object_sha)
+        with Repo(self.test_dir) as repo:
+            self.assertEqual(b"Note 1", repo[note_sha].data)
+
     def test_notes_custom_ref(self):
         """Test using a custom notes ref."""
         # Add note to custom ref
@@ -23,7 +23,11 @@
 
 import time
 
-from dulwich.approxidate import parse_approxidate, parse_relative_time
+from dulwich.approxidate import (
+    parse_approxidate,
+    parse_grace_period,
+    parse_relative_time,
+)
 
 from . import TestCase
 
@@ -67,6 +71,14 @@ class ParseRelativeTimeTests(TestCase):
         self.assertEqual(2 * 604800, parse_relative_time("2.weeks.ago"))
         self.assertEqual(5 * 86400, parse_relative_time("5.days.ago"))
 
+    def test_repeated_calls(self) -> None:
+        # Results are memoized; errors are raised again on every call
+        self.assertEqual(
+            parse_relative_time("3 days ago"), parse_relative_time("3 days ago")
+        )
+        for _ in range(2):
+            self.assertRaises(ValueError, parse_relative_time, "3 days")
+
     def test_invalid_format(self) -> None:
         self.assertRaises(ValueError, parse_relative_time, "not a time")
         self.assertRaises(ValueError, parse_relative_time, "5 weeks")  # Missing "ago"
@@ -76,6 +88,18 @@ class ParseRelativeTimeTests(TestCase):
 
     def test_invalid_number(self) -> None:
         self.assertRaises(ValueError, parse_relative_time, "abc weeks ago")
+        self.assertRaisesRegex(
+            ValueError,
+            "Invalid number in relative time: abc",
+            parse_relative_time,
+            "abc fortnights ago",
+        )
+        self.assertRaisesRegex(
+            ValueError,
+            "Unknown time unit: fortnights",
+            parse_relative_time,
+            "5 fortnights ago",
+        )
 
 
 class ParseApproxidateTests(TestCase):
@@ -159,3 +183,24 @@ class ParseApproxidateTests(TestCase):
     def test_invalid_spec(self) -> None:
         self.assertRaises(ValueError, parse_approxidate, "not a valid time")
         self.assertRaises(ValueError, parse_approxidate, "abc123")
+
+
+class ParseGracePeriodTests(TestCase):
+    """Tests for parse_grace_period."""
+
+    def test_relative(self) -> None:
+        self.assertEqual(2 * 604800, parse_grace_period("2 weeks ago"))
+        self.assertEqual(3 * 86400, parse_grace_period("3.days.ago"))
+        self.assertEqual(0, parse_grace_period("now"))
+
+    def test_absolute_date(self) -> None:
+        result = parse_grace_period("2005-04-07")
+        expected = time.time() - time.mktime((2005, 4, 7, 0, 0, 0, 0, 0, -1))
+        self.assertAlmostEqual(result, expected, delta=2)
+
+    def test_invalid(self) -> None:
+        # Same syntax as parse_relative_time: unit and "ago" must be separated
+        self.assertRaises(ValueError, parse_grace_period, "2weeks ago")
+        self.assertRaises(ValueError, parse_grace_period, "2 weeksago")
+        self.assertRaises(ValueError, parse_grace_period, "soonish")
+        self.assertRaises(ValueError, parse_grace_period, "2024-13-45")
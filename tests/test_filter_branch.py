@@ -21,6 +21,9 @@
 
 """Tests for dulwich.filter_branch."""
 
+import os
+import shutil
+import tempfile
 import unittest
 
 from dulwich.filter_branch import CommitFilter, filter_refs
@@ -126,6 +129,20 @@ class CommitFilterTests(unittest.TestCase):
         new_parent = self.store[new_parent_sha]
         self.assertEqual(new_parent.author, b"New Author <new@example.com>")
 
+    def test_tree_filter_tempdir(self):
+        """Tree filters check out into the requested directory."""
+        tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempdir)
+        checkouts = []
+
+        def tree_filter(tree_sha, tmpdir):
+            checkouts.append(os.path.dirname(tmpdir))
+            return None
+
+        filter = CommitFilter(self.store, tree_filter=tree_filter, tempdir=tempdir)
+        filter.process_commit(self.c2.id)
+        self.assertEqual([tempdir], checkouts)
+
 
 class FilterRefsTests(unittest.TestCase):
     """Tests for filter_refs function."""
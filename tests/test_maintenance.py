@@ -21,13 +21,21 @@
 
 """Tests for dulwich.maintenance."""
 
+import os
+import shutil
 import tempfile
+import threading
+import time
+from unittest.mock import patch
 
 from dulwich.maintenance import (
+    MAINTENANCE_TASKS,
+    BatchedProgress,
     CommitGraphTask,
     GcTask,
     IncrementalRepackTask,
     LooseObjectsTask,
+    MaintenanceTask,
     PackRefsTask,
     PrefetchTask,
     get_enabled_tasks,
@@ -132,6 +140,46 @@ class IncrementalRepackTaskTest(MaintenanceTaskTestCase):
         result = task.run()
         self.assertTrue(result)
 
+    def _add_pack(self, count):
+        start = len(list(self.repo.object_store))
+        blobs = [
+            Blob.from_string(f"blob {i}".encode()) for i in range(start, start + count)
+        ]
+        return self.repo.object_store.add_objects([(blob, None) for blob in blobs])
+
+    def test_run_geometric(self):
+        """Test that only the small packs breaking the progression are merged."""
+        large = self._add_pack(16)
+        medium = self._add_pack(8)
+        small = [self._add_pack(1).name() for _ in range(3)]
+        self.repo.get_worktree().commit(
+            message=b"loose", committer=b"T <t@e.com>", author=b"T <t@e.com>"
+        )
+
+        task = IncrementalRepackTask(self.repo)
+        self.assertTrue(task.run())
+
+        pack_names = {pack.name() for pack in self.repo.object_store.packs}
+        self.assertIn(large.name(), pack_names)
+        self.assertIn(medium.name(), pack_names)
+        for name in small:
+            self.assertNotIn(name, pack_names)
+        self.assertEqual(3, len(pack_names))
+        # Loose objects are left for the loose-objects task
+        self.assertTrue(list(self.repo.object_store._iter_loose_objects()))
+
+    def test_run_geometric_progression(self):
+        """Test that packs already in a geometric progression are left alone."""
+        for count in (1, 2, 4):
+            self._add_pack(count)
+        pack_names = {pack.name() for pack in self.repo.object_store.packs}
+
+        task = IncrementalRepackTask(self.repo)
+        self.assertTrue(task.run())
+        self.assertEqual(
+            pack_names, {pack.name() for pack in self.repo.object_store.packs}
+        )
+
 
 class PackRefsTaskTest(MaintenanceTaskTestCase):
     """Tests for PackRefsTask."""
@@ -162,6 +210,127 @@ class PrefetchTaskTest(MaintenanceTaskTestCase):
         result = task.run()
         self.assertTrue(result)
 
+    def test_run_multiple_remotes(self):
+        """Test prefetching from several remotes, one of them broken."""
+        config = self.repo.get_config()
+        commit_ids = {}
+        for name in ["one", "two"]:
+            remote_dir = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, remote_dir)
+            with Repo.init(remote_dir) as remote:
+                commit_ids[name] = remote.get_worktree().commit(
+                    message=f"commit in {name}".encode(),
+                    committer=b"Test <test@example.com>",
+                    author=b"Test <test@example.com>",
+                )
+            config.set((b"remote", name.encode()), b"url", remote_dir.encode())
+        config.set(
+            (b"remote", b"broken"),
+            b"url",
+            os.path.join(self.test_dir, "missing").encode(),
+        )
+        config.write_to_path()
+
+        messages = []
+        task = PrefetchTask(self.repo, progress=messages.append)
+        with self.assertLogs("dulwich.maintenance", level="ERROR") as cm:
+            result = task.run()
+
+        self.assertFalse(result)
+        self.assertEqual(1, len(cm.output))
+        self.assertIn("Failed to fetch from broken", cm.output[0])
+        self.assertEqual(
+            [
+                "Running prefetch task",
+                "Fetching from broken",
+                "Fetching from one",
+                "Fetching from two",
+            ],
+            messages,
+        )
+        for name, commit_id in commit_ids.items():
+            self.assertEqual(
+                commit_id, self.repo.refs[f"refs/remotes/{name}/master".encode()]
+            )
+
+
+class BatchedProgressTest(TestCase):
+    """Tests for BatchedProgress."""
+
+    def test_flush(self):
+        """Test that queued messages are passed on as one batch."""
+        messages = []
+        progress = BatchedProgress(messages.append, interval=60)
+        progress("one")
+        progress("two")
+        progress("three")
+        self.assertEqual(["one"], messages)
+        progress.flush()
+        self.assertEqual(["one", "two\nthree"], messages)
+        progress.flush()
+        self.assertEqual(["one", "two\nthree"], messages)
+
+    def test_lone_message(self):
+        """Test that a message after a quiet interval is passed on at once."""
+        messages = []
+        progress = BatchedProgress(messages.append, interval=60)
+        progress("one")
+        self.assertEqual(["one"], messages)
+
+        progress = BatchedProgress(messages.append, interval=0.2)
+        progress("two")
+        progress("three")
+        time.sleep(0.3)
+        progress("four")
+        self.assertEqual(["one", "two", "three\nfour"], messages)
+
+    def test_flush_keeps_bytes_in_order(self):
+        """Test that non-string messages are passed on unchanged."""
+        messages = []
+        progress = BatchedProgress(messages.append, interval=60)
+        progress("one")
+        progress(b"writing pack data: 1/2\r")
+        progress("two")
+        progress.flush()
+        self.assertEqual(["one", b"writing pack data: 1/2\r", "two"], messages)
+
+    def test_interval(self):
+        """Test that messages are passed on by the reporting thread."""
+        messages = []
+        threads = []
+
+        def record(message):
+            messages.append(message)
+            threads.append(threading.get_ident())
+
+        progress = BatchedProgress(record, interval=0)
+        progress("one")
+        self.assertEqual(["one"], messages)
+        self.assertEqual([threading.get_ident()], threads)
+
+    def test_slow_callback_does_not_block_reporters(self):
+        """Test that other threads can report while a batch is written."""
+        in_callback = threading.Event()
+        release = threading.Event()
+        messages = []
+
+        def slow(message):
+            messages.append(message)
+            in_callback.set()
+            release.wait(10)
+
+        progress = BatchedProgress(slow, interval=0)
+        writer = threading.Thread(target=progress, args=("one",))
+        writer.start()
+        self.assertTrue(in_callback.wait(10))
+        # Returns straight away and queues the message for the next batch
+        progress("two")
+        self.assertEqual(["one"], messages)
+        release.set()
+        writer.join()
+        progress.flush()
+        self.assertEqual(["one", "two"], messages)
+
 
 class MaintenanceFunctionsTest(MaintenanceTaskTestCase):
     """Tests for maintenance module functions."""
@@ -177,6 +346,22 @@ class MaintenanceFunctionsTest(MaintenanceTaskTestCase):
         self.assertNotIn("pack-refs", enabled)
         self.assertNotIn("prefetch", enabled)
 
+    def test_get_enabled_tasks_reads_config_once(self):
+        """Test that the configuration is read once for all tasks."""
+        config = self.repo.get_config()
+        config.set((b"maintenance", b"gc"), b"enabled", False)
+        config.set((b"maintenance", b"pack-refs"), b"enabled", True)
+        config.write_to_path()
+
+        with patch.object(
+            self.repo, "get_config", wraps=self.repo.get_config
+        ) as get_config:
+            enabled = get_enabled_tasks(self.repo)
+        self.assertEqual(1, get_config.call_count)
+        self.assertNotIn("gc", enabled)
+        self.assertIn("pack-refs", enabled)
+        self.assertIn("commit-graph", enabled)
+
     def test_get_enabled_tasks_with_filter(self):
         """Test getting enabled tasks with a filter."""
         enabled = get_enabled_tasks(self.repo, ["gc", "pack-refs"])
@@ -204,6 +389,109 @@ class MaintenanceFunctionsTest(MaintenanceTaskTestCase):
         self.assertEqual(result.tasks_succeeded, ["pack-refs"])
         self.assertEqual(len(result.tasks_failed), 0)
 
+    def test_run_maintenance_reports_before_long_steps(self):
+        """Status messages are passed on before the work they announce."""
+        messages = []
+        seen = []
+
+        def pack_refs(*args, **kwargs):
+            seen.extend(messages)
+
+        with patch.object(self.repo.refs, "pack_refs", pack_refs):
+            run_maintenance(
+                self.repo,
+                tasks=["loose-objects", "pack-refs"],
+                progress=messages.append,
+            )
+        self.assertIn("Running pack-refs task", "\n".join(seen))
+
+    def test_run_maintenance_sequential_progress(self):
+        """Tasks that cannot overlap call progress directly, one by one."""
+        messages = []
+        threads = set()
+
+        def progress(message):
+            messages.append(message)
+            threads.add(threading.get_ident())
+
+        self._create_commit()
+        with patch("dulwich.maintenance.ThreadPoolExecutor") as executor:
+            result = run_maintenance(self.repo, progress=progress)
+        executor.assert_not_called()
+        self.assertEqual(["gc", "commit-graph"], result.tasks_succeeded)
+        self.assertEqual({threading.get_ident()}, threads)
+        self.assertIn("Running gc task", messages)
+        self.assertIn("Running commit-graph task", messages)
+
+    def test_run_maintenance_overlaps_independent_tasks(self):
+        """Tasks on disjoint resources overlap; shared resources serialize."""
+        events = []
+        refs_started = threading.Event()
+
+        class SlowObjectsTask(MaintenanceTask):
+            name = "slow-objects"
+            resources = frozenset({"objects"})
+
+            def run(self):
+                # Only completes if the refs task runs alongside it
+                overlapped = refs_started.wait(timeout=10)
+                events.append("slow-objects")
+                return overlapped
+
+        class NextObjectsTask(MaintenanceTask):
+            name = "next-objects"
+            resources = frozenset({"objects"})
+
+            def run(self):
+                events.append("next-objects")
+                return True
+
+        class RefsTask(MaintenanceTask):
+            name = "refs"
+            resources = frozenset({"refs"})
+
+            def run(self):
+                refs_started.set()
+                return True
+
+        tasks = {
+            "slow-objects": SlowObjectsTask,
+            "next-objects": NextObjectsTask,
+            "refs": RefsTask,
+        }
+        with patch.dict(MAINTENANCE_TASKS, tasks):
+            result = run_maintenance(self.repo, tasks=list(tasks))
+
+        self.assertEqual(["slow-objects", "next-objects"], events)
+        self.assertEqual(list(tasks), result.tasks_run)
+        self.assertEqual(list(tasks), result.tasks_succeeded)
+
+    def test_run_maintenance_serializes_commit_graph_and_pack_refs(self):
+        """commit-graph reads every ref, so pack-refs must not overlap it."""
+        pack_refs_started = threading.Event()
+        overlapped = []
+        commit_graph_run = CommitGraphTask.run
+        pack_refs_run = PackRefsTask.run
+
+        def slow_commit_graph(task):
+            # Gives pack-refs the chance to start if it weren't serialized
+            overlapped.append(pack_refs_started.wait(timeout=0.2))
+            return commit_graph_run(task)
+
+        def pack_refs(task):
+            pack_refs_started.set()
+            return pack_refs_run(task)
+
+        self._create_commit()
+        with (
+            patch.object(CommitGraphTask, "run", slow_commit_graph),
+            patch.object(PackRefsTask, "run", pack_refs),
+        ):
+            result = run_maintenance(self.repo, tasks=["commit-graph", "pack-refs"])
+
+        self.assertEqual([False], overlapped)
+        self.assertEqual(["commit-graph", "pack-refs"], result.tasks_succeeded)
+
     def test_run_maintenance_with_progress(self):
         """Test running maintenance with progress callback."""
         messages = []
@@ -312,6 +312,18 @@ class TestNotes(TestCase):
         self.assertEqual(sha2, notes_list[1][0])
         self.assertEqual(b"Note 2", notes_list[1][1])
 
+    def test_list_note_shas(self):
+        """Test listing note SHAs without loading note contents."""
+        notes = Notes(self.store, self.refs)
+        self.assertEqual([], notes.list_note_shas())
+
+        sha = b"1234567890abcdef1234567890abcdef12345678"
+        notes.set_note(sha, b"Note 1")
+
+        [(object_sha, note_sha)] = notes.list_note_shas()
+        self.assertEqual(sha, object_sha)
+        self.assertEqual(b"Note 1", self.store[note_sha].data)
+
     def test_custom_commit_info(self):
         """Test setting note with custom commit info."""
         notes = Notes(self.store, self.refs)
@@ -28,6 +28,7 @@ import sys
 import tempfile
 from contextlib import closing
 from io import BytesIO
+from unittest.mock import patch
 
 from dulwich.errors import NotTreeError
 from dulwich.index import commit_tree
@@ -208,6 +209,17 @@ class DiskObjectStoreTests(PackBasedObjectStoreTests, TestCase):
         for alt_path in store._read_alternate_paths():
             self.assertNotIn("#", alt_path)
 
+    def test_repack_prefetch_packs(self) -> None:
+        for i in range(2):
+            self.store.add_objects([(make_object(Blob, data=b"blob %d" % i), None)])
+        packs = list(self.store.packs)
+        with patch("dulwich.object_store._fadvise_willneed") as fadvise:
+            self.store.repack()
+        fadvise.assert_called_once()
+        self.assertEqual(
+            {pack._data_path for pack in packs}, set(fadvise.call_args.args[0])
+        )
+
     def test_file_modes(self) -> None:
         self.store.add_object(testobject)
         path = self.store._get_shafile_path(testobject.id)
@@ -44,6 +44,7 @@ from dulwich.pack import (
     Pack,
     PackData,
     PackIndex3,
+    PackStreamCopier,
     PackStreamReader,
     UnpackedObject,
     UnresolvedDeltas,
@@ -1501,11 +1502,54 @@ class TestPackStreamReader(TestCase):
         )
         self.assertEqual(2, len(list(reader.read_objects())))
 
+    def test_read_objects_small_reads(self) -> None:
+        f = BytesIO()
+        build_pack(f, [(Blob.type_num, b"blob %d" % i) for i in range(10)])
+        for read_size in (1, 7, 19, 20, 21):
+            f.seek(0)
+            reader = PackStreamReader(
+                DEFAULT_OBJECT_FORMAT.hash_func,
+                f.read,
+                read_some=lambda size: f.read(min(size, read_size)),
+            )
+            self.assertEqual(10, len(list(reader.read_objects())))
+
+    def test_read_objects_checksum_mismatch(self) -> None:
+        f = BytesIO()
+        build_pack(f, [(Blob.type_num, b"blob")])
+        data = bytearray(f.getvalue())
+        data[-1] ^= 0xFF
+        reader = PackStreamReader(
+            DEFAULT_OBJECT_FORMAT.hash_func, BytesIO(bytes(data)).read
+        )
+        self.assertRaises(ChecksumMismatch, list, reader.read_objects())
+
     def test_read_objects_empty(self) -> None:
         reader = PackStreamReader(DEFAULT_OBJECT_FORMAT.hash_func, BytesIO().read)
         self.assertRaises(AssertionError, list, reader.read_objects())
 
 
+class TestPackStreamCopier(TestCase):
+    def test_verify(self) -> None:
+        f = BytesIO()
+        build_pack(f, [(Blob.type_num, b"blob %d" % i) for i in range(2001)])
+        f.seek(0)
+        out = BytesIO()
+        messages: list[bytes] = []
+        copier = PackStreamCopier(DEFAULT_OBJECT_FORMAT.hash_func, f.read, f.read, out)
+        copier.verify(progress=messages.append)
+        self.assertEqual(f.getvalue(), out.getvalue())
+        self.assertEqual(
+            [
+                b"copying pack entries: 0/2001\r",
+                b"copying pack entries: 1000/2001\r",
+                b"copying pack entries: 2000/2001\r",
+                b"copied 2000 pack entries\n",
+            ],
+            messages,
+        )
+
+
 class TestPackIterator(DeltaChainIterator):
     _compute_crc32 = True
 
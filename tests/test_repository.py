@@ -30,6 +30,7 @@ import sys
 import tempfile
 import time
 import warnings
+from unittest.mock import patch
 
 from dulwich import errors, objects
 from dulwich.config import Config
@@ -1169,6 +1170,31 @@ class BuildRepoRootTests(TestCase):
             self._repo.get_shallow(),
         )
 
+    def test_reflog_dir_created_concurrently(self) -> None:
+        # Another writer may create the log directory between the existence
+        # check and mkdir, e.g. when several fetches run in parallel
+        real_mkdir = os.mkdir
+
+        def racing_mkdir(path, *args, **kwargs):
+            real_mkdir(path, *args, **kwargs)
+            raise FileExistsError(path)
+
+        r = self._repo
+        with patch("dulwich.repo.os.mkdir", racing_mkdir):
+            r.refs.set_if_equals(
+                b"refs/remotes/origin/master",
+                None,
+                self._root_commit,
+                message=b"fetch: test",
+            )
+        self.assertTrue(
+            os.path.exists(
+                os.path.join(
+                    r.controldir(), "logs", "refs", "remotes", "origin", "master"
+                )
+            )
+        )
+
     def test_update_shallow(self) -> None:
         self._repo.update_shallow(None, None)  # no op
         self.assertEqual(set(), self._repo.get_shallow())